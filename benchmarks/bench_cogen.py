@@ -0,0 +1,180 @@
+"""
+Throughput of the template engine: tokenizer, parser and interpreter.
+
+Measures `Tokenizer.next` (tokens/s), `CogenParser.parse_program` (nodes/s)
+and `interpret` (rendered bytes/s) on the templates of `testlib/programs.py`
+and on generated stress templates (see `STRESS`). Programs are interpreted
+as parsed and after `optimize` (as components render them), which folds
+literal lines into a single write. Run from the repository root after
+compiling the extensions:
+
+    python benchmarks/bench_cogen.py [--repeat N] [--scale N] [--only NAME]
+"""
+import argparse
+import sys
+import timeit
+from os.path import dirname, abspath
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from testlib import programs as progs
+from ghostwriter.utils.iwriter import StringWriter
+from ghostwriter.utils.cogen.tokenizer import Tokenizer, TokenFactory
+from ghostwriter.utils.cogen.parser import CogenParser, Program, Block, If, Line
+from ghostwriter.utils.cogen.interpreter import interpret, Writer
+from ghostwriter.utils.cogen.optimizer import optimize
+
+EOF = TokenFactory.eof()
+
+
+class Item:
+    def __init__(self, n: int):
+        self.name = f"item{n}"
+        self.n = n
+        self.fields = [f"f{n}", n * 2, None]
+
+
+class Case:
+    def __init__(self, name: str, program: str, scope: dict, blocks: dict = None):
+        self.name = name
+        self.program = program
+        self.scope = scope
+        self.blocks = blocks or {}
+
+
+def corpus():
+    """Templates of `testlib/programs.py`, rendered with each of their examples."""
+    for case in vars(progs).values():
+        if isinstance(case, progs.TestCase):
+            for example in case.examples:
+                yield Case(case.header, case.program, example.scope, example.blocks)
+
+
+def deep_nesting(scale: int) -> Case:
+    # nested if/for blocks `scale` levels deep, each level renders a line (loops run once)
+    lines = []
+    for depth in range(scale):
+        indent = "    " * depth
+        if depth % 2:
+            lines.append(f"{indent}% for x{depth} in once")
+        else:
+            lines.append(f"{indent}% if flag")
+        lines.append(f"{indent}level << {depth} >>: << item.name >>")
+    for depth in reversed(range(scale)):
+        lines.append("    " * depth + ("% /for" if depth % 2 else "% /if"))
+    return Case("deep nesting", "\n".join(lines) + "\n", {'flag': True, 'once': (0,), 'item': Item(1)})
+
+
+def long_loop(scale: int) -> Case:
+    program = "\n".join([
+        "% for item in items",
+        "<< item.name >> = << item.n >>;",
+        "% if item.n % 2",
+        "    /* odd: << item.fields[0] >> */",
+        "% /if",
+        "% /for",
+    ]) + "\n"
+    return Case("long loop", program, {'items': [Item(n) for n in range(scale * 100)]})
+
+
+def many_exprs(scale: int) -> Case:
+    line = ", ".join(f"<< item.fields[{n % 3}] >><< sep >>" for n in range(50))
+    program = "\n".join(f"    {{{line}}}," for _ in range(scale)) + "\n"
+    return Case("many exprs per line", program, {'item': Item(1), 'sep': ":"})
+
+
+def large_literal(scale: int) -> Case:
+    program = "\n".join(f"    static int table_{n}[] = {{ {n}, {n + 1}, {n + 2}, {n + 3} }}; /* padding */"
+                        for n in range(scale * 100)) + "\n"
+    return Case("large literal", program, {})
+
+
+STRESS = [deep_nesting, long_loop, many_exprs, large_literal]
+
+
+def count_tokens(prog: str) -> int:
+    t = Tokenizer(prog)
+    n = 0
+    while t.next() != EOF:
+        n += 1
+    return n
+
+
+def count_nodes(node) -> int:
+    if isinstance(node, Program):
+        children = node.lines
+    elif isinstance(node, (Block, Line)):
+        children = node.children
+    elif isinstance(node, If):
+        children = node.conds
+    else:
+        return 1
+    return 1 + sum(count_nodes(child) for child in children)
+
+
+def parse(prog: str) -> Program:
+    return CogenParser(Tokenizer(prog)).parse_program()
+
+
+def render(program: Program, case: Case) -> str:
+    w = StringWriter()
+    interpret(program, Writer(w), case.blocks, dict(case.scope))
+    return w.getvalue()
+
+
+def rate(amount: float, seconds: float) -> str:
+    for unit in ("", "K", "M", "G"):
+        if amount / seconds < 1000 or unit == "G":
+            break
+        amount /= 1000
+    return f"{amount / seconds:7.2f}{unit}"
+
+
+def bench(label: str, cases, repeat: int):
+    """Time each stage over all `cases`, the totals are divided by the best time of each stage."""
+    programs = [case.program for case in cases]
+    asts = [parse(p) for p in programs]
+    optimized = [optimize(ast) for ast in asts]
+    tokens = sum(count_tokens(p) for p in programs)
+    nodes = sum(count_nodes(ast) for ast in asts)
+    nbytes = sum(len(render(prog, case).encode('utf-8')) for prog, case in zip(optimized, cases))
+
+    def tokenize():
+        for p in programs:
+            t = Tokenizer(p)
+            while t.next() != EOF:
+                pass
+
+    def interpret_all(progs):
+        for prog, case in zip(progs, cases):
+            interpret(prog, Writer(StringWriter()), case.blocks, dict(case.scope))
+
+    timings = [
+        ("tokenize", tokens, "tokens/s", tokenize),
+        ("parse", nodes, "nodes/s", lambda: [parse(p) for p in programs]),
+        ("interpret", nbytes, "bytes/s", lambda: interpret_all(asts)),
+        ("optimized", nbytes, "bytes/s", lambda: interpret_all(optimized)),
+    ]
+    print(f"{label} ({len(cases)} program(s), {sum(map(len, programs))} characters)")
+    for name, amount, unit, fn in timings:
+        seconds = min(timeit.repeat(fn, number=1, repeat=repeat))
+        print(f"  {name:<10} {seconds * 1000:10.3f}ms  {rate(amount, seconds)} {unit}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=10, help="number of timed runs (best is reported)")
+    parser.add_argument('--scale', type=int, default=100, help="size of the stress templates")
+    parser.add_argument('--only', metavar='NAME', help="only run benchmarks whose label contains NAME")
+    args = parser.parse_args()
+
+    suites = [("corpus", list(corpus()))]
+    suites.extend((case.name, [case]) for case in (gen(args.scale) for gen in STRESS))
+    for label, cases in suites:
+        if args.only and args.only not in label:
+            continue
+        bench(label, cases, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""
+Compile throughput of `gwrite compile` on a generated project.
+
+Generates a synthetic project (see `generate_project`) and times complete
+`gwrite compile` runs, single-core (1 process) and MP (2+ processes), for
+each number of worker processes given. Results are saved as JSON, pass a
+previous result file using `--compare` to report the change of every
+measurement, e.g. between two commits:
+
+    git checkout old && python setup.py build_ext --inplace
+    python benchmarks/bench_compile.py --out old.json
+    git checkout new && python setup.py build_ext --inplace
+    python benchmarks/bench_compile.py --out new.json --compare old.json
+
+Measurements are comparable if the project parameters match, these are
+saved with the results. Run from the repository root after compiling the
+extensions.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from os.path import dirname, abspath, join
+
+ROOT = dirname(dirname(abspath(__file__)))
+# report measurements changing by more than this fraction
+THRESHOLD = 0.1
+
+CONF = """\
+logging:
+  level: warning
+parser:
+  processes: {processes}
+  include_patterns:
+    - '.*\\.c$'
+  search_paths:
+    - snippets
+"""
+
+# `complexity` is the number of fields of the generated struct and the
+# number of rows rendered per field, see `snippet_module`
+COMPONENTS = '''\
+from ghostwriter.utils.cogen.component import Component
+from ghostwriter.utils.cogen.snippet import snippet
+
+
+class Field(Component):
+    template = """
+    % if self.doc
+    /* << self.doc >> */
+    % /if
+    << self.typ >> << self.name >>;
+    """
+
+    def __init__(self, name, typ, doc):
+        self.name = name
+        self.typ = typ
+        self.doc = doc
+
+
+class Struct(Component):
+    template = """
+    struct << self.name >> {
+        % for field in self.fields
+        % r field
+        % /r
+        % /for
+    };
+
+    static const char *<< self.name >>_names[] = {
+        % for row in self.rows
+        "<< row[0] >>_<< row[1] >>", /* << self.fmt(row[1]) >> */
+        % /for
+    };
+    """
+
+    def __init__(self, name, complexity):
+        self.name = name
+        self.fields = [Field(f"f{n}", "int" if n % 2 else "long", f"field {n}" if n % 3 else None)
+                       for n in range(complexity)]
+        self.rows = [(f"f{n}", m) for n in range(complexity) for m in range(complexity)]
+        self.fmt = hex
+'''
+
+SNIPPET = '''
+
+@snippet()
+def snip{n}():
+    return Struct("s{n}", {complexity})
+'''
+
+
+def snippet_module(snippets: int, complexity: int) -> str:
+    return COMPONENTS + "".join(SNIPPET.format(n=n, complexity=complexity) for n in range(snippets))
+
+
+def source_file(fqn: str, lines: int, snippets: int, fileno: int) -> str:
+    filler = [f"int filler_{fileno}_{n} = {n}; /* some unrelated code */" for n in range(lines)]
+    # spread snippets evenly over the file
+    step = max(1, lines // (snippets + 1))
+    out = []
+    for n in range(snippets):
+        out.extend(filler[n * step:(n + 1) * step])
+        out.append(f"/* <@@{fqn}.snip{n}@@> */")
+        out.append(f"/* <@@/{fqn}.snip{n}@@> */")
+    out.extend(filler[snippets * step:])
+    return "\n".join(out) + "\n"
+
+
+def generate_project(root: str, files: int, lines: int, snippets: int, complexity: int, depth: int) -> None:
+    """Generate project in `root`.
+
+    Parameters
+    ----------
+    files:
+        number of source files, spread over 10 directories
+    lines:
+        lines of code per file, excluding snippets
+    snippets:
+        snippets per file, each rendering a distinct component
+    complexity:
+        size of each component (fields and loop iterations)
+    depth:
+        package depth of the snippet module below the search path
+    """
+    packages = [f"pkg{n}" for n in range(depth)]
+    pkg_dir = join(root, "snippets", *packages)
+    os.makedirs(pkg_dir)
+    for n in range(len(packages)):
+        open(join(root, "snippets", *packages[:n + 1], "__init__.py"), "w").close()
+    with open(join(pkg_dir, "gen.py"), "w") as fh:
+        fh.write(snippet_module(snippets, complexity))
+    fqn = ".".join(packages + ["gen"])
+    for n in range(files):
+        src_dir = join(root, "src", f"d{n % 10}")
+        os.makedirs(src_dir, exist_ok=True)
+        with open(join(src_dir, f"f{n}.c"), "w") as fh:
+            fh.write(source_file(fqn, lines, snippets, n))
+
+
+def project_bytes(root: str) -> int:
+    total = 0
+    for dirpath, _, fnames in os.walk(join(root, "src")):
+        total += sum(os.path.getsize(join(dirpath, fname)) for fname in fnames)
+    return total
+
+
+def gwrite_compile(root: str) -> float:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.environ.get('PYTHONPATH', '')]))
+    t_start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-m", "ghostwriter", "compile", "--no-server", "--project", root],
+                          env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    elapsed = time.perf_counter() - t_start
+    # snippet errors are logged but do not change the exit status
+    if proc.returncode != 0 or "error(s) in" in proc.stdout:
+        raise RuntimeError(f"compile failed:\n{proc.stdout}")
+    return elapsed
+
+
+def measure(root: str, processes: int, repeat: int, num_files: int) -> dict:
+    with open(join(root, "ghostwriter.conf.yml"), "w") as fh:
+        fh.write(CONF.format(processes=processes))
+    # the first compile expands the snippets, subsequent compiles rewrite the same output
+    gwrite_compile(root)
+    nbytes = project_bytes(root)
+    times = [gwrite_compile(root) for _ in range(repeat)]
+    best = min(times)
+    return {
+        'mode': "single-core" if processes == 1 else "mp",
+        'processes': processes,
+        'best_s': best,
+        'median_s': statistics.median(times),
+        'files_per_s': num_files / best,
+        'bytes_per_s': nbytes / best,
+        'output_bytes': nbytes,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, universal_newlines=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results: dict, baseline: dict) -> int:
+    """Print the change of each measurement against `baseline`, return the number of regressions."""
+    if results['params'] != baseline['params']:
+        print(f"warning: project parameters differ from baseline ({baseline['params']})")
+    old = {(r['mode'], r['processes']): r for r in baseline['results']}
+    regressions = 0
+    print(f"\ncompared to {baseline.get('commit') or '?'} ({baseline['date']}):")
+    for r in results['results']:
+        prev = old.get((r['mode'], r['processes']))
+        if prev is None:
+            continue
+        change = r['best_s'] / prev['best_s'] - 1
+        flag = ""
+        if change > THRESHOLD:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -THRESHOLD:
+            flag = "  improvement"
+        print(f"  {r['mode']:<12} {r['processes']:>3} proc  {prev['best_s']:8.3f}s -> {r['best_s']:8.3f}s"
+              f"  ({change * 100:+6.1f}%){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--files', type=int, default=200, help="number of source files")
+    parser.add_argument('--lines', type=int, default=200, help="lines of code per file (excluding snippets)")
+    parser.add_argument('--snippets', type=int, default=4, help="snippets per file")
+    parser.add_argument('--complexity', type=int, default=8, help="fields and loop iterations per component")
+    parser.add_argument('--depth', type=int, default=3, help="package depth of the snippet module")
+    parser.add_argument('--workers', default="1,2,4", help="comma-separated numbers of processes, 1 is single-core")
+    parser.add_argument('--repeat', type=int, default=3, help="number of timed runs (best is reported)")
+    parser.add_argument('--out', help="write results (JSON) to this file")
+    parser.add_argument('--compare', metavar='JSON', help="compare with results of an earlier run")
+    parser.add_argument('--keep', metavar='DIR', help="generate the project in DIR and keep it")
+    args = parser.parse_args()
+
+    params = {'files': args.files, 'lines': args.lines, 'snippets': args.snippets,
+              'complexity': args.complexity, 'depth': args.depth}
+    root = args.keep or tempfile.mkdtemp(prefix="gw-bench-")
+    try:
+        generate_project(root, **params)
+        print(f"project: {root} ({', '.join(f'{k}: {v}' for k, v in params.items())})\n")
+        measurements = []
+        for processes in (int(n) for n in args.workers.split(',')):
+            m = measure(root, processes, args.repeat, args.files)
+            measurements.append(m)
+            print(f"  {m['mode']:<12} {processes:>3} proc  {m['best_s']:8.3f}s  "
+                  f"{m['files_per_s']:8.1f} files/s  {m['bytes_per_s'] / 2 ** 20:7.2f} MiB/s")
+    finally:
+        if not args.keep:
+            shutil.rmtree(root)
+
+    results = {
+        'commit': git_commit(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'params': params,
+        'repeat': args.repeat,
+        'results': measurements,
+    }
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(results, fh, indent=2)
+    if args.compare:
+        with open(args.compare) as fh:
+            if compare(results, json.load(fh)):
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
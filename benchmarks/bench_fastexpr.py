@@ -0,0 +1,62 @@
+"""
+Evaluation of simple template expressions, directly or using `eval`.
+
+Renders a loop whose body holds attribute accesses, indexing and calls (see
+`ghostwriter.utils.cogen.fastexpr`) with direct evaluation enabled and
+disabled. Run from the repository root after compiling the extensions:
+
+    python benchmarks/bench_fastexpr.py [--rows N] [--repeat N]
+"""
+import argparse
+import sys
+import timeit
+from os.path import dirname, abspath
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from ghostwriter.utils.iwriter import StringWriter
+from ghostwriter.utils.cogen.tokenizer import Tokenizer
+from ghostwriter.utils.cogen.parser import CogenParser
+from ghostwriter.utils.cogen.interpreter import interpret, set_fast_eval, Writer
+
+
+class Row:
+    def __init__(self, n: int):
+        self.name = f"row{n}"
+        self.fields = [n, n * 2]
+        self.n = n
+
+
+TEMPLATE = """\
+% for row in rows
+<< row.name >> = << row.fields[0] >>, << fmt(row.n) >>
+% if row.n
+<< row.fields[1] >>
+% /if
+% /for
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50_000, help="number of loop iterations")
+    parser.add_argument('--repeat', type=int, default=5, help="number of timed runs (best is reported)")
+    args = parser.parse_args()
+
+    scope = {'rows': [Row(i) for i in range(args.rows)], 'fmt': hex}
+    prog = CogenParser(Tokenizer(TEMPLATE)).parse_program()
+    outputs = {}
+    print(f"rows: {args.rows}")
+    for label, enabled in (("eval", False), ("fastexpr", True)):
+        set_fast_eval(enabled)
+        outputs[label] = StringWriter()
+        interpret(prog, Writer(outputs[label]), {}, dict(scope))
+        best = min(timeit.repeat(lambda: interpret(prog, Writer(StringWriter()), {}, dict(scope)),
+                                 number=1, repeat=args.repeat))
+        print(f"  {label:<10} {best * 1000:8.1f}ms")
+    set_fast_eval(True)
+    assert outputs["eval"].getvalue() == outputs["fastexpr"].getvalue(), "outputs differ"
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Per-iteration overhead of template for-loops.
+
+Renders `% for a, b in rows` over a large number of rows, with an empty and
+a single-line loop body. `dict-generator` replays the former strategy of
+binding loop variables from a generated `{'a': a, 'b': b}` dict per row.
+Run from the repository root after compiling the extensions:
+
+    python benchmarks/bench_for_loop.py [--rows N] [--repeat N]
+"""
+import argparse
+import sys
+import timeit
+from os.path import dirname, abspath
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from testlib.bufferwriter import BufferWriter
+from ghostwriter.utils.iwriter import IWriter
+from ghostwriter.utils.cogen.tokenizer import Tokenizer
+from ghostwriter.utils.cogen.parser import CogenParser
+from ghostwriter.utils.cogen.interpreter import interpret, gen_loop_iterator, Writer
+from ghostwriter.utils.cogen.codegen import compile_program
+from ghostwriter.utils.cogen.scope import Scope
+
+
+def parse(template: str):
+    return CogenParser(Tokenizer(template)).parse_program()
+
+
+def dict_generator(scope: dict):
+    loop_scope = Scope(scope)
+    for bindings in gen_loop_iterator("a, b in rows", loop_scope, 1, 0):
+        loop_scope.update(bindings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000, help="number of loop iterations")
+    parser.add_argument('--repeat', type=int, default=5, help="number of timed runs (best is reported)")
+    args = parser.parse_args()
+
+    scope = {'rows': [(i, str(i)) for i in range(args.rows)]}
+    empty = parse("% for a, b in rows\n% /for\n")
+    line = parse("% for a, b in rows\n<<a>>: <<b>>\n% /for\n")
+
+    cases = [
+        ("empty body", [
+            ("dict-generator", lambda: dict_generator(scope)),
+            ("interpreter", lambda: interpret(empty, Writer(IWriter()), {}, dict(scope))),
+            ("codegen", lambda: compile_program(empty).render(Writer(IWriter()), {}, scope)),
+        ]),
+        ("single-line body", [
+            ("interpreter", lambda: interpret(line, Writer(BufferWriter()), {}, dict(scope))),
+            ("codegen", lambda: compile_program(line).render(Writer(BufferWriter()), {}, scope)),
+        ]),
+    ]
+    print(f"rows: {args.rows}\n")
+    for label, fns in cases:
+        print(label)
+        for name, fn in fns:
+            seconds = min(timeit.repeat(fn, number=1, repeat=args.repeat))
+            print(f"  {name:<20} {seconds * 1000:10.2f}ms  {seconds / args.rows * 1e9:8.1f}ns/iteration")
+
+
+if __name__ == '__main__':
+    main()
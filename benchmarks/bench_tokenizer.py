@@ -0,0 +1,66 @@
+"""
+Compare the streaming tokenizer against the array-backed `TokenBuffer`.
+
+Uses the templates of `testlib/programs.py` as corpus, run from the
+repository root after compiling the extensions:
+
+    python benchmarks/bench_tokenizer.py [--repeat N] [--scale N]
+"""
+import argparse
+import sys
+import timeit
+from os.path import dirname, abspath
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from testlib import programs as progs
+from ghostwriter.utils.cogen.tokenizer import Tokenizer, TokenBuffer, TokenFactory
+
+EOF = TokenFactory.eof()
+
+
+def corpus():
+    return [case.program for case in vars(progs).values() if isinstance(case, progs.TestCase)]
+
+
+def tokenize(prog: str):
+    t = Tokenizer(prog)
+    while t.next() != EOF:
+        pass
+
+
+def report(label: str, seconds: float, baseline: float):
+    print(f"  {label:<28} {seconds * 1000:10.2f}ms  ({baseline / seconds:5.2f}x)")
+
+
+def bench(label: str, fns, repeat: int):
+    print(label)
+    baseline = None
+    for name, fn in fns:
+        seconds = min(timeit.repeat(fn, number=1, repeat=repeat))
+        baseline = baseline or seconds
+        report(name, seconds, baseline)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help="number of timed runs (best is reported)")
+    parser.add_argument('--scale', type=int, default=100, help="times to repeat the corpus in the large program")
+    args = parser.parse_args()
+
+    programs = corpus()
+    large = '\n'.join(programs * args.scale)
+    print(f"corpus: {len(programs)} programs, large program: {len(large)} characters\n")
+
+    bench("tokenize corpus", [
+        ("Tokenizer", lambda: [tokenize(p) for p in programs]),
+        ("TokenBuffer", lambda: [TokenBuffer(p) for p in programs]),
+    ], args.repeat)
+    bench("tokenize large program", [
+        ("Tokenizer", lambda: tokenize(large)),
+        ("TokenBuffer", lambda: TokenBuffer(large)),
+    ], args.repeat)
+
+
+if __name__ == '__main__':
+    main()
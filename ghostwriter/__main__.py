@@ -4,16 +4,12 @@ import sys
 from pathlib import Path
 from functools import wraps
 import click
-from ghostwriter.cli import conf
 from ghostwriter.cli.log import configure_logging, CLI_LOGGER_NAME
-from ghostwriter.cli.cliutils import *
-import ghostwriter.cli.compile as cli_compile
-from ghostwriter.cli.init import cli_init
 from ghostwriter.utils.constants import *
-import colorama as clr
 
-
-clr.init()
+# Modules needed by only some commands (configuration, compiler, colored
+# output) are imported by the commands themselves, keeping start-up fast
+# for e.g. '--version' and '--help'.
 
 
 def valid_directory(ctx, param, val):
@@ -27,13 +23,35 @@ def valid_directory(ctx, param, val):
 @click.pass_context
 def cli(ctx):
     # Basic initialization needed for any command goes here
-    # NOTE: is run before eager commands like'--help'.
+    # NOTE: is NOT run before eager commands like '--help'.
+    import colorama as clr
+    clr.init()
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s: %(message)s',
         datefmt='%H:%M:%S')
 
 
+def load_project_config():
+    """Load configuration of the project (the working directory), exiting on errors."""
+    import colorama as clr
+    from ghostwriter.cli import conf
+    from ghostwriter.cli.cliutils import echo_err, pretty_print
+    project = Path('.').absolute()
+    logging.getLogger(CLI_LOGGER_NAME).info(f"Loading configuration from '{project}'")
+    try:
+        config = conf.load(project)
+    except conf.ConfigurationNotFoundError as e:
+        click.echo(f"{clr.Style.BRIGHT}{clr.Fore.RED}✖{clr.Style.RESET_ALL} Could not find '{conf.CONF_NAME}' in '{e.project_dir}'")
+        sys.exit(1)
+    except conf.ConfigurationFileInvalidError as e:
+        click.echo(pretty_print(e.errors))
+        echo_err("Errors detected in configuration file. Please correct these and try again")
+        sys.exit(1)
+    configure_logging(config)
+    return config
+
+
 def command(load_config=False, **click_options):
     """Create a new top-level CLI command.
 
@@ -62,21 +80,8 @@ def command(load_config=False, **click_options):
             # relative to the project-root.
             os.chdir(project)
 
-            log = logging.getLogger(CLI_LOGGER_NAME)
-
             if load_config:
-                log.info(f"Loading configuration from '{project}'")
-                try:
-                    config = conf.load(Path('.').absolute())
-                    configure_logging(config)
-                    return fn(config, *args, **kwargs)
-                except conf.ConfigurationNotFoundError as e:
-                    click.echo(f"{clr.Style.BRIGHT}{clr.Fore.RED}✖{clr.Style.RESET_ALL} Could not find '{conf.CONF_NAME}' in '{e.project_dir}'")
-                    sys.exit(1)
-                except conf.ConfigurationFileInvalidError as e:
-                    click.echo(pretty_print(e.errors))
-                    echo_err("Errors detected in configuration file. Please correct these and try again")
-                    sys.exit(1)
+                return fn(load_project_config(), *args, **kwargs)
             else:
                 return fn(*args, **kwargs)
         return wrapper
@@ -85,6 +90,9 @@ def command(load_config=False, **click_options):
 
 @command(load_config=False, help="create config file and snippets directories")
 def init():
+    from ghostwriter.cli import conf
+    from ghostwriter.cli.cliutils import echo_err
+    from ghostwriter.cli.init import cli_init
     conf_path = Path(".", conf.CONF_NAME)
     if conf_path.exists():
         echo_err(f"cannot initialize directory - '{conf.CONF_NAME}' already exists")
@@ -92,11 +100,28 @@ def init():
     cli_init(conf_path)
 
 
-@command(load_config=True, help="parse files and expand any snippets")
+@command(load_config=True, help="keep ghostwriter loaded, serving compile requests of this project")
+def server(config):
+    from ghostwriter.cli.server import serve
+    serve(config)
+
+
+@command(help="parse files and expand any snippets")
 @click.option('--watch/--no-watch', envvar="GHOSTWRITER_WATCH", default=False, show_default=True,
               help="recompile snippets on file changes")
-def compile(config, watch):
-    cli_compile.compile(config, watch)
+@click.option('--profile', 'profile_dir', type=click.Path(file_okay=False), default=None,
+              help="profile rendering, writing collapsed stacks for flame graphs to this directory")
+@click.option('--server/--no-server', 'use_server', envvar="GHOSTWRITER_SERVER", default=True, show_default=True,
+              help="compile using the project's compile server, if running")
+def compile(watch, profile_dir, use_server):
+    if use_server and not watch and not profile_dir:
+        from ghostwriter.cli.server import remote_compile
+        status = remote_compile()
+        if status is not None:
+            sys.exit(status)
+    config = load_project_config()
+    import ghostwriter.cli.compile as cli_compile
+    cli_compile.compile(config, watch, os.path.abspath(profile_dir) if profile_dir else None)
     sys.exit(0)
 
 
@@ -1,3 +1,4 @@
+import typing as t
 import logging
 from ghostwriter.cli.conf import Configuration
 from ghostwriter.utils.compile import cli_compile
@@ -6,5 +7,5 @@ from ghostwriter.utils.compile import cli_compile
 log = logging.getLogger(__name__)
 
 
-def compile(config: Configuration, watch: bool) -> None:
-    cli_compile(config, watch)
+def compile(config: Configuration, watch: bool, profile_dir: t.Optional[str] = None) -> None:
+    cli_compile(config, watch, profile_dir)
@@ -8,6 +8,12 @@ import io
 import logging
 from ghostwriter.utils import spec as s
 
+try:
+    # use the (much faster) libyaml bindings if available
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
 log = logging.getLogger(__file__)
 
 CONF_NAME = "ghostwriter.conf.yml"
@@ -30,6 +36,11 @@ def _natint(value):
     return value if value > 0 else False
 
 
+def _nonnegint(value):
+    value = int(value)
+    return value if value >= 0 else False
+
+
 def _nonempty(value):
     try:
         return value if len(value) != 0 else False
@@ -66,7 +77,7 @@ def _py_import_path(value):
 
 def pp_log_conf(config: t.Mapping[str, t.Any]):
     with io.StringIO() as sbuf:
-        yaml.safe_dump(config, sbuf, default_flow_style=False, sort_keys=False)
+        yaml.dump(config, sbuf, Dumper=SafeDumper, default_flow_style=False, sort_keys=False)
         sbuf.flush()
         log.info("configuration used:\n" + '\n'.join([f"   {line}" for line in sbuf.getvalue().split('\n')]))
 
@@ -119,6 +130,7 @@ GW_CONF_PARSER_SPEC = s.keys({
     'close': s.opt(s.str, '@@>'),
     'processes': s.opt(s.predicate(_natint, 'positive int'), cpu_count()),
     'temp_file_suffix': s.opt(s.str, '.gw.tmp'),
+    'max_errors': s.opt(s.predicate(_nonnegint, 'non-negative int'), 0),
     'include_patterns': s.req(s.seqof(s.str)),
     'ignore_patterns': s.opt(s.seqof(s.str), []),
     'ignore_dir_patterns': s.opt(s.seqof(s.str), []),
@@ -141,10 +153,10 @@ GW_CONF_SPEC = s.keys({
 # TODO: improve - in particular, the error formatting needs to show the data and
 #       the error
 class SpecError(GhostwriterConfigurationError):
-    def __init__(self, spec: s.Spec, value: t.Any):
+    def __init__(self, spec: s.Spec, value: t.Any, errors: t.Any = None):
         self.spec = spec
         self.value = value
-        self.errors = s.explain(spec, value)
+        self.errors = errors if errors is not None else s.explain(spec, value)
         super().__init__(f"value failed to conform to spec: {self.errors}")
 
     def __repr__(self):
@@ -152,9 +164,8 @@ class SpecError(GhostwriterConfigurationError):
 
 
 class ConfLogging:
+    # `conf` must be conformed to GW_CONF_LOGGING_SPEC
     def __init__(self, conf):
-        if not s.valid(GW_CONF_LOGGING_SPEC, conf):
-            raise SpecError(GW_CONF_LOGGING_SPEC, conf)
         self.level: str = conf['level']
         self.format: str = conf['format']
         self.datefmt: str = conf['datefmt']
@@ -166,16 +177,13 @@ class ConfLogging:
 
 
 class ConfParser:
+    # `conf` must be conformed to GW_CONF_PARSER_SPEC
     def __init__(self, conf):
-        conf_c = s.conform(GW_CONF_PARSER_SPEC, conf)
-        if conf_c == s.Invalid:
-            raise RuntimeError("LOLCAEK")
-        if not s.valid(GW_CONF_PARSER_SPEC, conf):
-            raise SpecError(GW_CONF_PARSER_SPEC, conf)
         self.open = conf['open']
         self.close = conf['close']
         self.processes = conf['processes']
         self.temp_file_suffix = conf['temp_file_suffix']
+        self.max_errors = conf['max_errors']
         self.include_patterns = conf['include_patterns']
         self.ignore_patterns = conf['ignore_patterns']
         self.ignore_dir_patterns = conf['ignore_dir_patterns']
@@ -186,6 +194,7 @@ class ConfParser:
         return (f"{type(self).__name__}<"
                 f"open: {self.open}, close: {self.close}, "
                 f"processes: {self.processes}, "
+                f"max_errors: {self.max_errors}, "
                 f"include_patterns: {self.include_patterns}, "
                 f"ignore_patterns: {self.ignore_patterns}, "
                 f"ignore_dir_patterns: {self.ignore_dir_patterns}, "
@@ -194,9 +203,8 @@ class ConfParser:
 
 
 class Configuration:
+    # `conf` must be conformed to GW_CONF_SPEC, see `load`
     def __init__(self, project: Path, conf: dict):
-        if not s.valid(GW_CONF_SPEC, conf):
-            raise SpecError(GW_CONF_SPEC, conf)
         self.project: Path = project
         self.logging = ConfLogging(conf['logging'])
         self.parser = ConfParser(conf['parser'])
@@ -223,16 +231,13 @@ def load(project: Path):
     conf_path = project.joinpath(CONF_NAME)
     try:
         with open(str(conf_path), 'r') as f:
-            config = yaml.safe_load(f)
-        if not s.valid(GW_CONF_SPEC, config):
-            raise ConfigurationFileInvalidError(GW_CONF_SPEC, config)
+            config = yaml.load(f, Loader=SafeLoader)
     except FileNotFoundError as e:
         raise ConfigurationNotFoundError(project) from e
     # except PermissionError
-    config_c = s.conform(GW_CONF_SPEC, config)
-    if config_c == s.Invalid:
-        # Should never happen here - we already validated the spec
-        ConfigurationFileInvalidError(GW_CONF_SPEC, config)
+    config_c = s.check(GW_CONF_SPEC, config)
+    if isinstance(config_c, s.Failure):
+        raise ConfigurationFileInvalidError(GW_CONF_SPEC, config, config_c.errors)
 
     pp_log_conf(config_c)
     return Configuration(project, config_c)
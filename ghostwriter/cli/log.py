@@ -1,10 +1,13 @@
 import logging
-from ghostwriter.cli.conf import Configuration
+import typing as t
+
+if t.TYPE_CHECKING:
+    from ghostwriter.cli.conf import Configuration
 
 CLI_LOGGER_NAME = "ghostwriter"
 
 
-def configure_logging(conf: Configuration) -> None:
+def configure_logging(conf: 'Configuration') -> None:
     """Reconfigure root logger to use formats and log level in `conf`."""
     root_logger = logging.getLogger()
     formatter = logging.Formatter(
@@ -0,0 +1,215 @@
+"""Compile server, keeping ghostwriter warm between compiles.
+
+`gwrite server` loads the configuration once and listens on a Unix domain
+socket in the project directory. While it runs, `gwrite compile` sends its
+request to the server instead of compiling itself, skipping interpreter
+start-up, configuration parsing and imports.
+
+In single-core mode, the server compiles in its own process such that
+imported snippet modules, compiled templates and cached data persist between
+compiles. Snippet modules are re-imported after files in the search paths
+change and the configuration is reloaded when its file changes. In MP mode,
+workers are forked from the server for each compile.
+
+The protocol is a single JSON-encoded request and response per connection,
+each terminated by a newline.
+"""
+import typing as t
+import json
+import logging
+import os
+import socket
+import sys
+from time import time
+
+if t.TYPE_CHECKING:
+    from ghostwriter.cli.conf import Configuration
+
+log = logging.getLogger(__name__)
+
+# created in the project directory, the working directory of both client and server
+SOCKET_NAME = ".ghostwriter.sock"
+# max. time to wait for the server to accept a connection
+CONNECT_TIMEOUT = 1.0
+
+
+def _send(conn: socket.socket, msg: dict) -> None:
+    conn.sendall(json.dumps(msg).encode('utf-8') + b"\n")
+
+
+def _recv(conn: socket.socket) -> t.Optional[dict]:
+    chunks = []
+    while True:
+        chunk = conn.recv(65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        if chunk.endswith(b"\n"):
+            break
+    data = b"".join(chunks)
+    return json.loads(data.decode('utf-8')) if data else None
+
+
+def request(msg: dict, sock_path: str = SOCKET_NAME) -> t.Optional[dict]:
+    """Send `msg` to the server, return its response or None if no server is running."""
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.settimeout(CONNECT_TIMEOUT)
+        try:
+            conn.connect(sock_path)
+        except (FileNotFoundError, ConnectionRefusedError, socket.timeout):
+            return None
+        # compiling may take any amount of time
+        conn.settimeout(None)
+        _send(conn, msg)
+        return _recv(conn)
+    finally:
+        conn.close()
+
+
+def remote_compile(sock_path: str = SOCKET_NAME) -> t.Optional[int]:
+    """Compile using the server, if running, and return the exit status (None if no server is running)."""
+    if not os.path.exists(sock_path):
+        return None
+    response = request({'cmd': 'compile'}, sock_path)
+    if response is None:
+        return None
+    for line in response.get('log', []):
+        print(line, file=sys.stderr)
+    if response['status'] != 'ok':
+        print(f"compile server: {response.get('error')}", file=sys.stderr)
+        return 1
+    return 0
+
+
+class LogCapture(logging.Handler):
+    """Collects formatted log records, sent to the client as the output of its compile."""
+    def __init__(self, formatter: t.Optional[logging.Formatter]):
+        super().__init__()
+        self.lines: t.List[str] = []
+        if formatter is not None:
+            self.setFormatter(formatter)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.lines.append(self.format(record))
+
+
+class CompileServer:
+    def __init__(self, config: 'Configuration'):
+        from ghostwriter.cli.conf import CONF_NAME
+        self.project = config.project
+        self.conf_path = self.project.joinpath(CONF_NAME)
+        self.conf_mtime = self.conf_path.stat().st_mtime_ns
+        self.compiles = 0
+        self.configure(config)
+
+    def configure(self, config: 'Configuration') -> None:
+        from ghostwriter.parser.fileparser import ShouldReplaceFileAlways
+        from ghostwriter.utils.cwatch import CompileWatcher, SearchPathsWatcher
+        from ghostwriter.utils.compile import InProcessCompileFn, MultiCoreCompileFn
+        self.config = config
+        root_path = config.project.absolute().as_posix()
+        watcher = CompileWatcher(root_path, config=config)
+        if config.parser.processes == 1:
+            self.compiler = InProcessCompileFn(config.parser, watcher, ShouldReplaceFileAlways())
+        else:
+            self.compiler = MultiCoreCompileFn(config.parser, watcher, ShouldReplaceFileAlways())
+        self.snippet_watchers = [SearchPathsWatcher(path) for path in config.parser.search_paths]
+
+    def refresh(self) -> None:
+        """Reload configuration and snippet modules which changed since the last compile."""
+        from ghostwriter.cli import conf
+        mtime = self.conf_path.stat().st_mtime_ns
+        if mtime != self.conf_mtime:
+            log.info("configuration changed, reloading")
+            self.conf_mtime = mtime
+            forget_snippets(self.config.parser.search_paths)
+            self.configure(conf.load(self.project))
+            return
+        if any([watcher.check() for watcher in self.snippet_watchers]):
+            log.info("snippets changed, reloading")
+            forget_snippets(self.config.parser.search_paths)
+
+    def compile(self) -> dict:
+        root = logging.getLogger()
+        capture = LogCapture(root.handlers[0].formatter if root.handlers else None)
+        root.addHandler(capture)
+        t_start = time()
+        try:
+            self.refresh()
+            self.compiler.apply()
+            self.compiles += 1
+            return {'status': 'ok', 'files': self.compiler.num_files,
+                    'elapsed': time() - t_start, 'log': capture.lines}
+        except Exception as e:
+            log.exception("compile failed")
+            return {'status': 'error', 'error': f"{type(e).__name__}: {e}", 'log': capture.lines}
+        finally:
+            root.removeHandler(capture)
+
+    def handle(self, msg: t.Optional[dict]) -> dict:
+        cmd = msg.get('cmd') if isinstance(msg, dict) else None
+        if cmd == 'compile':
+            return self.compile()
+        elif cmd == 'ping':
+            return {'status': 'ok', 'pid': os.getpid(), 'compiles': self.compiles}
+        elif cmd == 'stop':
+            return {'status': 'ok'}
+        return {'status': 'error', 'error': f"unknown command '{cmd}'"}
+
+    def serve(self, sock_path: str = SOCKET_NAME) -> None:
+        """Handle requests, one at a time, until asked to stop."""
+        if os.path.exists(sock_path):
+            if request({'cmd': 'ping'}, sock_path) is not None:
+                raise RuntimeError(f"a compile server is already running ('{sock_path}')")
+            # left behind by a server which did not exit cleanly
+            os.remove(sock_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            listener.bind(sock_path)
+            listener.listen()
+            log.info(f"compile server listening on '{os.path.abspath(sock_path)}'")
+            while True:
+                conn, _ = listener.accept()
+                with conn:
+                    try:
+                        msg = _recv(conn)
+                    except ValueError:
+                        msg = None
+                    response = self.handle(msg)
+                    try:
+                        _send(conn, response)
+                    except OSError as e:
+                        log.warning(f"failed to send response: {e}")
+                if isinstance(msg, dict) and msg.get('cmd') == 'stop':
+                    break
+        finally:
+            listener.close()
+            os.remove(sock_path)
+        log.info("compile server stopped")
+
+
+def forget_snippets(search_paths: t.List[str]) -> None:
+    """Remove modules loaded from `search_paths`, such that they are imported anew."""
+    from importlib import invalidate_caches
+    from ghostwriter.utils import resolv
+    from ghostwriter.utils.cogen import rendercache, interpreter
+    prefixes = tuple(os.path.join(path, '') for path in search_paths)
+    for name, module in list(sys.modules.items()):
+        fpath = getattr(module, '__file__', None)
+        if fpath and fpath.startswith(prefixes):
+            del sys.modules[name]
+    invalidate_caches()
+    # resolved snippets of removed modules are already stale, failures may no longer occur
+    resolv.clear_cache()
+    # cached output of components defined by the old modules is stale
+    rendercache.clear()
+    # as are compiled expressions and loops only used by their templates
+    interpreter.clear_caches()
+
+
+def serve(config: 'Configuration') -> None:
+    import signal
+    # exit cleanly, removing the socket
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    CompileServer(config).serve()
@@ -80,6 +80,7 @@ cdef class FileWriter(IWriter):
     cdef FILE *out
     cdef wcsenc_t *encoder
     cdef bint got_newline
+    cdef readonly size_t bytes_written
     cpdef void write(self, str s)
 
     @staticmethod
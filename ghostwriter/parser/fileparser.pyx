@@ -9,8 +9,9 @@ from posix.unistd cimport (ftruncate)
 from os import replace as os_replace, remove as os_remove
 import logging
 import colorama as clr
-from ghostwriter.utils.iwriter cimport IWriter
+from ghostwriter.utils.iwriter cimport IWriter, BufferedWriter
 from ghostwriter.utils.error cimport error_message, error_details
+from ghostwriter.utils.dataload import load_yaml, load_json
 
 
 log = logging.getLogger(__name__)
@@ -321,9 +322,10 @@ cdef class FileWriter(IWriter):
     cpdef void write(self, str contents):
         cdef:
             wchar_t *s_ptr = contents
-            int ret = file_write(self.out, self.encoder, s_ptr, len(contents))
-        if ret:
+            Py_ssize_t written = file_write_n(self.out, self.encoder, s_ptr, len(contents))
+        if written < 0:
             raise GhostwriterError("failed to write to file")
+        self.bytes_written += written
         self.got_newline = contents.endswith('\n')
 
     def __repr__(self):
@@ -340,6 +342,7 @@ cdef class FileWriter(IWriter):
         # Empty snippets need no additional newline, the tags will appear on
         # separate lines by default.
         w.got_newline = True
+        w.bytes_written = 0
         return w
 
 ################################################################################
@@ -351,6 +354,14 @@ cdef class Context:
         self.env = {}
         self.on_snippet = cb
 
+    def load_yaml(self, str fpath):
+        """Load YAML file `fpath`, parsed once per process while unchanged (see `dataload`)."""
+        return load_yaml(fpath)
+
+    def load_json(self, str fpath):
+        """Load JSON file `fpath`, parsed once per process while unchanged (see `dataload`)."""
+        return load_json(fpath)
+
 ################################################################################
 ## Parser
 ################################################################################
@@ -359,7 +370,8 @@ DEF BUF_SNIPPET_NAME_LEN = 80
 DEF BUF_INDENT_BY_LEN = 40
 
 
-cdef inline int file_write(FILE *fh, wcsenc_t *encoder, wchar_t *str, size_t strlen) nogil:
+cdef inline Py_ssize_t file_write_n(FILE *fh, wcsenc_t *encoder, wchar_t *str, size_t strlen) nogil:
+    """Encode and write string, returns the number of bytes written or -1 on error."""
     cdef:
         size_t encoded = WCS_WRITE_ERROR
         size_t written = 0
@@ -371,7 +383,11 @@ cdef inline int file_write(FILE *fh, wcsenc_t *encoder, wchar_t *str, size_t str
     if written != encoded:
         perror("Write failed. Failed to write encoded string to file")
         return -1
-    return 0
+    return <Py_ssize_t>written
+
+
+cdef inline int file_write(FILE *fh, wcsenc_t *encoder, wchar_t *str, size_t strlen) nogil:
+    return 0 if file_write_n(fh, encoder, str, strlen) >= 0 else -1
 
 
 def parse_result_err(PARSE_RES res) -> t.Tuple[str, str]:
@@ -660,22 +676,34 @@ cdef class Parser:
         cdef:
             wchar_t buf = '\0'
             FileWriter fw = FileWriter.from_handle(self.fh_out, self.encoder)
+            # rendered snippets consist of many small writes, encode & write them in large blocks instead
+            BufferedWriter bw = BufferedWriter(fw)
             str prefix = self.snippet_indent.ptr
             str snippet = self.snippet_start.cstr.ptr
+            bint flushed = False
         try:
-            ctx.on_snippet.apply(ctx, snippet, prefix, fw)
+            ctx.on_snippet.apply(ctx, snippet, prefix, bw)
+            bw.flush()
+            flushed = True
         except Exception as e:
             # log.error(f"{clr.Style.BRIGHT}{clr.Fore.RED}Fatal error expanding snippet '{clr.Fore.MAGENTA}{snippet}{clr.Fore.RED}'{clr.Style.RESET_ALL}")
             # log_snippet_error(e, snippet, ctx.src)
             # raise e
             raise SnippetError(e, snippet, ctx.src, self.line_num)
         finally:
+            if not flushed:
+                # write out what was rendered before the error, without masking the error itself
+                try:
+                    bw.flush()
+                except Exception:
+                    log.debug("snippet '%s': failed to flush output after error", snippet, exc_info=True)
             if fflush(fw.out) != 0:
                 log.debug("Failed to flush file buffer - some contents may be missing.")
+            log.debug("snippet '%s': wrote %d bytes in %d flush(es)", snippet, fw.bytes_written, bw.flushes)
 
             # ensure snippet ends with a newline
             # (so that snippet end line is printed properly)
-            if not fw.got_newline:
+            if not bw.got_newline:
                 file_write(self.fh_out, self.encoder, &NEWLINE, 1)
 
     cdef PARSE_RES doparse(self, Context ctx) nogil except PARSE_EXCEPTION:
@@ -0,0 +1,162 @@
+"""Support for asynchronous snippets.
+
+Snippets may be `async def` functions, and components returned by snippets
+may hold awaitables (e.g. a coroutine loading a schema) in their attributes,
+these are awaited before the component is rendered.
+
+Rendering itself is synchronous. Each (worker) process runs coroutines on its
+own event loop, see `run`. To let independent I/O run concurrently, the
+compiler calls `prefetch` with the files it is about to parse. This starts
+the async snippets used in those files ahead of time, such that they all
+progress while any one of them is awaited.
+"""
+import typing as t
+import inspect
+import logging
+from collections import deque
+from os import getpid
+from re import compile as re_compile, escape as re_escape
+from ghostwriter.utils.resolv import resolv
+
+if t.TYPE_CHECKING:
+    import asyncio
+    from ghostwriter.utils.cogen.component import Component
+# asyncio is imported on first use, most projects have no async snippets
+
+log = logging.getLogger(__name__)
+
+# Attribute set by `snippet` on the snippet function, referencing the `async def` function creating its component
+ASYNC_SNIPPET_ATTR = '__ghostwriter_snippet_async__'
+
+_loop: t.Optional['asyncio.AbstractEventLoop'] = None
+_loop_pid: int = 0
+# started tasks, per async snippet function, in the order their snippets appear
+_prefetched: t.Dict[t.Callable, t.Deque['asyncio.Task']] = {}
+# number of async snippets defined, files need not be scanned for snippets to prefetch if there are none
+_num_async_snippets = 0
+
+
+def register(fn: t.Callable[[], t.Awaitable]) -> None:
+    """Record that an async snippet using `fn` was defined, enabling `prefetch`."""
+    global _num_async_snippets
+    _num_async_snippets += 1
+
+
+def get_loop() -> 'asyncio.AbstractEventLoop':
+    """Return the event loop of this process, creating it if needed."""
+    global _loop, _loop_pid
+    # a loop inherited from the parent process (fork) must not be used
+    if _loop is None or _loop_pid != getpid() or _loop.is_closed():
+        import asyncio
+        _loop = asyncio.new_event_loop()
+        _loop_pid = getpid()
+        _prefetched.clear()
+    return _loop
+
+
+def run(awaitable: t.Awaitable) -> t.Any:
+    """Run `awaitable` to completion on this process' event loop and return its result."""
+    return get_loop().run_until_complete(awaitable)
+
+
+def close() -> None:
+    """Cancel prefetched tasks and close the event loop of this process."""
+    global _loop
+    if _loop is None or _loop_pid != getpid():
+        return
+    tasks = [task for tasks in _prefetched.values() for task in tasks]
+    _prefetched.clear()
+    for task in tasks:
+        task.cancel()
+    if tasks:
+        import asyncio
+        _loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+    _loop.close()
+    _loop = None
+
+
+def is_component(value: t.Any) -> bool:
+    # cannot import Component here, the snippet module depends on this module
+    return getattr(value, '__ghostwriter_component__', False) and not isinstance(value, type)
+
+
+def has_awaitables(component: 'Component') -> bool:
+    """True if any attribute of `component`, or of components it holds, is awaitable."""
+    for value in vars(component).values():
+        if inspect.isawaitable(value) or (is_component(value) and has_awaitables(value)):
+            return True
+    return False
+
+
+async def resolve(component: 'Component') -> 'Component':
+    """Replace awaitable attributes of `component` (and of components it holds) by their results.
+
+    All awaitables are awaited concurrently."""
+    names = []
+    pending = []
+    for name, value in vars(component).items():
+        if inspect.isawaitable(value):
+            names.append(name)
+            pending.append(value)
+        elif is_component(value):
+            pending.append(resolve(value))
+            names.append(None)
+    import asyncio
+    for name, result in zip(names, await asyncio.gather(*pending)):
+        if name is not None:
+            setattr(component, name, result)
+    return component
+
+
+async def _create(fn: t.Callable[[], t.Awaitable]) -> t.Any:
+    result = await fn()
+    if is_component(result):
+        await resolve(result)
+    return result
+
+
+def create(fn: t.Callable[[], t.Awaitable]) -> t.Any:
+    """Return the component of async snippet `fn`, using a prefetched result if available."""
+    tasks = _prefetched.get(fn)
+    if tasks:
+        task = tasks.popleft()
+        if not tasks:
+            del _prefetched[fn]
+        return run(task)
+    return run(_create(fn))
+
+
+def snippet_names(fpath: str, tag_open: str, tag_close: str) -> t.List[str]:
+    """Return the names of the snippets in file `fpath`, in order."""
+    rgx = re_compile(f"{re_escape(tag_open)}[ \\t]*([^/ \\t].*?)[ \\t]*{re_escape(tag_close)}")
+    try:
+        with open(fpath, 'r') as fh:
+            return [name for name in rgx.findall(fh.read()) if name]
+    except (OSError, UnicodeDecodeError):
+        return []
+
+
+def prefetch(fpaths: t.Iterable[str], tag_open: str, tag_close: str) -> int:
+    """Start the async snippets used in `fpaths`, return the number of tasks started.
+
+    Files must subsequently be parsed in the same order, such that each snippet
+    picks up the task started for it. Snippets which cannot be resolved are
+    skipped, they fail once expanded."""
+    started = 0
+    if not _num_async_snippets:
+        return started
+    loop = get_loop()
+    for fpath in fpaths:
+        for name in snippet_names(fpath, tag_open, tag_close):
+            try:
+                snippet_fn = resolv(name)
+            except Exception:
+                continue
+            fn = getattr(snippet_fn, ASYNC_SNIPPET_ATTR, None)
+            if fn is None:
+                continue
+            _prefetched.setdefault(fn, deque()).append(loop.create_task(_create(fn)))
+            started += 1
+    if started:
+        log.debug(f"prefetching {started} async snippet(s)")
+    return started
@@ -0,0 +1,87 @@
+import typing as t
+import logging
+import pickle
+from hashlib import sha1
+from os import environ, makedirs, replace as os_replace, remove as os_remove
+from os.path import expanduser, join as path_join
+from tempfile import NamedTemporaryFile
+from ghostwriter.utils.constants import GW_VERSION
+from ghostwriter.utils.cogen.parser import CogenParser, Program, AST_FORMAT
+from ghostwriter.utils.cogen.tokenizer import Tokenizer
+
+log = logging.getLogger(__name__)
+
+# Set to a directory to relocate the cache, set to an empty string to disable it.
+ENV_CACHE_DIR = "GHOSTWRITER_CACHE_DIR"
+
+
+def cache_dir() -> t.Optional[str]:
+    """Return the directory holding cached ASTs or None if caching is disabled.
+
+    Defaults to `$XDG_CACHE_HOME/ghostwriter/ast` (or `~/.cache/ghostwriter/ast`)
+    unless overridden by the `GHOSTWRITER_CACHE_DIR` environment variable."""
+    root = environ.get(ENV_CACHE_DIR)
+    if root is None:
+        root = path_join(environ.get("XDG_CACHE_HOME") or expanduser("~/.cache"), "ghostwriter")
+    elif root == "":
+        return None
+    return path_join(root, "ast")
+
+
+def cache_key(template: str) -> str:
+    """Compute cache key of a (deindented) template text.
+
+    The key includes the Ghostwriter version and the AST format because the
+    AST representation may change between releases, or within one (see
+    `parser.AST_FORMAT`)."""
+    hasher = sha1(f"{GW_VERSION}\0{AST_FORMAT}".encode('utf-8'))
+    hasher.update(b'\0')
+    hasher.update(template.encode('utf-8'))
+    return hasher.hexdigest()
+
+
+def load(template: str) -> t.Optional[Program]:
+    """Load previously cached AST of `template`, if any."""
+    dirpath = cache_dir()
+    if dirpath is None:
+        return None
+    try:
+        with open(path_join(dirpath, f"{cache_key(template)}.ast"), 'rb') as fh:
+            program = pickle.load(fh)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # corrupt or incompatible entry, re-parsing will overwrite it
+        log.debug("astcache: failed to load cached AST (%s: %s)", type(e).__qualname__, e)
+        return None
+    return program if isinstance(program, Program) else None
+
+
+def store(template: str, program: Program) -> None:
+    """Write AST of `template` to the cache.
+
+    Writes are atomic, several processes may safely store the same entry
+    concurrently. Failures are logged and otherwise ignored."""
+    dirpath = cache_dir()
+    if dirpath is None:
+        return
+    try:
+        makedirs(dirpath, exist_ok=True)
+        with NamedTemporaryFile(dir=dirpath, suffix='.tmp', delete=False) as fh:
+            pickle.dump(program, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            os_replace(fh.name, path_join(dirpath, f"{cache_key(template)}.ast"))
+        except OSError:
+            os_remove(fh.name)
+            raise
+    except OSError as e:
+        log.debug("astcache: failed to store AST (%s: %s)", type(e).__qualname__, e)
+
+
+def parse(template: str) -> Program:
+    """Parse template text into an AST, using the on-disk cache when possible."""
+    program = load(template)
+    if program is None:
+        program = CogenParser(Tokenizer(template)).parse_program()
+        store(template, program)
+    return program
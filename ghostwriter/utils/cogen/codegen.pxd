@@ -0,0 +1,29 @@
+# cython: language_level=3
+from ghostwriter.utils.cogen.parser cimport Program
+from ghostwriter.utils.cogen.interpreter cimport Writer, BodyEnvironment
+
+
+cdef class CompiledProgram:
+    cdef:
+        readonly str source
+        readonly str component
+        readonly str file_path
+        object main_code
+        list body_codes  # type: t.List[CodeType]
+        list eval_locations  # type: t.List[t.Tuple[int, int, str]]
+        list codes  # type: t.List[CodeType]
+        list errors  # type: t.List[t.Tuple[int, int, Error, Exception]]
+
+    cdef void _render(self, Writer w, dict blocks, object scope) except *
+    cpdef void render(self, Writer w, dict blocks, object scope) except *
+
+
+cdef class CompiledBody(BodyEnvironment):
+    cdef:
+        CompiledProgram program
+        object code
+
+
+cpdef CompiledProgram compile_program(Program program)
+cpdef CompiledProgram compile_component(object cls)
+cpdef void render_component(object component, Writer w, dict blocks) except *
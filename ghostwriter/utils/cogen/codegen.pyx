@@ -0,0 +1,449 @@
+# cython: language_level=3
+"""Compile template ASTs into Python functions.
+
+An alternative to `interpreter.interpret`: rather than walking the AST on
+every render, each Program is translated once into Python source which writes
+the literals, evaluates the expressions and runs the if/for/component blocks
+directly. Rendered output and the errors raised (including the line/column
+information of `InterpStackTrace`) are the same as the interpreter's.
+
+Generated functions are instantiated per render with the template's scope as
+their globals, so expressions resolve names exactly like `exec` does in the
+interpreter. Loop variables are declared `global`, written to the scope and
+restored once the loop ends.
+"""
+import ast
+import sys
+from keyword import iskeyword
+from types import FunctionType
+from ghostwriter.utils.cogen.component import Component
+from ghostwriter.utils.cogen.parser cimport Program, Block, If, Line, Literal, Expr, Chunk, Node
+from ghostwriter.utils.cogen.interpreter cimport (
+    Writer, BodyEnvironment, InterpStackTrace, EvalError, RenderArgTypeError,
+    UnknownNodeType, UnknownBlockType, trim_eval_frames,
+    capture_writer, replay_render, store_render, get_profiler
+)
+from ghostwriter.utils.cogen.profiler cimport RenderProfiler
+from ghostwriter.utils.cogen.profiler import PROGRAM_NAME
+from ghostwriter.utils.cogen.scope cimport Scope
+from ghostwriter.utils.cogen.rendercache cimport render_key
+from ghostwriter.utils.cogen.interpreter import EvalSyntaxError, gen_loop_iterator, for_loop_stx
+from ghostwriter.utils.error cimport ExceptionInfo, catch_exception_info
+
+
+# All generated functions take the writer, blocks and scope, the remaining
+# parameters are runtime helpers bound as default values (see `CompiledProgram.defaults`).
+cdef tuple HELPERS = (
+    '__gw_str', '__gw_iter', '__gw_exec', '__gw_codes', '__gw_eval_error', '__gw_fail',
+    '__gw_component', '__gw_body', '__gw_save', '__gw_restore', '__gw_loop_iter')
+cdef str SIGNATURE = ', '.join(('__gw_w', '__gw_blocks', '__gw_scope') + tuple(f"{h}=None" for h in HELPERS))
+
+# marks loop variables which were unbound before the loop started
+cdef object MISSING = object()
+
+
+def _save(object scope, tuple names):
+    # the scope's own bindings, those of parent scopes are left untouched by the loop
+    return tuple([dict.get(scope, name, MISSING) for name in names])
+
+
+def _restore(object scope, tuple names, tuple saved):
+    for name, value in zip(names, saved):
+        if value is MISSING:
+            scope.pop(name, None)
+        else:
+            scope[name] = value
+
+
+def _body(Writer w, dict blocks):
+    cdef BodyEnvironment b_env = blocks['body']
+    b_env.render(w)
+
+
+cdef object syntax_error(str code):
+    """Return the SyntaxError raised by the interpreter when evaluating `code`, if any."""
+    try:
+        compile(f"_it = {code}", "<string>", "exec")
+    except SyntaxError as e:
+        return e
+    return None
+
+
+cdef bint inlineable(str expr):
+    """True iff. `expr` can be inlined in the generated code.
+
+    Anything which is not a single expression or which would bind names
+    (assignment expressions) is evaluated through `exec` like the interpreter does."""
+    stmts = ast.parse(f"_it = {expr}").body
+    if len(stmts) != 1 or not isinstance(stmts[0], ast.Assign) or len(stmts[0].targets) != 1:
+        return False
+    for node in ast.walk(stmts[0].value):
+        if isinstance(node, ast.NamedExpr):
+            return False
+    try:
+        compile(f"(\n{expr}\n)", "<string>", "eval")
+    except SyntaxError:
+        return False
+    return True
+
+
+class _Function:
+    """Emits the source of a single generated function."""
+
+    def __init__(self, emitter, str name):
+        self.emitter = emitter
+        self.name = name
+        self.body = []
+        self.depth = 1
+        self.globals = []
+        self.hoisted = {}
+        # constant writes are buffered and merged into a single write call
+        self.pending = []
+
+    def flush(self):
+        if self.pending:
+            self.body.append(f"{'    ' * self.depth}__gw_write({''.join(self.pending)!r})")
+            self.hoisted['__gw_write'] = '__gw_w.write'
+            self.pending = []
+
+    def line(self, str code):
+        self.flush()
+        self.body.append(f"{'    ' * self.depth}{code}")
+
+    def write(self, str s):
+        if s:
+            self.pending.append(s)
+
+    def indent(self):
+        self.flush()
+        self.depth += 1
+
+    def dedent(self):
+        self.flush()
+        self.depth -= 1
+
+    def suite(self, list nodes):
+        """Emit an indented block of statements."""
+        cdef Py_ssize_t size
+        self.indent()
+        size = len(self.body)
+        self.nodes(nodes)
+        self.flush()
+        if len(self.body) == size:
+            self.line("pass")
+        self.dedent()
+
+    def source(self):
+        self.flush()
+        prologue = []
+        if self.globals:
+            prologue.append(f"    global {', '.join(self.globals)}")
+        for name, value in self.hoisted.items():
+            prologue.append(f"    {name} = {value}")
+        return '\n'.join([f"def {self.name}({SIGNATURE}):"] + prologue + self.body + ["    pass"])
+
+    def fail(self, factory, cause=None):
+        self.line(f"__gw_fail({self.emitter.error(factory, cause)})")
+
+    def eval(self, str expr, Py_ssize_t line, Py_ssize_t col, str label = None, bint iterate = False):
+        """Emit code evaluating `expr`, storing the result in `__gw_v`.
+
+        Errors are reported as if the interpreter had evaluated `label`
+        (defaults to the expression itself)."""
+        label = label or expr
+        err = syntax_error(label)
+        if err is not None:
+            self.fail(lambda: InterpStackTrace(line, col, EvalSyntaxError(label, err.offset - 6)), err)
+            return
+        loc = self.emitter.location(line, col, label)
+        self.line("try:")
+        self.indent()
+        if inlineable(expr):
+            self.body.append(f"{'    ' * self.depth}__gw_v = {'__gw_iter' if iterate else ''}((")
+            self.body.append(expr)
+            self.body.append("))")
+        else:
+            self.line("__gw_v = {}")
+            self.line(f"__gw_exec(__gw_codes[{self.emitter.code(expr)}], __gw_scope, __gw_v)")
+            self.line(f"__gw_v = {'__gw_iter(' if iterate else '('}__gw_v['_it'])")
+        self.dedent()
+        self.line("except Exception as __gw_e:")
+        self.indent()
+        self.line(f"raise __gw_eval_error({loc}) from __gw_e")
+        self.dedent()
+
+    def nodes(self, list nodes):
+        for n in nodes:
+            if isinstance(n, Chunk):
+                self.line(f"__gw_w.write_lines({(<Chunk>n).lines!r}, {(<Chunk>n).text!r})")
+            elif isinstance(n, Line):
+                self.visit_line(n)
+            elif isinstance(n, If):
+                self.visit_if(n)
+            elif isinstance(n, Block):
+                self.visit_block(n)
+            else:
+                self.fail(lambda n=n: UnknownNodeType(n))
+
+    def visit_line(self, Line node):
+        self.line("__gw_write_prefix()")
+        self.hoisted['__gw_write_prefix'] = '__gw_w.write_prefix'
+        self.write(node.indentation)
+        for n in node.children:
+            if isinstance(n, Literal):
+                self.write((<Literal>n).value)
+            elif isinstance(n, Expr):
+                self.eval((<Expr>n).value, (<Expr>n).line, (<Expr>n).col)
+                self.line(f"__gw_write_value(__gw_str(__gw_v), {node.indentation!r})")
+                self.hoisted['__gw_write_value'] = '__gw_w.write_value'
+            else:
+                self.fail(lambda n=n: RuntimeError(f"Found node of type '{type(n).__name__}' in Line.contents"))
+        self.write('\n')
+
+    def visit_if(self, If node):
+        self.line(f"__gw_w.indent({(<Block>node.conds[0]).block_indentation!r})")
+        self.if_chain(node.conds, 0)
+        self.line("__gw_w.dedent()")
+
+    def if_chain(self, list conds, Py_ssize_t ndx):
+        cdef Block cond = conds[ndx]
+        if cond.keyword == 'else':
+            self.nodes(cond.children)
+            return
+        self.eval(cond.args, cond.line, cond.col_args)
+        self.line("if __gw_v:")
+        self.suite(cond.children)
+        if ndx + 1 < len(conds):
+            self.line("else:")
+            self.indent()
+            size = len(self.body)
+            self.if_chain(conds, ndx + 1)
+            self.flush()
+            if len(self.body) == size:
+                self.line("pass")
+            self.dedent()
+
+    def visit_block(self, Block block):
+        self.line(f"__gw_w.indent({block.block_indentation!r})")
+        if block.keyword == 'r':
+            self.visit_component(block)
+        elif block.keyword == 'for':
+            self.visit_for(block)
+        elif block.keyword == 'body':
+            self.line("__gw_body(__gw_w, __gw_blocks)")
+        else:
+            self.fail(lambda: UnknownBlockType(block))
+        self.line("__gw_w.dedent()")
+
+    def visit_component(self, Block block):
+        cdef Py_ssize_t body = -1
+        self.eval(block.args, block.line, block.col_args)
+        if block.children:
+            body = self.emitter.function(f"__gw_body_{len(self.emitter.functions)}", block.children)
+        self.line(f"__gw_component(__gw_v, __gw_w, __gw_blocks, __gw_scope, {body}, "
+                  f"{block.line}, {block.col_kw}, {block.args!r})")
+
+    def visit_for(self, Block block):
+        match = for_loop_stx.match(block.args)
+        if not match:
+            self.fail(lambda: RuntimeError("wrong stx - not a valid for loop."))
+            return
+        bindings = match["bindings"]
+        iterable = match["iterable"]
+        names = tuple([ident.strip() for ident in bindings.split(',')])
+        # the code evaluated by the interpreter, see `interpreter.gen_loop_iterator`
+        bindings_lst = (f"'{ident}': {ident}" for ident in names)
+        code = f"({{ {', '.join(bindings_lst)} }} for {bindings} in {iterable})"
+        err = syntax_error(code)
+        if err is not None:
+            self.fail(lambda: InterpStackTrace(block.line, block.col_args, EvalSyntaxError(code, err.offset - 6)), err)
+            return
+
+        n = len(self.body)
+        if all(ident.isidentifier() and not iskeyword(ident) for ident in names) and inlineable(iterable):
+            for ident in names:
+                if ident not in self.globals:
+                    self.globals.append(ident)
+            self.eval(iterable, block.line, block.col_args, label=code, iterate=True)
+            self.line(f"__gw_s{n} = __gw_save(__gw_scope, {names!r})")
+            self.line(f"for {', '.join(names)} in __gw_v:")
+            self.suite(block.children)
+        else:
+            # unusual loop targets, bind variables through the interpreter's loop iterator
+            self.line(f"__gw_v = __gw_loop_iter({block.args!r}, __gw_scope, {block.line}, {block.col_args})")
+            self.line(f"__gw_s{n} = __gw_save(__gw_scope, {names!r})")
+            self.line(f"for __gw_b in __gw_v:")
+            self.indent()
+            self.line("__gw_scope.update(__gw_b)")
+            self.nodes(block.children)
+            self.dedent()
+        self.line(f"__gw_restore(__gw_scope, {names!r}, __gw_s{n})")
+
+
+class _Emitter:
+    """Collects the generated functions and the constants they refer to."""
+
+    def __init__(self):
+        self.functions = []
+        self.locations = []
+        self.codes = []
+        self.errors = []
+
+    def function(self, str name, list nodes):
+        """Generate function rendering `nodes`, return its index."""
+        fn = _Function(self, name)
+        ndx = len(self.functions)
+        self.functions.append(None)
+        fn.nodes(nodes)
+        self.functions[ndx] = fn
+        return ndx
+
+    def location(self, Py_ssize_t line, Py_ssize_t col, str expr):
+        self.locations.append((line, col, expr))
+        return len(self.locations) - 1
+
+    def code(self, str expr):
+        self.codes.append(compile(f"_it = {expr}", "<string>", "exec"))
+        return len(self.codes) - 1
+
+    def error(self, factory, cause):
+        self.errors.append((factory, cause))
+        return len(self.errors) - 1
+
+
+cdef class CompiledBody(BodyEnvironment):
+    """Body of a component block rendered by a compiled program."""
+    def __init__(self, CompiledProgram program, object code, dict blocks, object scope):
+        super().__init__([], blocks, scope)
+        self.program = program
+        self.code = code
+
+    cpdef void render(self, Writer w) except *:
+        cdef RenderProfiler prof
+        if self.code is None:
+            return
+        prof = get_profiler()
+        if prof is not None:
+            prof.enter_body(w.chars_written)
+        try:
+            FunctionType(self.code, self.scope, None, self.program.defaults)(w, self.blocks, self.scope)
+        finally:
+            if prof is not None:
+                prof.exit(w.chars_written)
+
+
+cdef class CompiledProgram:
+    def __init__(self, Program program):
+        cdef list functions
+        emitter = _Emitter()
+        emitter.function("__gw_main", program.lines)
+        self.source = '\n\n'.join(fn.source() for fn in emitter.functions) + '\n'
+        namespace = {}
+        exec(compile(self.source, "<string>", "exec"), namespace)
+        functions = [namespace[fn.name].__code__ for fn in emitter.functions]
+
+        self.main_code = functions[0]
+        self.body_codes = functions
+        self.eval_locations = emitter.locations
+        self.codes = emitter.codes
+        self.errors = emitter.errors
+        self.component = program.component
+        self.file_path = program.file_path
+
+    @property
+    def defaults(self):
+        return (
+            str, iter, exec, self.codes, self._eval_error, self._fail,
+            self._component, _body, _save, _restore, gen_loop_iterator)
+
+    def _eval_error(self, Py_ssize_t ndx):
+        cdef ExceptionInfo ei
+        line, col, expr = self.eval_locations[ndx]
+        e = sys.exc_info()[1]
+        if isinstance(e, SyntaxError):
+            return InterpStackTrace(line, col, EvalSyntaxError(expr, (e.offset or 0) - 6))
+        ei = catch_exception_info()
+        trim_eval_frames(ei)
+        return InterpStackTrace(line, col, EvalError(ei))
+
+    def _fail(self, Py_ssize_t ndx):
+        factory, cause = self.errors[ndx]
+        raise factory() from cause
+
+    def _component(self, object component, Writer w, dict blocks, object scope, Py_ssize_t body,
+                   Py_ssize_t line, Py_ssize_t col_kw, str args):
+        if not isinstance(component, Component):
+            raise RenderArgTypeError(args, component)
+        try:
+            render_compiled_component(component, w, blocks, scope, self, self.body_codes[body] if body >= 0 else None)
+        except InterpStackTrace as ist:
+            raise InterpStackTrace(line, col_kw, ist) from ist
+
+    cdef void _render(self, Writer w, dict blocks, object scope) except *:
+        cdef RenderProfiler prof = get_profiler()
+        if prof is not None:
+            prof.enter_program(self.component or PROGRAM_NAME, w.chars_written)
+        try:
+            FunctionType(self.main_code, scope, None, self.defaults)(w, blocks, scope)
+        except InterpStackTrace as ist:
+            if ist.component is None and ist.filepath is None:
+                ist.component = self.component
+                ist.filepath = self.file_path
+            raise ist
+        finally:
+            if prof is not None:
+                prof.exit(w.chars_written)
+
+    cpdef void render(self, Writer w, dict blocks, object scope) except *:
+        """Render program, the equivalent of `interpret(program, w, blocks, scope)`."""
+        # loops bind their variables in the scope, never modify the caller's dict
+        self._render(w, blocks, Scope(scope))
+
+
+cpdef CompiledProgram compile_program(Program program):
+    """Compile `program` into Python code."""
+    return CompiledProgram(program)
+
+
+cdef void render_compiled_component(object component, Writer w, dict blocks, object scope,
+                                    CompiledProgram caller, object body_code) except *:
+    cdef:
+        Scope new_scope
+        dict new_blocks
+        Writer capture
+        CompiledProgram prog
+        tuple key = None
+    # components passed a body cannot be cached, their output depends on it
+    if body_code is None:
+        key = render_key(component)
+        if key is not None and replay_render(key, w):
+            return
+    new_scope = Scope(component.__ghostwriter_component_scope__, scope)
+    new_scope['self'] = component
+    new_blocks = blocks.copy()
+    new_blocks['body'] = CompiledBody(caller, body_code, blocks, new_scope)
+    prog = compile_component(type(component))
+    if key is not None:
+        capture = capture_writer()
+        prog._render(capture, new_blocks, new_scope)
+        store_render(key, capture, w)
+    else:
+        prog._render(w, new_blocks, new_scope)
+
+
+cpdef void render_component(object component, Writer w, dict blocks) except *:
+    """Render `component` at the current prefix of `w` using compiled programs.
+
+    The equivalent of `interpreter.render_component`."""
+    if not isinstance(component, Component):
+        raise TypeError(f"expected a Component instance, got '{type(component).__name__}'")
+    render_compiled_component(component, w, blocks, {}, None, None)
+
+
+cpdef CompiledProgram compile_component(object cls):
+    """Return the compiled template of component class `cls`, compiling it on first use."""
+    cdef CompiledProgram compiled = cls.__dict__.get('__ghostwriter_component_compiled__')
+    if compiled is None:
+        compiled = compile_program(cls.ast)
+        setattr(cls, '__ghostwriter_component_compiled__', compiled)
+    return compiled
@@ -1,8 +1,10 @@
+import typing as t
 from functools import wraps
 from os import path
 import inspect
-from ghostwriter.utils.cogen.parser import CogenParser, Program
-from ghostwriter.utils.cogen.tokenizer import Tokenizer
+from ghostwriter.utils.cogen.parser import Program
+from ghostwriter.utils.cogen import astcache
+from ghostwriter.utils.cogen.optimizer import optimize
 from ghostwriter.utils.decorators import CachedStaticProperty
 from ghostwriter.utils.ctext import deindent_block
 
@@ -62,6 +64,10 @@ class Component(metaclass=ComponentMeta):
     __ghostwriter_component__ = True
     # Will be overwritten by one-time init function
     __ghostwriter_component_scope__ = {}
+    # Names of the attributes (props) determining the component's output. If set,
+    # rendered output is cached by the values of these props (see `rendercache`).
+    # Only set this if rendering depends on nothing but these props.
+    cache_props: t.Optional[t.Tuple[str, ...]] = None
 
     # TODO: this is wrong, it should be a class property, otherwise the static class property below will fail
     @property
@@ -79,8 +85,10 @@ class Component(metaclass=ComponentMeta):
     def ast(cls) -> Program:
         """Parse Component program text into AST
 
-        Lazily parses the component program text into an AST and caches it for future use."""
-        program = CogenParser(Tokenizer(deindent_block(cls.template))).parse_program()
+        Lazily parses the component program text into an AST and caches it for future use.
+        Parsed ASTs are also cached on disk (see `astcache`), keyed by the template text.
+        The returned AST is optimized (see `optimizer.optimize`)."""
+        program = optimize(astcache.parse(deindent_block(cls.template)))
         program.file_path = path.abspath(inspect.getfile(cls))
         program.component = cls.__name__
         return program
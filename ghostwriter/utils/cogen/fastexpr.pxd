@@ -0,0 +1,7 @@
+# cython: language_level=3
+
+cdef class FastExpr:
+    cdef object eval(self, object scope)
+
+
+cpdef FastExpr compile_fast(str expr)
@@ -0,0 +1,279 @@
+# cython: language_level=3
+"""Direct evaluation of simple template expressions.
+
+Most template expressions are names, attribute accesses, indexing and calls
+(`self.name`, `item.fields[0]`, `fmt(x)`). `compile_fast` recognizes this
+subset using the Pratt parser and compiles the expression to a tree of
+`FastExpr` nodes, which evaluate it without setting up an interpreter frame
+for the expression's code object.
+
+Any other expression (operators, keywords, slices, keyword arguments,
+f-strings, ...) is left to Python, `compile_fast` returns None for these.
+
+Evaluation matches `eval(expr, scope)`: operands are evaluated in the same
+order, the same exceptions are raised and unbound names raise NameError.
+Tracebacks hold no frame of their own for the expression (like the
+"<string>" frame of `eval`), callers trim the frames of this module (see
+`FASTEXPR_FILE`) instead.
+"""
+import builtins
+from ast import literal_eval
+from keyword import iskeyword
+from re import compile as re_compile, VERBOSE
+from cpython.dict cimport PyDict_GetItem
+from cpython.ref cimport PyObject
+from ghostwriter.utils.cogen.pratt cimport Grammar, Parser
+from ghostwriter.utils.cogen.scope cimport Scope
+
+# file name of traceback entries of this module
+FASTEXPR_FILE = "fastexpr.pyx"
+
+cdef dict BUILTINS = builtins.__dict__
+cdef object UNBOUND = object()
+
+DEF BP_POSTFIX = 100
+
+DEF T_END = 0
+DEF T_NAME = 1
+DEF T_NUMBER = 2
+DEF T_STRING = 3
+DEF T_DOT = 4
+DEF T_LBRACKET = 5
+DEF T_RBRACKET = 6
+DEF T_LPAREN = 7
+DEF T_RPAREN = 8
+DEF T_COMMA = 9
+
+rgx_token = re_compile(r"""
+    (?P<ws>\s+)
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<number>(?:[0-9][0-9_]*(?:\.[0-9_]*)?|\.[0-9][0-9_]*)(?:[eE][+-]?[0-9][0-9_]*)?[jJ]?)
+  | (?P<string>'(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*")
+  | (?P<punct>[.\[\](),])
+""", VERBOSE)
+
+cdef dict PUNCT_TYPES = {
+    '.': T_DOT, '[': T_LBRACKET, ']': T_RBRACKET, '(': T_LPAREN, ')': T_RPAREN, ',': T_COMMA,
+}
+
+
+class Unsupported(Exception):
+    """Expression is outside the subset evaluated by `FastExpr`."""
+    pass
+
+
+class Token:
+    __slots__ = ('type', 'lexeme')
+
+    def __init__(self, type: int, lexeme: str):
+        self.type = type
+        self.lexeme = lexeme
+
+    def __repr__(self):
+        return f"Token<{self.type}, '{self.lexeme}'>"
+
+
+def tokenize(str expr):
+    """Yield the tokens of `expr`, raises `Unsupported` on tokens outside the subset."""
+    cdef Py_ssize_t pos = 0
+    cdef Py_ssize_t end = len(expr)
+    while pos < end:
+        m = rgx_token.match(expr, pos)
+        if m is None:
+            raise Unsupported(expr[pos])
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == 'ws':
+            continue
+        elif kind == 'name':
+            yield Token(T_NAME, m.group())
+        elif kind == 'number':
+            yield Token(T_NUMBER, m.group())
+        elif kind == 'string':
+            yield Token(T_STRING, m.group())
+        else:
+            yield Token(PUNCT_TYPES[m.group()], m.group())
+    yield Token(T_END, '')
+
+
+################################################################################
+# Nodes
+################################################################################
+cdef class FastExpr:
+    cdef object eval(self, object scope):
+        raise NotImplementedError("eval not implemented")
+
+
+cdef class Const(FastExpr):
+    cdef object value
+
+    def __init__(self, value):
+        self.value = value
+
+    cdef object eval(self, object scope):
+        return self.value
+
+
+cdef class Name(FastExpr):
+    cdef str name
+
+    def __init__(self, str name):
+        self.name = name
+
+    cdef object eval(self, object scope):
+        cdef PyObject *value
+        if type(scope) is Scope:
+            # spares raising and catching KeyError for names bound by parent scopes
+            result = (<Scope>scope).resolve(self.name, UNBOUND)
+            if result is not UNBOUND:
+                return result
+        else:
+            try:
+                return scope[self.name]
+            except KeyError:
+                pass
+            value = PyDict_GetItem(BUILTINS, self.name)
+            if value != NULL:
+                return <object>value
+        raise NameError(f"name '{self.name}' is not defined")
+
+
+cdef class Attr(FastExpr):
+    cdef FastExpr obj
+    cdef str name
+
+    def __init__(self, FastExpr obj, str name):
+        self.obj = obj
+        self.name = name
+
+    cdef object eval(self, object scope):
+        return getattr(self.obj.eval(scope), self.name)
+
+
+cdef class Index(FastExpr):
+    cdef FastExpr obj
+    cdef FastExpr key
+
+    def __init__(self, FastExpr obj, FastExpr key):
+        self.obj = obj
+        self.key = key
+
+    cdef object eval(self, object scope):
+        obj = self.obj.eval(scope)
+        return obj[self.key.eval(scope)]
+
+
+cdef class Call(FastExpr):
+    cdef FastExpr fn
+    cdef tuple args
+    cdef Py_ssize_t nargs
+
+    def __init__(self, FastExpr fn, tuple args):
+        self.fn = fn
+        self.args = args
+        self.nargs = len(args)
+
+    cdef object eval(self, object scope):
+        cdef FastExpr arg
+        fn = self.fn.eval(scope)
+        if self.nargs == 0:
+            return fn()
+        elif self.nargs == 1:
+            return fn((<FastExpr>self.args[0]).eval(scope))
+        return fn(*[arg.eval(scope) for arg in self.args])
+
+
+################################################################################
+# Grammar
+################################################################################
+cdef Grammar grammar = Grammar()
+grammar.symbol(T_END)
+grammar.symbol(T_RBRACKET)
+grammar.symbol(T_RPAREN)
+grammar.symbol(T_COMMA)
+
+
+cdef object expect(Parser parser, Py_ssize_t token_type):
+    token = parser.advance(token_type)
+    if token is None:
+        raise Unsupported(parser.curr_token.lexeme)
+    return token
+
+
+@grammar.nud(T_NAME)
+def nud_name(token, Parser parser):
+    cdef str name = token.lexeme
+    if name == 'None':
+        return Const(None)
+    elif name == 'True':
+        return Const(True)
+    elif name == 'False':
+        return Const(False)
+    elif iskeyword(name):
+        raise Unsupported(name)
+    return Name(name)
+
+
+@grammar.nud(T_NUMBER)
+def nud_number(token, Parser parser):
+    return Const(literal_eval(token.lexeme))
+
+
+@grammar.nud(T_STRING)
+def nud_string(token, Parser parser):
+    return Const(literal_eval(token.lexeme))
+
+
+@grammar.nud(T_LPAREN, BP_POSTFIX)
+def nud_group(token, Parser parser):
+    body = parser.parse()
+    expect(parser, T_RPAREN)
+    return body
+
+
+@grammar.led(T_DOT, BP_POSTFIX)
+def led_attr(token, Parser parser, FastExpr left):
+    name = expect(parser, T_NAME).lexeme
+    if iskeyword(name):
+        raise Unsupported(name)
+    return Attr(left, name)
+
+
+@grammar.led(T_LBRACKET, BP_POSTFIX)
+def led_index(token, Parser parser, FastExpr left):
+    key = parser.parse()
+    expect(parser, T_RBRACKET)
+    return Index(left, key)
+
+
+@grammar.led(T_LPAREN, BP_POSTFIX)
+def led_call(token, Parser parser, FastExpr left):
+    args = []
+    while parser.advance(T_RPAREN) is None:
+        args.append(parser.parse())
+        if parser.advance(T_COMMA) is None:
+            expect(parser, T_RPAREN)
+            break
+    return Call(left, tuple(args))
+
+
+cpdef FastExpr compile_fast(str expr):
+    """Compile `expr` for direct evaluation, returns None if outside the supported subset.
+
+    `expr` must be a valid Python expression."""
+    cdef Parser parser
+    cdef FastExpr node
+    try:
+        parser = Parser(grammar, tokenize(expr))
+        node = parser.parse()
+        if parser.curr_token.type != T_END:
+            return None
+        return node
+    except Exception:
+        # Unsupported, UnexpectedTokenError, StopIteration (premature end) or errors of `literal_eval`
+        return None
+
+
+def fast_eval(FastExpr node, object scope):
+    """Evaluate `node` in `scope`, for testing."""
+    return node.eval(scope)
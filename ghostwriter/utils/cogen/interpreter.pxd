@@ -2,9 +2,10 @@
 
 from ghostwriter.utils.iwriter cimport IWriter
 from ghostwriter.utils.cogen.parser cimport (
-    Program, Block, If, Line, Literal, Expr, Node
+    Program, Block, If, Line, Literal, Expr, Chunk, Node
 )
 from ghostwriter.utils.error cimport *
+from ghostwriter.utils.cogen.profiler cimport RenderProfiler
 
 
 cdef class Writer(IWriter):
@@ -12,12 +13,19 @@ cdef class Writer(IWriter):
         IWriter _writer
         list _prefixes
         str _curr_prefix
+        list _prefix_offsets  # type: t.Optional[t.List[int]]
+        readonly Py_ssize_t prefixes_written
+        readonly Py_ssize_t chars_written
 
     cpdef void indent(self, str prefix)
     cpdef void dedent(self)
     cpdef void write(self, str contents)
     cpdef void write_prefix(self)
+    cpdef void write_lines(self, list lines, str text)
+    cpdef void write_value(self, str text, str indentation)
     cpdef void newline(self)
+    cpdef void write_rendered(self, str text, Py_ssize_t nprefixes)
+    cdef void write_spliced(self, str text, list offsets) except *
 
 
 cdef class EvalError(Error):
@@ -46,4 +54,21 @@ cdef class UnknownBlockType(Error):
     cdef public Block block
 
 
-cpdef void interpret(Program program, Writer w, dict blocks, dict scope) except *
+cdef class BodyEnvironment:
+    cdef:
+        list children  # type: t.List[Node]
+        dict blocks
+        object scope  # type: t.Dict[str, t.Any]
+
+    cpdef void render(self, Writer w) except *
+
+
+cdef trim_eval_frames(ExceptionInfo ei)
+
+cdef RenderProfiler get_profiler()
+cdef Writer capture_writer()
+cdef bint replay_render(tuple key, Writer w) except -1
+cdef void store_render(tuple key, Writer capture, Writer w) except *
+
+cpdef void interpret(Program program, Writer w, dict blocks, object scope) except *
+cpdef void render_component(object component, Writer w, dict blocks) except *
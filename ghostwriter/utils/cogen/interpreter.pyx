@@ -4,11 +4,29 @@ import colorama as clr
 from re import compile as re_compile
 cimport cython
 from ghostwriter.utils.cogen.component import Component
+from ghostwriter.utils.cogen.scope cimport Scope
+from ghostwriter.utils.cogen.fastexpr cimport FastExpr, compile_fast
+from ghostwriter.utils.cogen.fastexpr import FASTEXPR_FILE
+from ghostwriter.utils.cogen.rendercache cimport CachedRender, get_render_cache, render_key
+from ghostwriter.utils.iwriter cimport StringWriter
+from ghostwriter.utils.ctext cimport prefix_lines_ex
+from ghostwriter.utils.cogen.profiler import PROGRAM_NAME
 
 # TODO: want a 'def'/'set' block to update scope - can call out to functions..?
 
 for_loop_stx = re_compile(r"^(?P<bindings>.+?)\s+in\s+(?P<iterable>.+)")
 
+# compiled expressions, keyed by expression text (see `compile_expr`, `clear_caches`)
+cdef dict expr_codes = {}
+# parsed for-loops, keyed by loop syntax (see `parse_loop`, `clear_caches`)
+cdef dict loop_stxs = {}
+# stands in for the writer prefix in output captured for the render cache
+cdef str PREFIX_SENTINEL = "\x00"
+# installed by `set_profiler`, None unless profiling
+cdef RenderProfiler profiler = None
+# evaluate simple expressions directly rather than using `eval`, see `set_fast_eval`
+cdef bint fast_eval = True
+
 
 cdef inline str type_name(object o):
     return type(o).__name__
@@ -108,6 +126,9 @@ cdef class Writer(IWriter):
         self._writer = writer
         self._prefixes = []
         self._curr_prefix = prefix
+        self._prefix_offsets = None
+        self.prefixes_written = 0
+        self.chars_written = 0
 
     cpdef void indent(self, str prefix):
         self._prefixes.append(self._curr_prefix)
@@ -120,15 +141,142 @@ cdef class Writer(IWriter):
 
     cpdef void write(self, str contents):
         self._writer.write(contents)
+        self.chars_written += len(contents)
 
     cpdef void write_prefix(self):
+        if self._prefix_offsets is not None:
+            self._prefix_offsets.append(self.chars_written)
         self._writer.write(self._curr_prefix)
+        self.prefixes_written += 1
+        self.chars_written += len(self._curr_prefix)
+
+    cpdef void write_lines(self, list lines, str text):
+        """Write `lines`, each preceded by the prefix and followed by a newline.
+
+        `text` must be the lines joined by newlines (plus a trailing newline),
+        it is written as-is if there is no prefix."""
+        cdef Py_ssize_t nprefixed
+        self.prefixes_written += len(lines)
+        if self._curr_prefix:
+            text = prefix_lines_ex(text, self._curr_prefix, False, False, &nprefixed,
+                                   self._prefix_offsets, self.chars_written)
+        self._writer.write(text)
+        self.chars_written += len(text)
+
+    cpdef void write_value(self, str text, str indentation):
+        """Write the value of an expression on a line indented by `indentation`.
+
+        Lines after the first are indented to match the line itself, blank
+        lines are left as-is."""
+        cdef Py_ssize_t nprefixed
+        text = prefix_lines_ex(text, self._curr_prefix + indentation, True, True, &nprefixed,
+                               self._prefix_offsets, self.chars_written)
+        self._writer.write(text)
+        self.prefixes_written += nprefixed
+        self.chars_written += len(text)
 
     cpdef void newline(self):
         self._writer.write('\n')
-
-
-cdef py_eval_expr(dict scope, str expr, Py_ssize_t line, Py_ssize_t col):
+        self.chars_written += 1
+
+    cpdef void write_rendered(self, str text, Py_ssize_t nprefixes):
+        """Write output captured by a `capture_writer`.
+
+        Each of the `nprefixes` prefix placeholders in `text` is replaced by
+        the current prefix."""
+        cdef Py_ssize_t pos, n
+        if self._prefix_offsets is not None:
+            # every placeholder of cached output is a prefix
+            pos = text.find(PREFIX_SENTINEL)
+            n = 0
+            while pos != -1:
+                self._prefix_offsets.append(self.chars_written + pos + n * (len(self._curr_prefix) - 1))
+                n += 1
+                pos = text.find(PREFIX_SENTINEL, pos + 1)
+        text = text.replace(PREFIX_SENTINEL, self._curr_prefix)
+        self._writer.write(text)
+        self.prefixes_written += nprefixes
+        self.chars_written += len(text)
+
+    cdef void write_spliced(self, str text, list offsets) except *:
+        """Write output captured by a `capture_writer`, replacing the placeholder at each of `offsets`.
+
+        Unlike `write_rendered`, this leaves any other placeholder characters
+        in `text` as they are."""
+        cdef list parts = []
+        cdef Py_ssize_t start = 0, offset, n
+        cdef Py_ssize_t plen = len(self._curr_prefix)
+        for n, offset in enumerate(offsets):
+            if self._prefix_offsets is not None:
+                self._prefix_offsets.append(self.chars_written + offset + n * (plen - 1))
+            parts.append(text[start:offset])
+            parts.append(self._curr_prefix)
+            start = offset + 1
+        parts.append(text[start:])
+        text = "".join(parts)
+        self._writer.write(text)
+        self.prefixes_written += len(offsets)
+        self.chars_written += len(text)
+
+
+def set_profiler(RenderProfiler prof):
+    """Install `prof` to profile rendering, None disables profiling."""
+    global profiler
+    profiler = prof
+
+
+def set_fast_eval(bint enabled):
+    """Enable or disable direct evaluation of simple expressions (see `fastexpr`)."""
+    global fast_eval
+    fast_eval = enabled
+    expr_codes.clear()
+
+
+def clear_caches():
+    """Forget compiled expressions and loops, e.g. after reloading the templates using them."""
+    expr_codes.clear()
+    loop_stxs.clear()
+
+
+cdef RenderProfiler get_profiler():
+    return profiler
+
+
+cdef Writer capture_writer():
+    """Return a writer capturing output for the render cache.
+
+    The writer's prefix is a placeholder, substituted when the output is
+    written using `Writer.write_rendered`. The offsets of the prefixes are
+    recorded too, in case the output itself contains the placeholder."""
+    cdef Writer w = Writer(StringWriter(), PREFIX_SENTINEL)
+    w._prefix_offsets = []
+    return w
+
+
+cdef bint replay_render(tuple key, Writer w) except -1:
+    """Write cached output of the component identified by `key`, return False if not cached."""
+    cdef CachedRender entry = get_render_cache().lookup(key)
+    if entry is None:
+        return False
+    w.write_rendered(entry.text, entry.nprefixes)
+    return True
+
+
+cdef void store_render(tuple key, Writer capture, Writer w) except *:
+    """Cache output captured by `capture` and write it to `w`.
+
+    Output which itself contains the prefix placeholder cannot be told apart
+    from prefixes, it is written using the recorded prefix offsets instead
+    and not cached."""
+    cdef str text = (<StringWriter>capture._writer).getvalue()
+    if text.count(PREFIX_SENTINEL) != capture.prefixes_written:
+        w.write_spliced(text, capture._prefix_offsets)
+        return
+    get_render_cache().store(key, CachedRender(text, capture.prefixes_written))
+    w.write_rendered(text, capture.prefixes_written)
+
+
+cdef py_eval_expr(object scope, str expr, Py_ssize_t line, Py_ssize_t col):
     """
     Evaluate Python expression and return its value
 
@@ -148,10 +296,17 @@ cdef py_eval_expr(dict scope, str expr, Py_ssize_t line, Py_ssize_t col):
     -------
         The resulting value from evaluating the expression.
     """
-    cdef dict eval_locals = dict()
+    cdef dict eval_locals
+    cdef CompiledExpr ce
     cdef ExceptionInfo ei
     try:
-        exec(f"_it = {expr}", scope, eval_locals)
+        ce = compile_expr(expr)
+        if ce.fast is not None:
+            return ce.fast.eval(scope)
+        if ce.is_eval:
+            return eval(ce.code, scope)
+        eval_locals = dict()
+        exec(ce.code, scope, eval_locals)
         return eval_locals['_it']
     except Exception as e:
         if isinstance(e, SyntaxError):
@@ -161,16 +316,91 @@ cdef py_eval_expr(dict scope, str expr, Py_ssize_t line, Py_ssize_t col):
         trim_eval_frames(ei)
         raise InterpStackTrace(line, col, EvalError(ei)) from e
 
+@cython.final
+cdef class CompiledExpr:
+    cdef:
+        object code
+        bint is_eval
+        # evaluates simple expressions without `eval`, None otherwise (see `fastexpr`)
+        FastExpr fast
+
+    def __init__(self, object code, bint is_eval, FastExpr fast = None):
+        self.code = code
+        self.is_eval = is_eval
+        self.fast = fast
+
+
+cdef CompiledExpr compile_expr(str expr):
+    """Compile expression, reusing the code object of earlier evaluations.
+
+    Expressions are compiled in 'eval' mode when possible, avoiding a locals
+    dictionary per evaluation. Expressions which may bind names (assignment
+    expressions) keep being executed as `_it = {expr}` with separate locals,
+    such that they cannot modify the scope. Raises SyntaxError with offsets
+    relative to `_it = {expr}`, like evaluating the expression would."""
+    cdef CompiledExpr ce = expr_codes.get(expr)
+    if ce is not None:
+        return ce
+    ce = CompiledExpr(compile(f"_it = {expr}", "<string>", "exec"), False)
+    if ":=" not in expr:
+        try:
+            code = compile(expr.lstrip(), "<string>", "eval")
+            # only valid expressions are compiled for direct evaluation, syntax errors are Python's
+            ce = CompiledExpr(code, True, compile_fast(expr) if fast_eval else None)
+        except SyntaxError:
+            pass
+    expr_codes[expr] = ce
+    return ce
+
+
+cdef inline bint is_eval_frame(FrameInfo f):
+    # directly evaluated expressions (see `fastexpr`) have frames of their own instead of "<string>"
+    return f.filename == "<string>" or f.filename.endswith(FASTEXPR_FILE)
+
+
 cdef trim_eval_frames(ExceptionInfo ei):
     cdef FrameInfo f
     cdef int ndx = 0
     for f in ei.stacktrace:
-        if f.filename == "<string>":
-            ei.stacktrace = ei.stacktrace[ndx+1:]
+        if is_eval_frame(f):
+            # compiled templates may add a frame of their own, skip any consecutive "<string>" frames
+            ndx += 1
+            while ndx < len(ei.stacktrace) and is_eval_frame(ei.stacktrace[ndx]):
+                ndx += 1
+            ei.stacktrace = ei.stacktrace[ndx:]
             break
         ndx += 1
 
-def gen_loop_iterator(str stx, dict scope, Py_ssize_t line, Py_ssize_t col):
+@cython.final
+cdef class LoopSyntax:
+    cdef:
+        # generator expression yielding dicts of loop bindings, see `gen_loop_iterator`
+        str code
+        str iterable
+        tuple names
+        # True iff. all loop targets are plain identifiers which can be bound directly
+        bint native
+
+
+cdef LoopSyntax parse_loop(str stx):
+    cdef LoopSyntax loop = loop_stxs.get(stx)
+    if loop is not None:
+        return loop
+    match = for_loop_stx.match(stx)
+    if not match:
+        raise RuntimeError("wrong stx - not a valid for loop.")
+    loop = LoopSyntax()
+    bindings = match["bindings"]
+    loop.iterable = match["iterable"]
+    loop.names = tuple([x.strip() for x in bindings.split(',')])
+    bindings_lst = (f"'{ident}': {ident}" for ident in loop.names)
+    loop.code = f"({{ {', '.join(bindings_lst)} }} for {bindings} in {loop.iterable})"
+    loop.native = all(ident.isidentifier() for ident in loop.names)
+    loop_stxs[stx] = loop
+    return loop
+
+
+def gen_loop_iterator(str stx, object scope, Py_ssize_t line, Py_ssize_t col):
     """Transforms for statement into an iterable returning a dictionary of loop-specific bindings
 
     INPUT: for lbl, val in nodetypes
@@ -193,36 +423,64 @@ def gen_loop_iterator(str stx, dict scope, Py_ssize_t line, Py_ssize_t col):
         A generator where each item yielded is a a dictionary whose entries are str -> Any where
         the str corresponds to the loop identifier.
     """
-    cdef:
-        str bindings,
-        str iterable,
-        object match = for_loop_stx.match(stx)
-        str code
-    if not match:
-        raise RuntimeError("wrong stx - not a valid for loop.")
-    bindings = match["bindings"]
-    iterable = match["iterable"]
-    bindings_lst = (
-        f"'{ident}': {ident}" for ident in (
-        x.strip() for x in bindings.split(',')))
+    return py_eval_expr(scope, parse_loop(stx).code, line, col)
 
-    code = f"({{ {', '.join(bindings_lst)} }} for {bindings} in {iterable})"
-    return py_eval_expr(scope, code, line, col)
 
+cdef object loop_iterator(LoopSyntax loop, object scope, Py_ssize_t line, Py_ssize_t col):
+    """Evaluate the iterable of a (native) for-loop and return an iterator over it.
+
+    Errors are reported as if `gen_loop_iterator` had evaluated the loop."""
+    cdef ExceptionInfo ei
+    try:
+        compile_expr(loop.code)
+    except SyntaxError as e:
+        raise InterpStackTrace(line, col, EvalSyntaxError(loop.code, e.offset - 6)) from e
+    iterable = py_eval_expr(scope, loop.iterable, line, col)
+    try:
+        return iter(iterable)
+    except TypeError as e:
+        # raised from within the generator expression before, no frames to show
+        ei = catch_exception_info()
+        ei.stacktrace = []
+        raise InterpStackTrace(line, col, EvalError(ei)) from e
+
+
+cdef inline void bind_loop_targets(tuple names, object item, Scope scope) except *:
+    cdef Py_ssize_t num_names = len(names)
+    cdef Py_ssize_t ndx
+    if num_names == 1:
+        scope[<str>names[0]] = item
+        return
+    values = item if type(item) is tuple else tuple(item)
+    if len(values) != num_names:
+        if len(values) > num_names:
+            raise ValueError(f"too many values to unpack (expected {num_names})")
+        raise ValueError(f"not enough values to unpack (expected {num_names}, got {len(values)})")
+    for ndx in range(num_names):
+        scope[<str>names[ndx]] = values[ndx]
 
-cdef class BodyEnvironment:
-    cdef:
-        list children  # type: t.List[Node]
-        dict blocks
-        dict scope  # type: t.Dict[str, t.Any]
 
-    def __init__(self, list children, dict blocks, dict scope):
+cdef class BodyEnvironment:
+    """The children of a component block, rendered by the component's '% body' block(s)."""
+    def __init__(self, list children, dict blocks, object scope):
         self.children = children
         self.blocks = blocks
         self.scope = scope
 
+    cpdef void render(self, Writer w) except *:
+        cdef Node n
+        cdef RenderProfiler prof = profiler
+        if prof is not None:
+            prof.enter_body(w.chars_written)
+        try:
+            for n in self.children:
+                interp_node(n, w, self.blocks, self.scope)
+        finally:
+            if prof is not None:
+                prof.exit(w.chars_written)
+
 
-cdef void interp_line(Line node, Writer w, dict blocks, dict scope) except *:
+cdef void interp_line(Line node, Writer w, dict blocks, object scope) except *:
     cdef Literal lit = None
     cdef Expr expr = None
     w.write_prefix()
@@ -231,13 +489,13 @@ cdef void interp_line(Line node, Writer w, dict blocks, dict scope) except *:
         if isinstance(n, Literal):
             w.write((<Literal>n).value)
         elif isinstance(n, Expr):
-            w.write(str(py_eval_expr(scope, n.value, n.line, n.col)))
+            w.write_value(str(py_eval_expr(scope, n.value, n.line, n.col)), node.indentation)
         else:
             raise RuntimeError(f"Found node of type '{type_name(n)}' in Line.contents")
     w.newline()
 
 
-cdef void interp_if(If ifblock, Writer w, dict blocks, dict scope) except *:
+cdef void interp_if(If ifblock, Writer w, dict blocks, object scope) except *:
     cdef Block cond
     # all if/elif/else clauses/conditions MUST have the same indentation
     # and an if-block has at least one condition, the 'if' itself.
@@ -248,50 +506,85 @@ cdef void interp_if(If ifblock, Writer w, dict blocks, dict scope) except *:
             if py_eval_expr(scope, cond.args, cond.line, cond.col_args):
                 for n in cond.children:
                     interp_node(n, w, blocks, scope)
-                w.dedent()
-                return
+                break
         else:
             for n in cond.children:
                 interp_node(n, w, blocks, scope)
-            w.dedent()
-            return
+            break
+    w.dedent()
 
 
-cdef void interp_block_component(Block block, Writer w, dict blocks, dict scope) except *:
+cdef void interp_block_component(Block block, Writer w, dict blocks, object scope) except *:
     cdef:
-        dict new_scope = scope.copy()
-        dict new_blocks = blocks.copy()
         # TODO: handle syntax errors here
-        object component = py_eval_expr(new_scope, block.args, block.line, block.col_args)
+        object component = py_eval_expr(scope, block.args, block.line, block.col_args)
     if not isinstance(component, Component):
         raise RenderArgTypeError(block.args, component)
-    new_scope.update(component.__ghostwriter_component_scope__)
-    new_scope['self'] = component
-    new_blocks['body'] = BodyEnvironment(block.children, blocks, new_scope)
     try:
-        interpret(component.ast, w, new_blocks, new_scope)
+        interp_component(component, block.children, w, blocks, scope)
     except InterpStackTrace as ist:
         raise InterpStackTrace(block.line, block.col_kw, ist) from ist
 
 
-cdef void interp_block_body(Block body, Writer w, dict blocks, dict scope) except *:
-    cdef Node n
+cdef void interp_component(object component, list body, Writer w, dict blocks, object scope) except *:
+    cdef:
+        Scope new_scope
+        dict new_blocks
+        Writer capture
+        tuple key = None
+    # components passed a body cannot be cached, their output depends on it
+    if not body:
+        key = render_key(component)
+        if key is not None and replay_render(key, w):
+            return
+    # component bindings shadow those of the caller's scope
+    new_scope = Scope(component.__ghostwriter_component_scope__, scope)
+    new_scope['self'] = component
+    new_blocks = blocks.copy()
+    new_blocks['body'] = BodyEnvironment(body, blocks, new_scope)
+    if key is not None:
+        capture = capture_writer()
+        interpret(component.ast, capture, new_blocks, new_scope)
+        store_render(key, capture, w)
+    else:
+        interpret(component.ast, w, new_blocks, new_scope)
+
+
+cpdef void render_component(object component, Writer w, dict blocks) except *:
+    """Render `component` at the current prefix of `w`.
+
+    The equivalent of interpreting a '% r' block without body, without
+    parsing a program to hold the block."""
+    if not isinstance(component, Component):
+        raise TypeError(f"expected a Component instance, got '{type_name(component)}'")
+    interp_component(component, [], w, blocks, {})
+
+
+cdef void interp_block_body(Block body, Writer w, dict blocks, object scope) except *:
     cdef BodyEnvironment b_env = blocks['body']
-    for n in b_env.children:
-        interp_node(n, w, b_env.blocks, b_env.scope)
+    b_env.render(w)
 
 
-cdef void interp_block(Block block, Writer w, dict blocks, dict scope) except *:
-    cdef dict new_scope
+cdef void interp_block(Block block, Writer w, dict blocks, object scope) except *:
+    cdef Scope new_scope
+    cdef LoopSyntax loop
     w.indent(block.block_indentation)
     if block.keyword == "r": # handle component
         interp_block_component(block, w, blocks, scope)
     elif block.keyword == "for": # handle for-block
-        new_scope = scope.copy()
-        for loop_bindings in gen_loop_iterator(block.args, new_scope, block.line, block.col_args):
-            new_scope.update(loop_bindings)  # TODO: find a means of testing this - vars changed in one iter should be carried over
-            for n in block.children:
-                interp_node(<Node>n, w, blocks, new_scope)
+        new_scope = Scope(scope)
+        loop = parse_loop(block.args)
+        if not loop.native:
+            for loop_bindings in gen_loop_iterator(block.args, new_scope, block.line, block.col_args):
+                new_scope.update(loop_bindings)
+                for n in block.children:
+                    interp_node(<Node>n, w, blocks, new_scope)
+        else:
+            # bindings are carried over between iterations, like the variables of a Python for-loop
+            for item in loop_iterator(loop, new_scope, block.line, block.col_args):
+                bind_loop_targets(loop.names, item, new_scope)
+                for n in block.children:
+                    interp_node(<Node>n, w, blocks, new_scope)
     elif block.keyword == "body":
         interp_block_body(block, w, blocks, scope)
     else:
@@ -299,8 +592,44 @@ cdef void interp_block(Block block, Writer w, dict blocks, dict scope) except *:
     w.dedent()
 
 
-cdef inline void interp_node(Node n, Writer w, dict blocks, dict scope) except *:
+cdef Py_ssize_t node_line(Node n):
+    """Return the template line of `n`, -1 for lines without contents."""
     if isinstance(n, Line):
+        children = (<Line>n).children
+        return children[0].line if children else -1
+    elif isinstance(n, Chunk):
+        return (<Chunk>n).line
+    elif isinstance(n, If):
+        return (<Block>(<If>n).conds[0]).line
+    elif isinstance(n, Block):
+        return (<Block>n).line
+    return -1
+
+
+cdef void profile_node(Node n, Writer w, dict blocks, object scope) except *:
+    cdef RenderProfiler prof = profiler
+    cdef Py_ssize_t line = node_line(n)
+    if line < 0:
+        eval_node(n, w, blocks, scope)
+        return
+    prof.enter_line(line, w.chars_written)
+    try:
+        eval_node(n, w, blocks, scope)
+    finally:
+        prof.exit(w.chars_written)
+
+
+cdef inline void interp_node(Node n, Writer w, dict blocks, object scope) except *:
+    if profiler is not None:
+        profile_node(n, w, blocks, scope)
+    else:
+        eval_node(n, w, blocks, scope)
+
+
+cdef inline void eval_node(Node n, Writer w, dict blocks, object scope) except *:
+    if isinstance(n, Chunk):
+        w.write_lines((<Chunk>n).lines, (<Chunk>n).text)
+    elif isinstance(n, Line):
         interp_line(<Line>n, w, blocks, scope)
     elif isinstance(n, If):
         interp_if(<If>n, w, blocks, scope)
@@ -310,8 +639,11 @@ cdef inline void interp_node(Node n, Writer w, dict blocks, dict scope) except *
         raise UnknownNodeType(n)
 
 
-cpdef void interpret(Program program, Writer w, dict blocks, dict scope) except *:
+cpdef void interpret(Program program, Writer w, dict blocks, object scope) except *:
     cdef Node n
+    cdef RenderProfiler prof = profiler
+    if prof is not None:
+        prof.enter_program(program.component or PROGRAM_NAME, w.chars_written)
     try:
         for n in program.lines:
             interp_node(n, w, blocks, scope)
@@ -319,4 +651,7 @@ cpdef void interpret(Program program, Writer w, dict blocks, dict scope) except
         if ist.component is None and ist.filepath is None:
             ist.component = program.component
             ist.filepath = program.file_path
-        raise ist
\ No newline at end of file
+        raise ist
+    finally:
+        if prof is not None:
+            prof.exit(w.chars_written)
\ No newline at end of file
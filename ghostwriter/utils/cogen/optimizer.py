@@ -0,0 +1,63 @@
+import typing as t
+from ghostwriter.utils.cogen.parser import (
+    Program, Block, If, Literal, Line, Chunk, Node
+)
+from ghostwriter.utils.cogen.visitor import ASTVisitor
+
+
+def static_text(node: Node) -> t.Optional[str]:
+    """Return the text of a line without expressions, otherwise None."""
+    if not isinstance(node, Line):
+        return None
+    parts = [node.indentation]
+    for child in node.children:
+        if not isinstance(child, Literal):
+            return None
+        parts.append(child.value)
+    return ''.join(parts)
+
+
+class ChunkLines(ASTVisitor):
+    """Fold runs of consecutive expression-free lines into `Chunk` nodes.
+
+    Rendering a Line writes the prefix, indentation, each literal and finally
+    a newline. A Chunk renders the same text for all its lines in a single write.
+    Only sibling lines are folded, such that the writer's prefix is the same
+    for all lines of a chunk."""
+
+    def fold(self, nodes: t.List[Node]) -> t.List[Node]:
+        result = []
+        run = []
+        line = 0
+        for node in nodes:
+            text = static_text(node)
+            if text is not None:
+                if not run:
+                    line = next((c.line for c in node.children), 0)
+                run.append(text)
+                continue
+            if run:
+                result.append(Chunk(run, line))
+                run = []
+            result.append(self.visit(node))
+        if run:
+            result.append(Chunk(run, line))
+        return result
+
+    def visit_Program(self, node: Program):
+        program = Program(self.fold(node.lines))
+        program.file_path = node.file_path
+        program.component = node.component
+        return program
+
+    def visit_Block(self, node: Block):
+        return Block(
+            node.block_indentation, node.keyword, node.args,
+            self.fold(node.children),
+            node.line, node.col_kw, node.col_args
+        )
+
+
+def optimize(program: Program) -> Program:
+    """Return optimized copy of `program`, rendering the same output."""
+    return ChunkLines().visit(program)
@@ -25,6 +25,12 @@ cdef class Line(Node):
     cpdef public list children  # type: t.List[t.Union[Literal,Expr]]
 
 
+cdef class Chunk(Node):
+    cpdef public list lines  # type: t.List[str]
+    cpdef public str text
+    cpdef public Py_ssize_t line
+
+
 cdef class Block(Node):
     cpdef public str block_indentation
     cpdef public str keyword
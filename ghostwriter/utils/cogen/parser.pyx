@@ -103,6 +103,10 @@ cdef class NodeFactory:
     def block(str indentation, str keyword, str args = '', list children = None):
         return Block.__new__(Block, indentation, keyword, args, children)
 
+    @staticmethod
+    def chunk(list lines):
+        return Chunk.__new__(Chunk, lines)
+
     @staticmethod
     def if_(list conds = None):
         return If.__new__(If, conds)
@@ -114,6 +118,12 @@ cdef class NodeFactory:
 
 # NODE DEFINITIONS
 ##################
+# Version of the AST produced by the parser, part of the key of ASTs cached on
+# disk (see `astcache`). Bump it when changing the nodes, their pickled state or
+# how templates are tokenized or parsed.
+AST_FORMAT = 1
+
+
 cdef class Node:
     def __repr__(self):
         return f"{type(self).__name__}"
@@ -133,6 +143,9 @@ cdef class Literal(Node):
     def __repr__(self):
         return f"Literal('{self.value}')"
 
+    def __reduce__(self):
+        return Literal, (self.value, self.line, self.col)
+
 
 cdef class Expr(Node):
     def __cinit__(self, str value, Py_ssize_t line = 0, Py_ssize_t col = 0):
@@ -148,6 +161,9 @@ cdef class Expr(Node):
     def __repr__(self):
         return f"Expr({self.value})"
 
+    def __reduce__(self):
+        return Expr, (self.value, self.line, self.col)
+
 
 cdef class Line(Node):
     def __cinit__(self, str indentation, list children = None):
@@ -164,6 +180,31 @@ cdef class Line(Node):
     def __repr__(self):
         return  f"Line('{self.indentation}': {','.join(repr(child) for child in self.children)})"
 
+    def __reduce__(self):
+        return Line, (self.indentation, self.children)
+
+
+cdef class Chunk(Node):
+    """Run of lines without expressions, pre-joined by the optimizer (see `optimizer.py`).
+
+    Each entry of `lines` is the indentation and literal text of one line,
+    the writer's prefix is written before each line when rendered."""
+    def __cinit__(self, list lines, Py_ssize_t line = 0):
+        self.lines = lines
+        self.text = '\n'.join(lines) + '\n'
+        self.line = line
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, self.__class__)
+            and self.lines == other.lines)
+
+    def __repr__(self):
+        return f"Chunk({repr(self.lines)})"
+
+    def __reduce__(self):
+        return Chunk, (self.lines, self.line)
+
 
 cdef class Block(Node):
     def __cinit__(self, str indentation, str keyword, str args = '', list children = None,
@@ -194,6 +235,10 @@ cdef class Block(Node):
             line = f"keyword: '{self.keyword}'"
         return  f"Block({line}, block_indentation: '{self.block_indentation}', children: {','.join(repr(child) for child in self.children)})"
 
+    def __reduce__(self):
+        return Block, (self.block_indentation, self.keyword, self.args, self.children,
+                       self.line, self.col_kw, self.col_args)
+
 
 cdef class If(Node):
     def __cinit__(self, list conds = None):
@@ -207,6 +252,9 @@ cdef class If(Node):
     def __repr__(self):
         return f"If({repr(self.conds)})"
 
+    def __reduce__(self):
+        return If, (self.conds,)
+
 
 cdef class Program(Node):
     def __cinit__(self, list lines = None):
@@ -222,6 +270,12 @@ cdef class Program(Node):
     def __repr__(self):
         return f"Program({', '.join(repr(l) for l in self.lines)})"
 
+    def __reduce__(self):
+        return Program, (self.lines,), (self.file_path, self.component)
+
+    def __setstate__(self, state):
+        self.file_path, self.component = state
+
 
 # HELPER FUNCTIONS
 ##################
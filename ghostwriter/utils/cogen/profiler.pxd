@@ -0,0 +1,30 @@
+# cython: language_level=3
+
+cdef class Frame:
+    cdef:
+        str name
+        str path
+        dict table  # type: t.Optional[t.Dict[str, t.List[int]]]
+        Frame program
+        Frame caller
+        Frame target
+        long long start_ns
+        long long child_ns
+        long long nested_ns
+        Py_ssize_t start_chars
+
+
+cdef class RenderProfiler:
+    cdef:
+        list stack  # type: t.List[Frame]
+        dict active  # type: t.Dict[str, int]
+        readonly dict components  # type: t.Dict[str, t.List[int]]
+        readonly dict lines  # type: t.Dict[str, t.List[int]]
+        readonly dict stacks  # type: t.Dict[str, int]
+
+    cdef void _push(self, Frame f, str segment, Py_ssize_t chars) except *
+    cdef void enter_program(self, str name, Py_ssize_t chars) except *
+    cdef void enter_body(self, Py_ssize_t chars) except *
+    cdef void enter_line(self, Py_ssize_t line, Py_ssize_t chars) except *
+    cdef void exit(self, Py_ssize_t chars) except *
+    cpdef void merge(self, RenderProfiler other) except *
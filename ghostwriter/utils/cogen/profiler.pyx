@@ -0,0 +1,203 @@
+# cython: language_level=3
+"""Profiler for template rendering.
+
+When a `RenderProfiler` is installed (see `interpreter.set_profiler`), the
+interpreter reports entering and leaving each component and template line.
+For each of these, the profiler records the number of calls, the inclusive
+and exclusive time (in nanoseconds) and the number of characters written.
+
+* a component's exclusive time excludes the time spent rendering other
+  components, but includes the time spent rendering its body in the caller.
+* a line's exclusive time excludes the time spent in nested lines (of
+  if- and for-blocks) and in components rendered by the line.
+
+Time spent is also recorded per stack of components and lines, written in
+the collapsed-stack format understood by flame graph tools (`write_collapsed`).
+
+Compiled programs (see `codegen`) report components, but not lines.
+"""
+import logging
+import pickle
+from glob import glob
+from os import path, remove
+from time import perf_counter_ns
+
+log = logging.getLogger(__name__)
+
+# Name of components rendered by programs not belonging to a component
+PROGRAM_NAME = "<template>"
+# Collapsed-stack output of `report`
+COLLAPSED_FILE = "render.collapsed"
+DUMP_PATTERN = "render-*.prof"
+
+
+cdef class Frame:
+    """An active component or template line."""
+    pass
+
+
+cdef inline list stat_of(dict table, str name):
+    cdef list stat = table.get(name)
+    if stat is None:
+        stat = table[name] = [0, 0, 0, 0]
+    return stat
+
+
+cdef class RenderProfiler:
+    """Collects per component- and line statistics, see module docs."""
+    def __init__(self):
+        self.stack = []
+        self.active = {}
+        self.components = {}
+        self.lines = {}
+        self.stacks = {}
+
+    cdef void _push(self, Frame f, str segment, Py_ssize_t chars) except *:
+        if self.stack:
+            f.path = (<Frame>self.stack[-1]).path + ';' + segment
+        else:
+            f.path = segment
+        if f.table is not None:
+            self.active[f.name] = self.active.get(f.name, 0) + 1
+        f.child_ns = 0
+        f.nested_ns = 0
+        f.start_chars = chars
+        self.stack.append(f)
+        f.start_ns = perf_counter_ns()
+
+    cdef void enter_program(self, str name, Py_ssize_t chars) except *:
+        """Enter the program of component `name`."""
+        cdef Frame f = Frame()
+        f.name = name
+        f.table = self.components
+        f.program = f
+        f.caller = (<Frame>self.stack[-1]).program if self.stack else None
+        f.target = None
+        self._push(f, name, chars)
+
+    cdef void enter_body(self, Py_ssize_t chars) except *:
+        """Enter the body passed to the current component by its caller."""
+        cdef Frame f = Frame()
+        cdef Frame current = (<Frame>self.stack[-1]).program if self.stack else None
+        f.target = current.caller if current is not None else None
+        # lines of the body belong to the caller's template
+        f.name = f.target.name if f.target is not None else PROGRAM_NAME
+        f.caller = f.target.caller if f.target is not None else None
+        f.table = None
+        f.program = f
+        self._push(f, "% body", chars)
+
+    cdef void enter_line(self, Py_ssize_t line, Py_ssize_t chars) except *:
+        """Enter `line` of the current component's template."""
+        cdef Frame f = Frame()
+        cdef Frame program = (<Frame>self.stack[-1]).program if self.stack else None
+        f.name = f"{program.name if program is not None else PROGRAM_NAME}:{line}"
+        f.table = self.lines
+        f.program = program
+        f.caller = None
+        f.target = None
+        self._push(f, f.name, chars)
+
+    cdef void exit(self, Py_ssize_t chars) except *:
+        """Leave the innermost component, body or line."""
+        cdef long long elapsed = perf_counter_ns()
+        cdef Frame f = self.stack.pop()
+        cdef Frame parent = self.stack[-1] if self.stack else None
+        cdef Frame enclosing = parent.program if parent is not None else None
+        cdef list stat
+        cdef long long exclusive
+        cdef Py_ssize_t depth
+        elapsed -= f.start_ns
+
+        exclusive = elapsed - f.child_ns
+        self.stacks[f.path] = self.stacks.get(f.path, 0) + exclusive
+        if parent is not None:
+            parent.child_ns += elapsed
+
+        if f.program is f:
+            # time spent in other components is not exclusive to the enclosing component,
+            # except for bodies, which belong to the component rendering them.
+            if enclosing is not None:
+                enclosing.nested_ns += elapsed
+            if f.target is not None:
+                f.target.nested_ns -= elapsed - f.nested_ns
+            exclusive = elapsed - f.nested_ns
+
+        if f.table is None:
+            return
+        stat = stat_of(f.table, f.name)
+        stat[0] += 1
+        stat[2] += exclusive
+        depth = self.active[f.name] - 1
+        self.active[f.name] = depth
+        # recursive calls are included in the outermost call
+        if depth == 0:
+            stat[1] += elapsed
+            stat[3] += chars - f.start_chars
+
+    cpdef void merge(self, RenderProfiler other) except *:
+        """Add the statistics of `other` to this profiler."""
+        cdef list stat
+        for table, other_table in ((self.components, other.components), (self.lines, other.lines)):
+            for name, other_stat in other_table.items():
+                stat = stat_of(table, name)
+                for i in range(4):
+                    stat[i] += other_stat[i]
+        for stack, ns in other.stacks.items():
+            self.stacks[stack] = self.stacks.get(stack, 0) + ns
+
+    def __reduce__(self):
+        return load_stats, (self.components, self.lines, self.stacks)
+
+
+def load_stats(dict components, dict lines, dict stacks) -> RenderProfiler:
+    cdef RenderProfiler prof = RenderProfiler()
+    prof.components.update(components)
+    prof.lines.update(lines)
+    prof.stacks.update(stacks)
+    return prof
+
+
+def format_table(RenderProfiler prof, int limit = 15) -> str:
+    """Format the components and lines with the most exclusive time as a table."""
+    rows = []
+    for title, table in (("component", prof.components), ("line", prof.lines)):
+        rows.append(f"{'calls':>10} {'incl (ms)':>10} {'excl (ms)':>10} {'chars':>12}  {title}")
+        ranked = sorted(table.items(), key=lambda kv: kv[1][2], reverse=True)
+        for name, (calls, incl, excl, chars) in ranked[:limit]:
+            rows.append(f"{calls:>10} {incl / 1e6:>10.2f} {excl / 1e6:>10.2f} {chars:>12}  {name}")
+        rows.append("")
+    return "\n".join(rows)
+
+
+def write_collapsed(RenderProfiler prof, fpath: str) -> None:
+    """Write the time spent per stack in the collapsed-stack format (in microseconds)."""
+    with open(fpath, 'w') as fh:
+        for stack, ns in sorted(prof.stacks.items()):
+            us = ns // 1000
+            if us > 0:
+                fh.write(f"{stack} {us}\n")
+
+
+def dump(RenderProfiler prof, dirpath: str, worker_id: str) -> None:
+    """Save statistics of worker `worker_id` to be combined by `report`."""
+    with open(path.join(dirpath, DUMP_PATTERN.replace('*', worker_id)), 'wb') as fh:
+        pickle.dump(prof, fh)
+
+
+def clean(dirpath: str) -> None:
+    """Remove statistics saved by `dump`."""
+    for fpath in glob(path.join(dirpath, DUMP_PATTERN)):
+        remove(fpath)
+
+
+def report(dirpath: str) -> RenderProfiler:
+    """Combine statistics saved by workers, log the hot spots and write the collapsed stacks."""
+    cdef RenderProfiler total = RenderProfiler()
+    for fpath in sorted(glob(path.join(dirpath, DUMP_PATTERN))):
+        with open(fpath, 'rb') as fh:
+            total.merge(pickle.load(fh))
+    collapsed = path.join(dirpath, COLLAPSED_FILE)
+    write_collapsed(total, collapsed)
+    log.info(f"render profile (collapsed stacks written to '{collapsed}'):\n{format_table(total)}")
+    return total
@@ -0,0 +1,30 @@
+# cython: language_level=3
+from ghostwriter.utils.error cimport Error
+
+cdef class CachedRender:
+    cdef readonly str text
+    cdef readonly Py_ssize_t nprefixes
+
+
+cdef class CachePropError(Error):
+    cdef public str component
+    cdef public str prop
+
+
+cdef class RenderCache:
+    cdef:
+        object entries  # type: OrderedDict[tuple, t.Tuple[CachedRender, int]]
+        dict counters  # type: t.Dict[type, t.List[int]]
+        readonly Py_ssize_t max_bytes
+        readonly Py_ssize_t nbytes
+
+    cpdef CachedRender lookup(self, tuple key)
+    cpdef void store(self, tuple key, CachedRender entry) except *
+    cpdef void resize(self, Py_ssize_t max_bytes) except *
+    cpdef void clear(self)
+    cpdef dict stats(self)
+
+
+cpdef RenderCache get_render_cache()
+
+cpdef tuple render_key(object component)
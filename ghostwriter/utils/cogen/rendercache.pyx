@@ -0,0 +1,179 @@
+# cython: language_level=3
+"""Cache of rendered component output.
+
+Components opt into caching by listing the attributes (props) their output
+depends on in `cache_props`. The output of rendering a component is then
+stored keyed by the component class and the values of its props, and
+rendering an equal component again writes the stored output instead of
+interpreting the component's template.
+
+Output is captured with a placeholder in place of the writer's prefix (see
+`Writer.write_rendered`), such that it can be written at any indentation.
+
+The cache is bounded by a memory budget, evicting the least recently used
+entries first. The budget defaults to 32MiB, it can be changed using the
+`GHOSTWRITER_RENDER_CACHE_SIZE` environment variable (in bytes, 0 disables
+caching) or by calling `configure`.
+"""
+import logging
+from collections import OrderedDict
+from os import environ
+from sys import getsizeof
+
+log = logging.getLogger(__name__)
+
+# Memory budget of the cache in bytes, set to 0 to disable render caching.
+ENV_RENDER_CACHE_SIZE = "GHOSTWRITER_RENDER_CACHE_SIZE"
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+
+cdef class CachePropError(Error):
+    """A prop listed in a component's `cache_props` is not an attribute of the component."""
+    def __init__(self, object component, str prop):
+        self.component = f"{type(component).__module__}.{type(component).__qualname__}"
+        self.prop = prop
+        super().__init__(self.error_message())
+
+    cpdef str error_message(self):
+        return f"component '{self.component}' lists '{self.prop}' in cache_props, but has no such attribute"
+
+    cpdef str error_details(self):
+        return self.error_message()
+
+
+cdef class CachedRender:
+    """Output of rendering a component, see `Writer.write_rendered`."""
+    def __init__(self, str text, Py_ssize_t nprefixes):
+        self.text = text
+        self.nprefixes = nprefixes
+
+
+cdef class RenderCache:
+    """LRU cache of rendered components, bounded by `max_bytes`.
+
+    Keys are `(component class, (type, value)...)` tuples, see `render_key`.
+    Hits and misses are counted per component class, see `stats`."""
+    def __init__(self, Py_ssize_t max_bytes):
+        self.entries = OrderedDict()
+        self.counters = {}
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+
+    cpdef CachedRender lookup(self, tuple key):
+        """Return the entry stored under `key` or None, counting the hit/miss."""
+        cdef list counter = self.counters.get(key[0])
+        if counter is None:
+            counter = self.counters[key[0]] = [0, 0]
+        hit = self.entries.get(key)
+        if hit is None:
+            counter[1] += 1
+            return None
+        counter[0] += 1
+        self.entries.move_to_end(key)
+        return hit[0]
+
+    cpdef void store(self, tuple key, CachedRender entry) except *:
+        """Store `entry`, evicting least recently used entries to stay within budget."""
+        cdef Py_ssize_t nbytes = getsizeof(entry.text) + getsizeof(key)
+        if nbytes > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        self.entries[key] = (entry, nbytes)
+        self.nbytes += nbytes
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.nbytes -= evicted
+
+    cpdef void resize(self, Py_ssize_t max_bytes) except *:
+        """Change the memory budget, evicting entries if needed."""
+        self.max_bytes = max_bytes
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.nbytes -= evicted
+
+    cpdef void clear(self):
+        """Remove all entries and reset statistics."""
+        self.entries.clear()
+        self.counters.clear()
+        self.nbytes = 0
+
+    cpdef dict stats(self):
+        """Return `(hits, misses)` for each component class looked up in the cache."""
+        return {f"{cls.__module__}.{cls.__qualname__}": (hits, misses)
+                for cls, (hits, misses) in self.counters.items()}
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def max_bytes_from_env() -> int:
+    """Return the memory budget set by `GHOSTWRITER_RENDER_CACHE_SIZE` (or the default)."""
+    value = environ.get(ENV_RENDER_CACHE_SIZE)
+    if not value:
+        return DEFAULT_MAX_BYTES
+    try:
+        return int(value)
+    except ValueError:
+        log.warning(f"ignoring {ENV_RENDER_CACHE_SIZE}={value!r}, expected a size in bytes "
+                    f"(using {DEFAULT_MAX_BYTES})")
+        return DEFAULT_MAX_BYTES
+
+
+cdef RenderCache render_cache = RenderCache(max_bytes_from_env())
+
+
+cpdef RenderCache get_render_cache():
+    """Return the process-wide render cache."""
+    return render_cache
+
+
+cpdef tuple render_key(object component):
+    """Return the key under which to cache the output of `component`.
+
+    Props are keyed by their type and value, such that equal values of
+    different types (`1`, `True` and `1.0`) are cached separately.
+
+    Returns None if the component does not declare `cache_props`, caching is
+    disabled, or if any of the props are unhashable. Raises `CachePropError`
+    if a prop is not an attribute of the component."""
+    cdef tuple key
+    cdef object props = type(component).cache_props
+    if props is None or render_cache.max_bytes <= 0:
+        return None
+    key = (type(component),)
+    for prop in props:
+        try:
+            value = getattr(component, prop)
+        except AttributeError as e:
+            raise CachePropError(component, prop) from e
+        key += ((type(value), value),)
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+def configure(max_bytes: int) -> None:
+    """Set the memory budget of the render cache, 0 disables caching."""
+    render_cache.resize(max_bytes)
+
+
+def stats() -> dict:
+    """Return `(hits, misses)` for each component class, keyed by its qualified name."""
+    return render_cache.stats()
+
+
+def clear() -> None:
+    """Empty the render cache and reset its statistics."""
+    render_cache.clear()
+
+
+def log_stats() -> None:
+    """Log hit/miss statistics of each component class (debug level)."""
+    if not log.isEnabledFor(logging.DEBUG):
+        return
+    for name, (hits, misses) in sorted(render_cache.stats().items(), key=lambda kv: -kv[1][0]):
+        log.debug(f"render cache: {name}: {hits} hits, {misses} misses")
@@ -0,0 +1,8 @@
+# cython: language_level=3
+
+cdef class Scope(dict):
+    cdef readonly tuple parents  # type: t.Tuple[dict, ...]
+
+    cdef object lookup(self, object key)
+    cdef object resolve(self, object key, object default)
+    cpdef dict flatten(self)
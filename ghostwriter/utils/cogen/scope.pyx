@@ -0,0 +1,107 @@
+# cython: language_level=3
+"""Chained scopes for template evaluation.
+
+A `Scope` is a dictionary holding its own bindings which falls back to its
+parent dictionaries for names it does not define. Creating a scope for a
+component or a loop is therefore constant-time, where copying the parent
+scope grows with the number of names in scope.
+
+Scopes are used as globals for `exec`/`eval`, name lookups which miss the
+scope itself go through `__missing__`, which searches the parents in order,
+followed by the builtins.
+
+Membership tests, `get` and iteration (`keys`, `items`, `values`) see the
+bindings of the parents too, as they would for a copy of the parent scopes
+(`globals()` in a template is the scope). Like such a copy, they do not
+include the builtins. Equality compares the scope's own bindings only, as
+do `pop` and other methods modifying the scope.
+"""
+import builtins
+from cpython.dict cimport PyDict_GetItem
+from cpython.ref cimport PyObject
+
+cdef dict BUILTINS = builtins.__dict__
+cdef object MISSING = object()
+
+
+cdef class Scope(dict):
+    """Dictionary of bindings, chained to the `parents` searched for missing keys.
+
+    Parents must not change while the scope is in use, bindings are only
+    ever added to the innermost scope."""
+    def __init__(self, *parents):
+        super().__init__()
+        self.parents = parents
+
+    cdef object lookup(self, object key):
+        """Look up `key` in the parents, return MISSING if not found."""
+        cdef PyObject *value
+        for parent in self.parents:
+            value = PyDict_GetItem(parent, key)
+            if value != NULL:
+                return <object>value
+            if type(parent) is Scope:
+                result = (<Scope>parent).lookup(key)
+                if result is not MISSING:
+                    return result
+        return MISSING
+
+    cdef object resolve(self, object key, object default):
+        """Return the value of `key` like `self[key]` would, or `default` if unbound."""
+        cdef PyObject *value = PyDict_GetItem(self, key)
+        if value != NULL:
+            return <object>value
+        result = self.lookup(key)
+        if result is not MISSING:
+            return result
+        value = PyDict_GetItem(BUILTINS, key)
+        if value != NULL:
+            return <object>value
+        return default
+
+    def __contains__(self, key):
+        return PyDict_GetItem(self, key) != NULL or self.lookup(key) is not MISSING
+
+    def get(self, key, default=None):
+        cdef PyObject *value = PyDict_GetItem(self, key)
+        if value != NULL:
+            return <object>value
+        result = self.lookup(key)
+        return default if result is MISSING else result
+
+    cpdef dict flatten(self):
+        """Return a dict of all bindings in scope (excluding builtins), innermost first."""
+        cdef dict result = {}
+        for parent in reversed(self.parents):
+            result.update(parent.flatten() if type(parent) is Scope else parent)
+        result.update(dict.items(self))
+        return result
+
+    def keys(self):
+        return self.flatten().keys()
+
+    def items(self):
+        return self.flatten().items()
+
+    def values(self):
+        return self.flatten().values()
+
+    def __iter__(self):
+        return iter(self.flatten())
+
+    def __len__(self):
+        return len(self.flatten())
+
+    def __missing__(self, key):
+        cdef PyObject *value
+        result = self.lookup(key)
+        if result is not MISSING:
+            return result
+        # resolve builtins here, sparing evaluated code a KeyError on every builtin lookup
+        value = PyDict_GetItem(BUILTINS, key)
+        if value != NULL:
+            return <object>value
+        raise KeyError(key)
+
+    def __repr__(self):
+        return f"Scope({dict.__repr__(self)}, parents: {len(self.parents)})"
@@ -1,13 +1,22 @@
 import typing as t
+import sys
+import inspect
+from os import path
 from functools import wraps
+from ghostwriter.utils import aio
 from ghostwriter.utils.iwriter cimport IWriter
 from ghostwriter.utils.cogen.component import Component
-from ghostwriter.utils.cogen.parser cimport CogenParser
-from ghostwriter.utils.cogen.tokenizer cimport Tokenizer
-from ghostwriter.utils.cogen.interpreter cimport Writer, interpret
-from ghostwriter.utils.error cimport WrappedException, ExceptionInfo, catch_exception_info
+from ghostwriter.utils.cogen.interpreter cimport Writer, render_component
+from ghostwriter.utils.cogen cimport codegen
+from ghostwriter.utils.error cimport WrappedException, ExceptionInfo, FrameInfo, catch_exception_info
 
-# TODO: tests - had an indentation error in this code.
+cdef tuple aio_files():
+    """Files of the event loop machinery running async snippets, hidden from error traces."""
+    # asyncio is only imported once an async snippet runs
+    asyncio = sys.modules.get('asyncio')
+    if asyncio is None:
+        return (aio.__file__,)
+    return (path.dirname(asyncio.__file__) + path.sep, aio.__file__)
 
 
 class SnippetEvalException(WrappedException):
@@ -19,17 +28,23 @@ class SnippetEvalException(WrappedException):
         super().__init__(ei)
 
 
-def snippet(dict blocks: t.Optional[dict] = None):
+def snippet(dict blocks: t.Optional[dict] = None, *, bint compiled = False):
     """
     Create snippet from Component instance.
 
     Convenience decorator - wrap a function which takes a Scope instance and
     which returns a Component instance.
 
+    The function may be an `async def` function, and the returned component
+    may hold awaitables in its attributes, see `ghostwriter.utils.aio`.
+
     Parameters
     ----------
     blocks:
         (Optional) additional blocks to use in DSL.
+    compiled:
+        (Optional) render templates with compiled Python functions
+        (see `codegen`) rather than the tree-walking interpreter.
 
     Example
     -------
@@ -45,12 +60,19 @@ def snippet(dict blocks: t.Optional[dict] = None):
     """
 
     def wrapper(fn: t.Callable[[], Component]):
+        cdef bint is_async = inspect.iscoroutinefunction(fn)
+
         @wraps(fn)
         def decorator(_, prefix: str, file_writer: IWriter):
-            # TODO: prefix would be the initial, base prefix...? Seems bad to ignore
             cdef object main_component
+            cdef ExceptionInfo ei
             try:
-                main_component = fn()  # type: Component
+                if is_async:
+                    main_component = aio.create(fn)
+                else:
+                    main_component = fn()  # type: Component
+                    if isinstance(main_component, Component) and aio.has_awaitables(main_component):
+                        aio.run(aio.resolve(main_component))
             except Exception as e:
                 # error messages already handling their own formatting are let through
                 if hasattr(e, "error_details"):
@@ -58,17 +80,22 @@ def snippet(dict blocks: t.Optional[dict] = None):
 
                 # wrap exception in a custom exception whose error_details attribute ensures only the
                 # relevant parts of the stack trace are printed to the user.
-                raise SnippetEvalException(catch_exception_info()) from e
+                ei = catch_exception_info()
+                hidden = aio_files()
+                ei.stacktrace = [f for f in ei.stacktrace if not (<FrameInfo>f).filename.startswith(hidden)]
+                raise SnippetEvalException(ei) from e
 
             if not isinstance(main_component, Component):
                 # TODO: improve this - error stack trace should not show ghostwriter internals
                 raise ValueError(f"snippet must return a Component instance, got '{type(main_component)}'")
-            scope = {'__main__': main_component}
-            program = f"""{prefix}% r __main__\n{prefix}% /r"""
-            parser = CogenParser(Tokenizer(program))
-            writer = Writer(file_writer)
-            interpret(parser.parse_program(), writer, blocks or {}, scope)
+            if compiled:
+                codegen.render_component(main_component, Writer(file_writer, prefix), blocks or {})
+            else:
+                render_component(main_component, Writer(file_writer, prefix), blocks or {})
 
+        if is_async:
+            setattr(decorator, aio.ASYNC_SNIPPET_ATTR, fn)
+            aio.register(fn)
         return decorator
 
     return wrapper
\ No newline at end of file
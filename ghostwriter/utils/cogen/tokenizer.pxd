@@ -14,6 +14,15 @@ cdef:
     TokenType CTRL_ARGS
 
 
+cdef struct TokenRecord:
+    TokenType type
+    # lexeme is prog[start:end]
+    Py_ssize_t start
+    Py_ssize_t end
+    Py_ssize_t line
+    Py_ssize_t col
+
+
 cdef class Token:
     cpdef public str lexeme
     cpdef public TokenType type
@@ -31,7 +40,8 @@ cdef class Tokenizer:
     cdef:
         str prog
         Py_ssize_t prog_len
-        wchar_t *buf
+        # copy of `prog`, offsets into it are offsets into `prog`
+        Py_UCS4 *buf
         TokenizerState state
         Py_ssize_t pos
 
@@ -41,7 +51,22 @@ cdef class Tokenizer:
     cdef public Py_ssize_t pos_col
 
     cpdef Token next(self)
+    cdef bint scan(self, TokenRecord *rec) except False
     cpdef location(self)
 
 
+cdef class TokenBuffer:
+    cdef:
+        readonly str prog
+        TokenRecord *records
+        Py_ssize_t size
+        Py_ssize_t capacity
+
+    cdef TokenRecord *record(self, Py_ssize_t ndx)
+    cpdef TokenType type_at(self, Py_ssize_t ndx)
+    cpdef str lexeme(self, Py_ssize_t ndx)
+    cpdef Token token(self, Py_ssize_t ndx)
+    cpdef location(self, Py_ssize_t ndx)
+
+
 cpdef str token_label(TokenType t)
\ No newline at end of file
@@ -1,9 +1,24 @@
+from cpython.mem cimport PyMem_Malloc, PyMem_Realloc, PyMem_Free
+
+cdef extern from "Python.h":
+    Py_UCS4 *PyUnicode_AsUCS4Copy(object u) except NULL
+
+
 cdef extern from "wctype.h" nogil:
     # all whitespace characters except newlines
     int iswblank(wchar_t ch ); # wint_t
     int iswspace(wchar_t ch)  # wint_t
 
 
+# there is no whitespace outside the BMP, guards against truncation where wchar_t is 16-bit
+cdef inline bint is_blank(Py_UCS4 ch):
+    return ch <= 0xFFFF and iswblank(<wchar_t>ch)
+
+
+cdef inline bint is_space(Py_UCS4 ch):
+    return ch <= 0xFFFF and iswspace(<wchar_t>ch)
+
+
 cdef:
     TokenType EOF = 10
     TokenType NEWLINE = 11
@@ -140,7 +155,7 @@ cdef class TokenFactory:
         return Token.__new__(Token, CTRL_ARGS, lexeme)
 
 
-cdef inline bint peek_2(wchar_t *buf, Py_ssize_t pos, wchar_t ch1, wchar_t ch2):
+cdef inline bint peek_2(Py_UCS4 *buf, Py_ssize_t pos, Py_UCS4 ch1, Py_UCS4 ch2):
     return buf[pos] == ch1 and buf[pos+1] == ch2
 
 
@@ -148,11 +163,31 @@ cdef inline void update_col_pos(Tokenizer t, Py_ssize_t pos):
     t.pos_col = pos - t._pos_nl
 
 
+cdef inline bint set_record(Tokenizer t, TokenRecord *rec, TokenType type, Py_ssize_t start, Py_ssize_t end):
+    rec.type = type
+    rec.start = start
+    rec.end = end
+    rec.line = t.pos_line
+    rec.col = t.pos_col
+    return True
+
+
+cdef inline Token record_token(str prog, TokenRecord *rec):
+    """Materialize token described by `rec`."""
+    if rec.type == EOF:
+        return TOK_EOF
+    elif rec.type == NEWLINE:
+        return TOK_NEWLINE
+    return Token.__new__(Token, rec.type, prog[rec.start:rec.end])
+
+
 cdef class Tokenizer:
     def __init__(self, str prog):
         self.prog = prog
         self.prog_len = len(prog)
-        self.buf = prog # get ref to underlying buffer
+        # NUL-terminated, indexed like `prog` (unlike wchar_t, which may hold surrogate pairs)
+        PyMem_Free(self.buf)
+        self.buf = PyUnicode_AsUCS4Copy(prog)
         self.state = TS_NL
         self.pos = 0
 
@@ -160,9 +195,18 @@ cdef class Tokenizer:
         self._pos_nl = 0
         self.pos_col = 0
 
+    def __dealloc__(self):
+        PyMem_Free(self.buf)
+
     cpdef Token next(self):
+        cdef TokenRecord rec
+        self.scan(&rec)
+        return record_token(self.prog, &rec)
+
+    cdef bint scan(self, TokenRecord *rec) except False:
+        """Scan next token, storing its type, extent and location in `rec`."""
         cdef:
-            wchar_t *buf = self.buf
+            Py_UCS4 *buf = self.buf
             Py_ssize_t pos = self.pos
             Py_ssize_t prog_len = self.prog_len
             TokenizerState state = self.state
@@ -175,7 +219,7 @@ cdef class Tokenizer:
             # print(f"LOOP, state: {tokenizer_state(state)}")
             if state == TS_EOF:
                 self.state = TS_EOF
-                return TOK_EOF
+                return set_record(self, rec, EOF, pos, pos)
 
             if state == TS_NL:
                 # => EOF?
@@ -184,10 +228,10 @@ cdef class Tokenizer:
                     continue
 
                 # => PREFIX?
-                if iswblank(buf[pos]):
+                if is_blank(buf[pos]):
                     # scan past whitespace to find first newline/character
                     pos += 1
-                    while iswblank(buf[pos]):
+                    while is_blank(buf[pos]):
                         pos += 1
 
                 if self.pos != pos:
@@ -257,14 +301,14 @@ cdef class Tokenizer:
                     self.state = TS_NL
                     update_col_pos(self, pos)
                     self._pos_nl = pos + 1
-                    return TOK_NEWLINE
+                    return set_record(self, rec, NEWLINE, pos, pos + 1)
 
             elif state == TS_EMIT_PREFIX:
                 start = self.pos
                 self.pos = pos
                 self.state = TS_TOPLEVEL
                 update_col_pos(self, start)
-                return Token.__new__(Token, PREFIX, buf[start:pos])
+                return set_record(self, rec, PREFIX, start, pos)
 
             elif state == TS_EMIT_EXPR:
                 pos += 2
@@ -276,7 +320,7 @@ cdef class Tokenizer:
                         self.pos = pos + 2
                         self.state = TS_LINE
                         update_col_pos(self, start - 2)  # error should reflect delimiter characters (2 chars)
-                        return Token.__new__(Token, EXPR, buf[start:pos])
+                        return set_record(self, rec, EXPR, start, pos)
 
                     pos += 1
 
@@ -305,25 +349,25 @@ cdef class Tokenizer:
                     state = self.state
                     continue
                 update_col_pos(self, start)
-                return Token.__new__(Token, LITERAL, buf[start:pos])
+                return set_record(self, rec, LITERAL, start, pos)
 
             elif state == TS_EMIT_CTRL_KW:
                 update_col_pos(self, pos)
                 pos += 1 # consume '%'
-                while pos != prog_len and iswblank(buf[pos]):
+                while pos != prog_len and is_blank(buf[pos]):
                     pos += 1
                 if pos == prog_len:
                     raise RuntimeError("EOF err - line terminated without any CtrlKW")
                 # found beginning of CtrlKW
                 start = pos
-                while pos != prog_len and not iswspace(buf[pos]):
+                while pos != prog_len and not is_space(buf[pos]):
                     pos += 1
                 self.state = TS_EMIT_CTRL_ARGS  # TODO: good idea ? can also have a newline, must handle
                 self.pos = pos
-                return Token.__new__(Token, CTRL_KW, buf[start:pos])
+                return set_record(self, rec, CTRL_KW, start, pos)
 
             elif state == TS_EMIT_CTRL_ARGS:
-                while iswblank(buf[pos]):
+                while is_blank(buf[pos]):
                     pos += 1
                 # got a ctrl line, returned a CtrlKW token, (optionally) parse args.
                 start = pos
@@ -336,10 +380,72 @@ cdef class Tokenizer:
                     state = self.state
                     continue
                 update_col_pos(self, start)
-                return Token.__new__(Token, CTRL_ARGS, buf[start:pos])
+                return set_record(self, rec, CTRL_ARGS, start, pos)
 
             else:
                 raise RuntimeError(f"unrecognized tokenizer state: {state}")
 
     cpdef location(self):
         return self.pos_line, self.pos_col
+
+
+cdef class TokenBuffer:
+    """Tokens of a program, stored as a compact array of `TokenRecord`s.
+
+    The whole program is tokenized up-front without allocating any Python
+    objects, lexemes are sliced from the program text only when requested.
+    Indices past the end refer to the trailing EOF token."""
+    def __cinit__(self, str prog):
+        self.prog = prog
+        self.size = 0
+        self.capacity = 0
+        self.records = NULL
+
+    def __init__(self, str prog):
+        cdef:
+            Tokenizer t = Tokenizer(prog)
+            TokenRecord *rec
+        # roughly a token per 8 characters, grown as needed
+        self._grow(len(prog) // 8 + 16)
+        while True:
+            if self.size == self.capacity:
+                self._grow(self.capacity * 2)
+            rec = &self.records[self.size]
+            t.scan(rec)
+            self.size += 1
+            if rec.type == EOF:
+                break
+
+    def __dealloc__(self):
+        PyMem_Free(self.records)
+
+    def _grow(self, Py_ssize_t capacity):
+        cdef TokenRecord *records = <TokenRecord *>PyMem_Realloc(self.records, capacity * sizeof(TokenRecord))
+        if records == NULL:
+            raise MemoryError()
+        self.records = records
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.size
+
+    cdef TokenRecord *record(self, Py_ssize_t ndx):
+        if ndx >= self.size:
+            ndx = self.size - 1
+        return &self.records[ndx]
+
+    cpdef TokenType type_at(self, Py_ssize_t ndx):
+        return self.record(ndx).type
+
+    cpdef str lexeme(self, Py_ssize_t ndx):
+        cdef TokenRecord *rec = self.record(ndx)
+        if rec.type == EOF or rec.type == NEWLINE:
+            return record_token(self.prog, rec).lexeme
+        return self.prog[rec.start:rec.end]
+
+    cpdef Token token(self, Py_ssize_t ndx):
+        return record_token(self.prog, self.record(ndx))
+
+    cpdef location(self, Py_ssize_t ndx):
+        cdef TokenRecord *rec = self.record(ndx)
+        return rec.line, rec.col
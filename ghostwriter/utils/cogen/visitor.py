@@ -1,5 +1,5 @@
 from ghostwriter.utils.cogen.parser import (
-    Program, Block, If, Literal, Expr, Line
+    Program, Block, If, Literal, Expr, Line, Chunk
 )
 
 
@@ -16,12 +16,16 @@ class Visitor:
 
 class ASTVisitor(Visitor):
     def visit_Program(self, node: Program):
-        return Program([self.visit(l) for l in node.lines])
+        program = Program([self.visit(l) for l in node.lines])
+        program.file_path = node.file_path
+        program.component = node.component
+        return program
 
     def visit_Block(self, node: Block):
         return Block(
             node.block_indentation, node.keyword, node.args,
-            [self.visit(l) for l in node.children]
+            [self.visit(l) for l in node.children],
+            node.line, node.col_kw, node.col_args
         )
 
     def visit_If(self, node: If):
@@ -36,5 +40,8 @@ class ASTVisitor(Visitor):
     def visit_Line(self, node: Line):
         return Line(node.indentation, [self.visit(n) for n in node.children])
 
+    def visit_Chunk(self, node: Chunk):
+        return node
+
     # def visit_CLine(self, node: CLine):
     #     return node
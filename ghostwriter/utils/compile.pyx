@@ -2,33 +2,32 @@ import logging
 import sys
 from time import time
 from typing import Tuple, Iterator, Set
-from multiprocessing import Process
-from os import scandir
+from multiprocessing import Process, Value
+from os import scandir, makedirs
 from multiprocessing.connection import Connection
-from watchgod.watcher import Change
-import colorama as clr
 from ghostwriter.utils.fhash cimport file_hash
 from ghostwriter.utils.cwatch cimport CompileWatcher, SearchPathsWatcher, MPScheduler
+from ghostwriter.utils.cwatch import Change
 from ghostwriter.cli.conf import Configuration, ConfParser
 from ghostwriter.parser.fileparser cimport Context, Parser, SnippetCallbackFn
 from ghostwriter.utils.resolv import resolv, resolv_opt
 from ghostwriter.utils.iwriter cimport IWriter
-from ghostwriter.utils.watch import watch_dirs, WatcherConfig
 from ghostwriter.parser.fileparser cimport ShouldReplaceFileAlways
 from ghostwriter.utils.decorators import Debounce
-from ghostwriter.utils.error cimport catch_exception_info, ExceptionInfo, error_details, error_message
+from inspect import isawaitable
+from ghostwriter.utils import aio, dataload, sharedcache
+from ghostwriter.utils.cogen import rendercache, profiler
+from ghostwriter.utils.cogen.interpreter import set_profiler
+from ghostwriter.utils.cogen.profiler cimport RenderProfiler
+from ghostwriter.utils.diagnostics import Diagnostics, TooManyErrors
 
 
 log = logging.getLogger(__name__)
 Changeset = Set[Tuple[Change, str]]
-
-
-cdef void log_parser_error(str fpath, e):
-    try:
-        details = error_details(e)
-        log.error(f"{clr.Fore.RED}{error_message(e)}{clr.Style.RESET_ALL}\n{details}")
-    except NotImplementedError:
-        log.error(f"{clr.Fore.RED}{error_message(e)}{clr.Style.RESET_ALL}\n{details}")
+# max. number of files whose async snippets a worker starts ahead of parsing them
+PREFETCH_BATCH_SIZE = 16
+# max. time (in seconds) to wait for a worker's diagnostics between checking it is still alive
+COLLECT_POLL_INTERVAL = 0.1
 
 
 cdef class FileSyncReplace(ShouldReplaceFileCallbackFn):
@@ -125,7 +124,10 @@ cdef class ExpandSnippet(SnippetCallbackFn):
         cdef object snippet_fn = resolv(snippet)  # LOADS of possible exceptions
         cdef str fn_name
         try:
-            snippet_fn(ctx, prefix, fw)
+            result = snippet_fn(ctx, prefix, fw)
+            # snippet functions may be coroutine functions
+            if result is not None and isawaitable(result):
+                aio.run(result)
         except TypeError as e:
             fn_name = snippet.split('.')[-1]
             if str(e).startswith(f"{fn_name}()"):
@@ -154,33 +156,76 @@ cdef class SCCompileFileCallbackFn(CompileFileCallbackFn):
         Parser parser
         SnippetCallbackFn on_snippet
         int num_calls
+        str tag_open
+        str tag_close
+        object diagnostics
 
-    def __init__(self, Parser parser, SnippetCallbackFn on_snippet):
+    def __init__(self, Parser parser, SnippetCallbackFn on_snippet, str tag_open, str tag_close,
+                 diagnostics: Diagnostics):
         self.parser = parser
         self.on_snippet = on_snippet
         self.num_calls = 0
+        self.tag_open = tag_open
+        self.tag_close = tag_close
+        self.diagnostics = diagnostics
 
     cpdef void parse_file(self, str fpath) except *:
+        aio.prefetch((fpath,), self.tag_open, self.tag_close)
+        self.num_calls += 1
         try:
             self.parser.parse(self.on_snippet, fpath)
         except Exception as e:
-            log_parser_error(fpath, e)
-        self.num_calls += 1
+            self.diagnostics.add(fpath, e)
+            self.diagnostics.check_limit()
+
+
+cdef RenderProfiler start_profiling(str profile_dir):
+    """Install a render profiler in this (worker) process if profiling is enabled."""
+    cdef RenderProfiler prof
+    if profile_dir is None:
+        return None
+    prof = RenderProfiler()
+    set_profiler(prof)
+    return prof
+
+
+cdef void stop_profiling(RenderProfiler prof, str profile_dir, str worker_id) except *:
+    if prof is None:
+        return
+    set_profiler(None)
+    profiler.dump(prof, profile_dir, worker_id)
 
 
-cdef void do_compile_singlecore(parser_conf: ConfParser, CompileWatcher walker,
-                          ShouldReplaceFileCallbackFn should_replace) except *:
+cdef int do_compile_singlecore(parser_conf: ConfParser, CompileWatcher walker,
+                               ShouldReplaceFileCallbackFn should_replace, str profile_dir) except -1:
+    """Compile all files in this process, returns the number of files parsed."""
     cdef:
+        RenderProfiler prof = start_profiling(profile_dir)
         Parser parser = Parser(
             f"/tmp/.ghostwriter-w0-{parser_conf.temp_file_suffix}",
             parser_conf.open, parser_conf.close,
             should_replace_file=should_replace,
             post_process=resolv_opt(parser_conf.post_process_fn))
         ExpandSnippet expand_snippet = ExpandSnippet()
-        SCCompileFileCallbackFn compile_file = SCCompileFileCallbackFn(parser, expand_snippet)
-    sys.path.extend(parser_conf.search_paths)
-    compile_files(walker, compile_file, walker.root_path)
+        object diagnostics = Diagnostics(parser_conf.max_errors)
+        SCCompileFileCallbackFn compile_file = SCCompileFileCallbackFn(
+            parser, expand_snippet, parser_conf.open, parser_conf.close, diagnostics)
+    # may run repeatedly in the same process, see `InProcessCompileFn`
+    sys.path.extend([path for path in parser_conf.search_paths if path not in sys.path])
+    try:
+        compile_files(walker, compile_file, walker.root_path)
+    except TooManyErrors as e:
+        diagnostics.report()
+        log.error(str(e))
+    else:
+        diagnostics.report()
     log.info(f"parsed {compile_file.num_calls} files during compile pass")
+    rendercache.log_stats()
+    dataload.log_stats()
+    sharedcache.log_stats()
+    aio.close()
+    stop_profiling(prof, profile_dir, "0")
+    return compile_file.num_calls
 
 
 cdef class CompileCallbackFn:
@@ -193,17 +238,56 @@ cdef class SingleCoreCompileFn(CompileCallbackFn):
         object parser_conf
         CompileWatcher watcher
         ShouldReplaceFileCallbackFn should_replace
+        str profile_dir
+
+    def __init__(self, parser_conf: ConfParser, CompileWatcher watcher, ShouldReplaceFileCallbackFn should_replace,
+                 str profile_dir = None):
+        self.parser_conf = parser_conf
+        self.watcher = watcher
+        self.should_replace = should_replace
+        self.profile_dir = profile_dir
+
+    cpdef void apply(self) except *:
+        t_start = time()
+        if self.profile_dir is not None:
+            profiler.clean(self.profile_dir)
+        sharedcache.begin_pass()
+        try:
+            p = Process(target=do_compile_singlecore,
+                        args=(self.parser_conf, self.watcher, self.should_replace, self.profile_dir))
+            p.start()
+            p.join()
+        finally:
+            sharedcache.end_pass()
+        log.info("compile finished in {0:.2f}s".format(time() - t_start))
+        if self.profile_dir is not None:
+            profiler.report(self.profile_dir)
+
+
+cdef class InProcessCompileFn(CompileCallbackFn):
+    """Compile in this process rather than a (forked) child process.
+
+    Imported snippet modules and caches (templates, rendered components, data
+    files) persist between passes, see `ghostwriter.cli.server`."""
+    cdef:
+        object parser_conf
+        CompileWatcher watcher
+        ShouldReplaceFileCallbackFn should_replace
+        readonly int num_files
 
     def __init__(self, parser_conf: ConfParser, CompileWatcher watcher, ShouldReplaceFileCallbackFn should_replace):
         self.parser_conf = parser_conf
         self.watcher = watcher
         self.should_replace = should_replace
+        self.num_files = 0
 
     cpdef void apply(self) except *:
         t_start = time()
-        p = Process(target=do_compile_singlecore, args=(self.parser_conf, self.watcher, self.should_replace))
-        p.start()
-        p.join()
+        sharedcache.begin_pass()
+        try:
+            self.num_files = do_compile_singlecore(self.parser_conf, self.watcher, self.should_replace, None)
+        finally:
+            sharedcache.end_pass()
         log.info("compile finished in {0:.2f}s".format(time() - t_start))
 
 
@@ -211,19 +295,54 @@ cdef class MPCompiler(MPScheduler):
     cdef:
         object parser_conf
         ShouldReplaceFileCallbackFn should_replace
+        str profile_dir
+        # errors of the pass, merged from the workers' diagnostics when they stop
+        readonly object diagnostics
+        # errors of the pass so far, shared by all workers to stop early (see `ConfParser.max_errors`)
+        object num_errors
 
     def __init__(self,
                  parser_conf: ConfParser,
-                 ShouldReplaceFileCallbackFn should_replace):
+                 ShouldReplaceFileCallbackFn should_replace,
+                 str profile_dir = None):
         self.parser_conf = parser_conf
         self.should_replace = should_replace
+        self.profile_dir = profile_dir
+        self.diagnostics = Diagnostics(parser_conf.max_errors)
+        self.num_errors = Value('i', 0)
         super().__init__(parser_conf.processes)
 
+    def __enter__(self):
+        self.diagnostics.clear()
+        self.num_errors.value = 0
+        return super().__enter__()
+
+    cdef bint limit_reached(self):
+        cdef int max_errors = self.parser_conf.max_errors
+        return max_errors > 0 and self.num_errors.value >= max_errors
+
+    cpdef void _collect(self) except *:
+        cdef int n
+        for n in range(len(self._procs)):
+            conn = self._pipe_snd[n]
+            proc = self._procs[n]
+            # a worker which crashed never sends its diagnostics
+            while not conn.poll(COLLECT_POLL_INTERVAL):
+                if not proc.is_alive():
+                    break
+            else:
+                try:
+                    self.diagnostics.merge(conn.recv())
+                except (EOFError, OSError) as e:
+                    log.warning(f"failed to receive diagnostics of worker-{n}: {e}")
+
     cpdef void _target(self, str worker_id, object jobs: Connection):
         cdef:
             Parser parser
             str fpath
             ExpandSnippet expand_snippet = ExpandSnippet()
+            RenderProfiler prof = start_profiling(self.profile_dir)
+            object diagnostics = Diagnostics()
         sys.path.extend(self.parser_conf.search_paths)
         parser = Parser(
             f"/tmp/.ghostwriter-w{worker_id}-{self.parser_conf.temp_file_suffix}",
@@ -231,13 +350,32 @@ cdef class MPCompiler(MPScheduler):
             should_replace_file=self.should_replace,
             post_process=resolv_opt(self.parser_conf.post_process_fn))
         fpath = jobs.recv()
-        # with profiler(f"/tmp/{worker_id}"):
         while fpath != "<stop>":
-            try:
-                parser.parse(expand_snippet, fpath)
-            except Exception as e:
-                log_parser_error(fpath, e)
-            fpath = jobs.recv()
+            # take all queued jobs (up to a limit) such that their async snippets run concurrently
+            batch = [fpath]
+            while len(batch) < PREFETCH_BATCH_SIZE and batch[-1] != "<stop>" and jobs.poll():
+                batch.append(jobs.recv())
+            fpath = batch.pop() if batch[-1] == "<stop>" else None
+            aio.prefetch(batch, self.parser_conf.open, self.parser_conf.close)
+            for job in batch:
+                # drain remaining jobs once the pass is stopped
+                if self.limit_reached():
+                    continue
+                try:
+                    parser.parse(expand_snippet, job)
+                except Exception as e:
+                    diagnostics.add(job, e)
+                    with self.num_errors.get_lock():
+                        self.num_errors.value += 1
+            if fpath is None:
+                fpath = jobs.recv()
+        # formatted and reported once by the parent, see `_collect`
+        jobs.send(diagnostics.groups)
+        rendercache.log_stats()
+        dataload.log_stats()
+        sharedcache.log_stats()
+        aio.close()
+        stop_profiling(prof, self.profile_dir, worker_id)
 
 
 cdef class MPCompileFileCallbackFn(CompileFileCallbackFn):
@@ -248,6 +386,8 @@ cdef class MPCompileFileCallbackFn(CompileFileCallbackFn):
         self.compiler = compiler
 
     cpdef void parse_file(self, str fpath) except *:
+        if self.compiler.limit_reached():
+            raise TooManyErrors(self.compiler.parser_conf.max_errors)
         self.num_calls += 1
         self.compiler.submit_one(fpath)
 
@@ -256,22 +396,49 @@ cdef class MultiCoreCompileFn(CompileCallbackFn):
     cdef:
         MPCompiler compiler
         CompileWatcher watcher
-        CompileFileCallbackFn compile_file
+        MPCompileFileCallbackFn compile_file
+        str profile_dir
+        readonly int num_files
 
-    def __init__(self, object parser_conf, CompileWatcher watcher, ShouldReplaceFileCallbackFn should_replace):
-        self.compiler = MPCompiler(parser_conf, should_replace=should_replace)
+    def __init__(self, object parser_conf, CompileWatcher watcher, ShouldReplaceFileCallbackFn should_replace,
+                 str profile_dir = None):
+        self.compiler = MPCompiler(parser_conf, should_replace=should_replace, profile_dir=profile_dir)
         self.watcher = watcher
         self.compile_file = MPCompileFileCallbackFn(self.compiler)
+        self.profile_dir = profile_dir
+        self.num_files = 0
+
+    @property
+    def diagnostics(self) -> Diagnostics:
+        """Errors of the last compile pass."""
+        return self.compiler.diagnostics
 
     cpdef void apply(self) except *:
         t_start = time()
         self.compile_file.num_calls = 0  # reset counter
-        with self.compiler as compiler:
-            compile_files(self.watcher, self.compile_file, self.watcher.root_path)
+        if self.profile_dir is not None:
+            profiler.clean(self.profile_dir)
+        sharedcache.begin_pass()
+        try:
+            with self.compiler as compiler:
+                try:
+                    compile_files(self.watcher, self.compile_file, self.watcher.root_path)
+                except TooManyErrors:
+                    # workers may also stop after all files are submitted, see below
+                    pass
+        finally:
+            sharedcache.end_pass()
+        diagnostics = self.compiler.diagnostics
+        diagnostics.report()
+        if diagnostics.limit_reached:
+            log.error(str(TooManyErrors(diagnostics.max_errors)))
+        self.num_files = self.compile_file.num_calls
         log.info("compile pass: {0} jobs in {1:.2f}s".format(self.compile_file.num_calls, time() - t_start))
+        if self.profile_dir is not None:
+            profiler.report(self.profile_dir)
 
 
-cpdef void cli_compile(config: Configuration, bint watch):
+cpdef void cli_compile(config: Configuration, bint watch, str profile_dir = None):
     cdef:
         str root_path = config.project.absolute().as_posix()
         CompileWatcher watcher = CompileWatcher(root_path, config=config)
@@ -285,18 +452,25 @@ cpdef void cli_compile(config: Configuration, bint watch):
     else:
         should_replace = ShouldReplaceFileAlways()
 
+    if profile_dir is not None:
+        makedirs(profile_dir, exist_ok=True)
+        log.info(f"Profiling rendering, results are written to '{profile_dir}'")
+
     if config.parser.processes == 1:
         log.info("Single-core compile mode selected (change config.parser.processes to enable MP)")
-        compiler = SingleCoreCompileFn(config.parser, watcher, should_replace)
+        compiler = SingleCoreCompileFn(config.parser, watcher, should_replace, profile_dir)
     else:
         log.info(f"MP compile mode selected ({config.parser.processes} processes)")
-        compiler = MultiCoreCompileFn(config.parser, watcher, should_replace)
+        compiler = MultiCoreCompileFn(config.parser, watcher, should_replace, profile_dir)
 
     compiler.apply()
 
     if not watch:
         sys.exit(0)
 
+    # watch mode dependencies (watchgod, aiostream, asyncio) are slow to import
+    from ghostwriter.utils.watch import watch_dirs, WatcherConfig
+
     compile = Debounce(compiler.apply)
     dirs_to_watch = [WatcherConfig('search_path', path, SearchPathsWatcher) for path in config.parser.search_paths]
     dirs_to_watch.append(
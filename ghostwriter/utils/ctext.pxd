@@ -1,3 +1,8 @@
 # cython: language_level=3
 
-cpdef str deindent_block(str s)
\ No newline at end of file
+cpdef str deindent_block(str s)
+cpdef str prefix_lines(str s, str prefix, bint skip_first=*)
+cpdef str indent(str s, str prefix, bint skip_first=*)
+cpdef str reindent(str s, str prefix)
+cdef str prefix_lines_ex(str s, str prefix, bint skip_blank, bint skip_first, Py_ssize_t *nprefixed,
+                         list offsets=*, Py_ssize_t base=*)
@@ -102,3 +102,163 @@ cpdef str deindent_block(str s):
     out_str = out_buf[: out_curr - out_buf]
     PyMem_Free(out_buf)
     return out_str
+
+
+cdef str prefix_lines_ex(str s, str prefix, bint skip_blank, bint skip_first, Py_ssize_t *nprefixed,
+                         list offsets=None, Py_ssize_t base=0):
+    """Insert `prefix` at the start of each line in `s`.
+
+    Blank (whitespace-only) lines are skipped if `skip_blank` is set, and the
+    first line if `skip_first` is set. A trailing newline does not start a new
+    line. The number of prefixes inserted is stored in `nprefixed`, `s` itself
+    is returned if there are none. If `offsets` is given, the offset of each
+    prefix in the output (plus `base`) is appended to it."""
+    cdef:
+        wchar_t *curr
+        wchar_t *end
+        wchar_t *line_start
+        wchar_t *pfx
+        wchar_t *out_buf
+        wchar_t *out_curr
+        Py_ssize_t plen = len(prefix)
+        Py_ssize_t count = 0
+        bint blank
+        bint first = True
+        str out_str
+
+    nprefixed[0] = 0
+    if plen == 0 or len(s) == 0:
+        return s
+    pfx = prefix
+    curr = s
+    end = curr + len(s)
+
+    # pass 1 - count lines to prefix
+    while curr != end:
+        blank = True
+        while curr != end and curr[0] != '\n':
+            if blank and not iswspace(curr[0]):
+                blank = False
+            curr += 1
+        if not (first and skip_first) and not (blank and skip_blank):
+            count += 1
+        first = False
+        if curr != end:
+            curr += 1  # skip the newline
+    if count == 0:
+        return s
+
+    out_buf = <wchar_t *>PyMem_Malloc((len(s) + count * plen) * sizeof(wchar_t))
+    if not out_buf:
+        raise MemoryError("failed to get memory")
+
+    # pass 2 - copy lines, prefixing them as counted before
+    curr = s
+    out_curr = out_buf
+    first = True
+    while curr != end:
+        line_start = curr
+        blank = True
+        while curr != end and curr[0] != '\n':
+            if blank and not iswspace(curr[0]):
+                blank = False
+            curr += 1
+        if curr != end:
+            curr += 1  # include newline in output
+        if not (first and skip_first) and not (blank and skip_blank):
+            if offsets is not None:
+                offsets.append(base + (out_curr - out_buf))
+            memcpy(out_curr, pfx, plen * sizeof(wchar_t))
+            out_curr += plen
+        first = False
+        memcpy(out_curr, line_start, (curr - line_start) * sizeof(wchar_t))
+        out_curr += curr - line_start
+
+    out_str = out_buf[: out_curr - out_buf]
+    PyMem_Free(out_buf)
+    nprefixed[0] = count
+    return out_str
+
+
+cpdef str prefix_lines(str s, str prefix, bint skip_first=False):
+    """Insert `prefix` at the start of every line in `s`, including blank lines."""
+    cdef Py_ssize_t n
+    return prefix_lines_ex(s, prefix, False, skip_first, &n)
+
+
+cpdef str indent(str s, str prefix, bint skip_first=False):
+    """Insert `prefix` at the start of every non-blank line in `s`."""
+    cdef Py_ssize_t n
+    return prefix_lines_ex(s, prefix, True, skip_first, &n)
+
+
+cpdef str reindent(str s, str prefix):
+    """Replace the common indentation of the lines in `s` with `prefix`.
+
+    Blank lines are emptied and left unprefixed, unlike `deindent_block`
+    leading and trailing lines are kept."""
+    cdef:
+        wchar_t *curr
+        wchar_t *end
+        wchar_t *line_start
+        wchar_t *content_start
+        wchar_t *pfx
+        wchar_t *out_buf
+        wchar_t *out_curr
+        Py_ssize_t plen = len(prefix)
+        Py_ssize_t min_prefix = INT_MAX
+        Py_ssize_t count = 0
+        str out_str
+
+    if len(s) == 0:
+        return s
+    pfx = prefix
+    curr = s
+    end = curr + len(s)
+
+    # pass 1 - determine common indentation and number of non-blank lines
+    while curr != end:
+        line_start = curr
+        while curr != end and curr[0] != '\n' and iswspace(curr[0]):
+            curr += 1
+        content_start = curr
+        while curr != end and curr[0] != '\n':
+            curr += 1
+        if content_start != curr:
+            count += 1
+            if content_start - line_start < min_prefix:
+                min_prefix = content_start - line_start
+        if curr != end:
+            curr += 1
+    if count == 0:
+        min_prefix = 0
+
+    out_buf = <wchar_t *>PyMem_Malloc((len(s) + count * plen) * sizeof(wchar_t))
+    if not out_buf:
+        raise MemoryError("failed to get memory")
+
+    # pass 2 - copy lines, replacing the common indentation by the prefix
+    curr = s
+    out_curr = out_buf
+    while curr != end:
+        line_start = curr
+        content_start = curr
+        while content_start != end and content_start[0] != '\n' and iswspace(content_start[0]):
+            content_start += 1
+        curr = content_start
+        while curr != end and curr[0] != '\n':
+            curr += 1
+        if content_start != curr:
+            memcpy(out_curr, pfx, plen * sizeof(wchar_t))
+            out_curr += plen
+            line_start += min_prefix
+            memcpy(out_curr, line_start, (curr - line_start) * sizeof(wchar_t))
+            out_curr += curr - line_start
+        if curr != end:
+            out_curr[0] = '\n'
+            out_curr += 1
+            curr += 1
+
+    out_str = out_buf[: out_curr - out_buf]
+    PyMem_Free(out_buf)
+    return out_str
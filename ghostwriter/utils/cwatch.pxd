@@ -37,4 +37,5 @@ cdef class MPScheduler:
     cpdef void _target(self, str worker_id, object jobs: Connection)
     cdef void _spawn_procs(self)
     cdef void _kill_procs(self)
+    cpdef void _collect(self) except *
     cpdef void submit_one(self, object item)
\ No newline at end of file
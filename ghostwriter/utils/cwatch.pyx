@@ -2,11 +2,21 @@ from os import scandir
 from os.path import relpath
 from re import compile as re_compile
 from multiprocessing import Pipe, Process
-from watchgod.watcher import Change
+from enum import IntEnum
 from ghostwriter.cli.conf import Configuration
 from ghostwriter.utils import itools
 
 
+class Change(IntEnum):
+    """Kinds of file changes, equal to `watchgod.watcher.Change`.
+
+    Defined here as importing watchgod (and with it anyio and asyncio) is
+    slow and only needed in watch mode."""
+    added = 1
+    modified = 2
+    deleted = 3
+
+
 def or_pattern(patterns: list):
     """Compile pattern matching any of the regex strings in `patterns`."""
     cdef str entry
@@ -121,15 +131,25 @@ cdef class MPScheduler:
             self._procs.append(proc)
             proc.start()
 
+    cpdef void _collect(self) except *:
+        """Receive results sent by the stopping workers, before waiting for them to exit."""
+        pass
+
     cdef void _kill_procs(self):
-        for fn in itools.join(
-                (lambda: p.send("<stop>") for p in self._pipe_snd),
-                (p.join for p in self._procs)):
+        for p in self._pipe_snd:
             try:
-                fn()
+                p.send("<stop>")
             except:
                 pass
-        self._procs = []
+        try:
+            self._collect()
+        finally:
+            for p in self._procs:
+                try:
+                    p.join()
+                except:
+                    pass
+            self._procs = []
 
     def close(self) -> None:
         self._kill_procs()
@@ -0,0 +1,86 @@
+"""Cached loading of data files used by snippets.
+
+Snippets frequently render the same data model (YAML or JSON files) into many
+files. `load_yaml` and `load_json` parse each file once per process and return
+the cached result until the file's modification time or size changes.
+
+The loaders are also available from the `Context` passed to snippets, e.g.
+`ctx.load_yaml("model/user.yml")`. Relative paths are resolved against the
+working directory, which is the project directory when compiling.
+
+Cached values are shared between all snippets in the process and must be
+treated as read-only.
+"""
+import typing as t
+import json
+import logging
+from os import stat
+from os.path import abspath
+import yaml
+
+try:
+    # use the (much faster) libyaml bindings if available
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+log = logging.getLogger(__name__)
+
+Parser = t.Callable[[t.IO], t.Any]
+
+
+class DataCache:
+    """Parsed data files, keyed by path and parser, invalidated on modification."""
+    def __init__(self):
+        self.entries: t.Dict[t.Tuple[str, Parser], t.Tuple[int, int, t.Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, fpath: str, parse: Parser) -> t.Any:
+        """Return contents of `fpath` as parsed by `parse`, reading the file only if it changed."""
+        fpath = abspath(fpath)
+        st = stat(fpath)
+        key = (fpath, parse)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        with open(fpath, 'r') as fh:
+            value = parse(fh)
+        self.entries[key] = (st.st_mtime_ns, st.st_size, value)
+        return value
+
+    def clear(self) -> None:
+        """Remove all entries and reset statistics."""
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+data_cache = DataCache()
+
+
+def _parse_yaml(fh: t.IO) -> t.Any:
+    return yaml.load(fh, Loader=SafeLoader)
+
+
+def load_yaml(fpath: str) -> t.Any:
+    """Load YAML file `fpath` (cached, see module docs)."""
+    return data_cache.load(fpath, _parse_yaml)
+
+
+def load_json(fpath: str) -> t.Any:
+    """Load JSON file `fpath` (cached, see module docs)."""
+    return data_cache.load(fpath, json.load)
+
+
+def log_stats() -> None:
+    """Log cache hit rate (debug level)."""
+    if data_cache.hits or data_cache.misses:
+        log.debug(f"data cache: {data_cache.hits} hits, {data_cache.misses} misses "
+                  f"({data_cache.hit_rate():.0%} hit rate, {len(data_cache.entries)} files)")
@@ -0,0 +1,145 @@
+"""Aggregated diagnostics of the errors of a compile pass.
+
+A broken snippet fails the same way in every file using it. Rather than
+logging a full traceback per file, errors are grouped by (snippet, exception
+type, location). Each group is formatted once, when its first error is seen,
+and logged along with the files affected once the pass ends.
+
+Workers collect their own diagnostics and send the groups (see `groups`) to
+the parent process when stopped, which merges (see `merge`) and reports them.
+"""
+import typing as t
+import logging
+import traceback
+import colorama as clr
+from ghostwriter.parser.fileparser import SnippetError
+from ghostwriter.utils.error import error_message, error_details
+
+log = logging.getLogger(__name__)
+
+# (snippet, exception type, location)
+Key = t.Tuple[t.Optional[str], str, t.Optional[str]]
+# [message, details, [(file, line), ...]], lists such that groups can be pickled and merged in place
+Group = t.List[t.Any]
+# max. number of affected files listed per group
+MAX_FILES_LISTED = 20
+
+
+class TooManyErrors(Exception):
+    def __init__(self, max_errors: int):
+        super().__init__(f"stopped compiling after {max_errors} error(s)")
+        self.max_errors = max_errors
+
+
+def root_cause(exc: BaseException) -> BaseException:
+    """Return the exception underlying errors wrapping it for display."""
+    while True:
+        if isinstance(exc, SnippetError):
+            exc = exc.exc
+            continue
+        reason = getattr(exc, 'reason', None)
+        if isinstance(reason, BaseException):
+            exc = reason
+            continue
+        ei = getattr(exc, 'ei', None)
+        if ei is not None and ei.exc is not None:
+            return ei.exc
+        return exc
+
+
+def location(exc: BaseException) -> t.Optional[str]:
+    """Return where `exc` was raised, the innermost template line or Python frame."""
+    loc = None
+    while True:
+        if isinstance(exc, SnippetError):
+            exc = exc.exc
+            continue
+        if getattr(exc, 'component', None) is not None:
+            loc = f"{exc.component}, line {exc.line}"
+        reason = getattr(exc, 'reason', None)
+        if not isinstance(reason, BaseException):
+            break
+        exc = reason
+    if loc is not None:
+        return loc
+    ei = getattr(exc, 'ei', None)
+    if ei is not None and ei.stacktrace:
+        frame = ei.stacktrace[-1]
+        return f"{frame.filename}:{frame.lineno}"
+    tb = exc.__traceback__
+    if tb is None:
+        return None
+    while tb.tb_next is not None:
+        tb = tb.tb_next
+    return f"{tb.tb_frame.f_code.co_filename}:{tb.tb_lineno}"
+
+
+def _traceback(exc: BaseException) -> str:
+    if hasattr(exc, 'error_details'):
+        return (f"  {clr.Fore.MAGENTA}Traceback (most recent call last):{clr.Style.RESET_ALL}\n"
+                f"  {error_details(exc)}")
+    return "  " + "\n  ".join("".join(traceback.format_exception(type(exc), exc, exc.__traceback__)).split("\n"))
+
+
+class Diagnostics:
+    def __init__(self, max_errors: int = 0):
+        # key -> group, in the order first seen
+        self.groups: t.Dict[Key, Group] = {}
+        self.num_errors = 0
+        # stop the pass after this many errors (0: never)
+        self.max_errors = max_errors
+
+    def add(self, fpath: str, e: BaseException) -> None:
+        """Record error `e` raised while parsing `fpath`."""
+        self.num_errors += 1
+        if isinstance(e, SnippetError):
+            key = (e.snippet_name, type(root_cause(e)).__qualname__, location(e))
+            line = e.line_num
+        else:
+            # not caused by a snippet, specific to the file
+            key = (None, type(e).__qualname__, fpath)
+            line = getattr(e, 'line_num', None)
+        group = self.groups.get(key)
+        if group is None:
+            if isinstance(e, SnippetError):
+                message = error_message(e)
+                details = f"  {clr.Fore.MAGENTA}Error: {clr.Style.RESET_ALL}{error_message(e.exc)}\n{_traceback(e.exc)}"
+            else:
+                message = f"{clr.Fore.RED}{error_message(e)}{clr.Style.RESET_ALL}"
+                details = f"  {error_details(e)}" if hasattr(e, 'error_details') else _traceback(e)
+            group = self.groups[key] = [message, details.rstrip(), []]
+        group[2].append((fpath, line))
+
+    def merge(self, groups: t.Dict[Key, Group]) -> None:
+        """Add groups collected elsewhere, e.g. by a worker process."""
+        for key, (message, details, files) in groups.items():
+            self.num_errors += len(files)
+            group = self.groups.get(key)
+            if group is None:
+                self.groups[key] = [message, details, list(files)]
+            else:
+                group[2].extend(files)
+
+    @property
+    def limit_reached(self) -> bool:
+        return 0 < self.max_errors <= self.num_errors
+
+    def check_limit(self) -> None:
+        if self.limit_reached:
+            raise TooManyErrors(self.max_errors)
+
+    def report(self) -> None:
+        """Log each group of errors once, listing the files affected."""
+        for message, details, files in self.groups.values():
+            listed = "\n".join(
+                f"    {fpath}" if line is None else f"    {fpath}, line {line}"
+                for fpath, line in sorted(files, key=lambda f: (f[0], f[1] or 0))[:MAX_FILES_LISTED])
+            more = f"\n    ... and {len(files) - MAX_FILES_LISTED} more" if len(files) > MAX_FILES_LISTED else ""
+            log.error(f"{message}\n{details}\n"
+                      f"  {clr.Fore.MAGENTA}Affected files ({len(files)}):{clr.Style.RESET_ALL}\n{listed}{more}")
+        if self.groups:
+            log.error(f"{self.num_errors} error(s) in {len(self.groups)} group(s) during compile pass")
+
+    def clear(self) -> None:
+        self.groups.clear()
+        self.num_errors = 0
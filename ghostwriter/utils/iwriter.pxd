@@ -1,4 +1,21 @@
 # cython: language_level=3
 
 cdef class IWriter:
-    cpdef void write(self, str contents) except *
\ No newline at end of file
+    cpdef void write(self, str contents) except *
+
+cdef class BufferedWriter(IWriter):
+    cdef:
+        IWriter writer
+        list buf
+        Py_ssize_t buf_len
+        readonly Py_ssize_t threshold
+        readonly Py_ssize_t flushes
+        readonly Py_ssize_t chars_written
+        readonly bint got_newline
+
+    cpdef void flush(self) except *
+
+cdef class StringWriter(IWriter):
+    cdef list buf
+
+    cpdef str getvalue(self)
@@ -1,4 +1,53 @@
 
 cdef class IWriter:
     cpdef void write(self, str contents) except *:
-        pass
\ No newline at end of file
+        pass
+
+
+cdef class BufferedWriter(IWriter):
+    """Accumulate writes, passing them to `writer` in large blocks.
+
+    Contents are written once `threshold` characters are buffered and when
+    `flush` is called - callers must flush when done writing.
+
+    Like `FileWriter`, `got_newline` reflects whether the last write
+    ended with a newline (True if nothing was written)."""
+    def __init__(self, IWriter writer, Py_ssize_t threshold = 65536):
+        self.writer = writer
+        self.buf = []
+        self.buf_len = 0
+        self.threshold = threshold
+        self.flushes = 0
+        self.chars_written = 0
+        self.got_newline = True
+
+    cpdef void write(self, str contents) except *:
+        self.buf.append(contents)
+        self.buf_len += len(contents)
+        self.got_newline = contents.endswith('\n')
+        if self.buf_len >= self.threshold:
+            self.flush()
+
+    cpdef void flush(self) except *:
+        cdef str contents
+        if self.buf_len == 0:
+            self.buf.clear()
+            return
+        contents = ''.join(self.buf)
+        self.buf.clear()
+        self.buf_len = 0
+        self.writer.write(contents)
+        self.flushes += 1
+        self.chars_written += len(contents)
+
+
+cdef class StringWriter(IWriter):
+    """Accumulate writes in memory, see `getvalue`."""
+    def __init__(self):
+        self.buf = []
+
+    cpdef void write(self, str contents) except *:
+        self.buf.append(contents)
+
+    cpdef str getvalue(self):
+        return ''.join(self.buf)
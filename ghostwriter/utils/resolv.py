@@ -1,5 +1,6 @@
 import typing as t
 import logging
+import sys
 from importlib import import_module
 from re import compile as re_compile
 
@@ -82,6 +83,16 @@ module_not_found_rgx = re_compile(r"No module named '(?P<module>[a-zA-Z_]\w*)'")
 module_not_a_package = re_compile(r".*'(?P<notpkg>.*)' is not a package")
 
 
+# fqn -> (module path, module, module spec, attribute, error)
+#
+# Entries are only used while the module they were resolved from is loaded,
+# importing the module anew (e.g. after removing it from `sys.modules`) or
+# `importlib.reload` (which replaces the module's spec) invalidates them.
+# Failures are cached too, those which occurred while importing the module are
+# used until the module is loaded.
+_cache: t.Dict[str, t.Tuple[t.Optional[str], t.Any, t.Any, t.Any, t.Optional[Exception]]] = {}
+
+
 def resolv(fqn_attr: str) -> t.Any:
     """
     Resolves fully qualified path to some attribute to the attribute itself
@@ -95,9 +106,40 @@ def resolv(fqn_attr: str) -> t.Any:
     -------
         The resolved attribute
     """
-    log.debug(f"resolving fqn attr '{fqn_attr}'")
-    mod_path, attr = parse_fqn_identifier(fqn_attr)
-    log.debug(f"expanding {fqn_attr} (attr: {attr}, module: {mod_path})")
+    entry = _cache.get(fqn_attr)
+    if entry is not None:
+        mod_path, mod, spec, value, error = entry
+        if mod is None:
+            valid = mod_path is None or mod_path not in sys.modules
+        else:
+            valid = sys.modules.get(mod_path) is mod and getattr(mod, '__spec__', None) is spec
+        if valid:
+            if error is not None:
+                raise error.with_traceback(None)
+            return value
+    mod_path = mod = spec = value = None
+    try:
+        mod_path, attr = parse_fqn_identifier(fqn_attr)
+        mod = _import(mod_path, attr)
+        spec = getattr(mod, '__spec__', None)
+        try:
+            value = getattr(mod, attr)
+        except AttributeError as e:
+            raise AttrNotFound(mod_path, attr) from e
+    except Exception as e:
+        _cache[fqn_attr] = (mod_path, mod, spec, None, e)
+        raise
+    _cache[fqn_attr] = (mod_path, mod, spec, value, None)
+    return value
+
+
+def clear_cache() -> None:
+    """Forget all resolved attributes and failures."""
+    _cache.clear()
+
+
+def _import(mod_path: str, attr: str):
+    log.debug(f"importing module '{mod_path}' (resolving '{attr}')")
     try:
         mod = import_module(mod_path)
     except ModuleNotFoundError as e:
@@ -109,15 +151,10 @@ def resolv(fqn_attr: str) -> t.Any:
             raise NotAPackage(mod_path, attr, match["notpkg"])
         missing_module = match['module']
         if missing_module in mod_path.split('.'):
-            print(f"mod_path '{mod_path}', missing: '{missing_module}', attr: '{attr}'")
             raise ParentModuleNotFound(mod_path, missing_module, attr) from e
         # some other dependency failed
         raise DependencyModuleNotFound(mod_path, missing_module, attr) from e
-
-    try:
-        return getattr(mod, attr)
-    except AttributeError as e:
-        raise AttrNotFound(mod_path, attr) from e
+    return mod
 
 
 def resolv_opt(val: t.Optional[str], default=None):
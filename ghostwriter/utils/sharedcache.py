@@ -0,0 +1,267 @@
+"""Cache of snippet computations shared by all compile processes.
+
+Expensive computations which give the same result for every file (e.g.
+resolving a schema graph) should be computed once per compile pass rather
+than once per worker process::
+
+    from ghostwriter.utils.sharedcache import cached, memoize
+
+    graph = cached(('schema-graph', 'api.yml'), lambda: resolve_graph('api.yml'))
+
+    @memoize
+    def resolve_graph(fpath): ...
+
+Values are stored in an SQLite database created by the compiler at the start
+of each pass and removed when it ends. Keys and values must be picklable,
+entries are keyed by a hash of the pickled key (content-addressed). If a
+process asks for a value which another process is computing, it waits for
+that result instead of computing it again, unless that process has died.
+
+The database is bounded by a size budget, evicting the oldest entries first.
+It defaults to 256MiB, set `GHOSTWRITER_SHARED_CACHE_SIZE` to change it (in
+bytes). Outside of a compile pass (e.g. in tests), values are cached in
+memory for the lifetime of the process.
+"""
+import typing as t
+import logging
+import pickle
+import sqlite3
+from functools import wraps
+from hashlib import sha1
+from os import environ, getpid, kill, remove
+from tempfile import mkstemp
+from time import sleep, monotonic
+
+log = logging.getLogger(__name__)
+
+# Set by the compiler for the duration of a pass, path to the database shared by its workers.
+ENV_SHARED_CACHE_PATH = "GHOSTWRITER_SHARED_CACHE"
+ENV_SHARED_CACHE_SIZE = "GHOSTWRITER_SHARED_CACHE_SIZE"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# max. time to wait for another process computing a value before computing it anyway
+WAIT_TIMEOUT = 300.0
+POLL_INTERVAL = 0.01
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (id INTEGER PRIMARY KEY, key TEXT UNIQUE, value BLOB, size INTEGER);
+CREATE TABLE IF NOT EXISTS pending (key TEXT PRIMARY KEY, pid INTEGER);
+"""
+
+
+def cache_key(key: t.Any) -> str:
+    """Return the content-addressed key of `key`."""
+    return sha1(pickle.dumps(key, protocol=4)).hexdigest()
+
+
+def _alive(pid: int) -> bool:
+    """Return False if process `pid` has exited (including zombies, which its parent is yet to reap)."""
+    try:
+        kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    try:
+        with open(f"/proc/{pid}/stat") as fh:
+            # state follows the command name, which is in parentheses and may contain spaces
+            return fh.read().rpartition(')')[2].split()[0] != 'Z'
+    except (OSError, IndexError):
+        return True
+
+
+class SharedCache:
+    """Cache backed by the SQLite database at `db_path`, see module docs."""
+    def __init__(self, db_path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.db = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # the database only lives for the duration of a pass, durability is not needed
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def _lookup(self, digest: str) -> t.Optional[bytes]:
+        row = self.db.execute("SELECT value FROM entries WHERE key = ?", (digest,)).fetchone()
+        return row[0] if row else None
+
+    def _claim(self, digest: str) -> bool:
+        """Mark `digest` as being computed by this process, False if another process got there first."""
+        return self.db.execute(
+            "INSERT OR IGNORE INTO pending (key, pid) VALUES (?, ?)", (digest, getpid())).rowcount == 1
+
+    def _store(self, digest: str, blob: bytes) -> None:
+        db = self.db
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            db.execute("INSERT OR REPLACE INTO entries (key, value, size) VALUES (?, ?, ?)",
+                       (digest, blob, len(blob)))
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total > self.max_bytes:
+                # evict oldest entries first
+                for entry_id, size in db.execute("SELECT id, size FROM entries ORDER BY id").fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    db.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+                    total -= size
+            db.execute("DELETE FROM pending WHERE key = ?", (digest,))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def _release(self, digest: str) -> None:
+        self.db.execute("DELETE FROM pending WHERE key = ?", (digest,))
+
+    def _wait(self, digest: str) -> t.Optional[bytes]:
+        """Wait for the process computing `digest`, return None if it failed (or timed out).
+
+        If the process died, its claim is removed and this process claims
+        `digest` instead (returning None). Raises RuntimeError if this process
+        itself is computing `digest`, i.e. if computing the value requires it."""
+        deadline = monotonic() + WAIT_TIMEOUT
+        while monotonic() < deadline:
+            blob = self._lookup(digest)
+            if blob is not None:
+                return blob
+            row = self.db.execute("SELECT pid FROM pending WHERE key = ?", (digest,)).fetchone()
+            if row is None:
+                blob = self._lookup(digest)
+                if blob is not None or self._claim(digest):
+                    return blob
+                continue
+            pid = row[0]
+            if pid == getpid():
+                raise RuntimeError(f"shared cache: computing the value of key {digest} requires the value itself")
+            if not _alive(pid):
+                log.debug(f"shared cache: process {pid} died computing key {digest}, computing it instead")
+                self.db.execute("DELETE FROM pending WHERE key = ? AND pid = ?", (digest, pid))
+                if self._claim(digest):
+                    return None
+                continue
+            sleep(POLL_INTERVAL)
+        return None
+
+    def get_or_compute(self, key: t.Any, compute: t.Callable[[], t.Any]) -> t.Any:
+        """Return value cached under `key`, calling `compute` to compute it if needed."""
+        digest = cache_key(key)
+        blob = self._lookup(digest)
+        if blob is None and not self._claim(digest):
+            blob = self._wait(digest)
+        if blob is not None:
+            self.hits += 1
+            return pickle.loads(blob)
+
+        self.misses += 1
+        try:
+            value = compute()
+        except BaseException:
+            self._release(digest)
+            raise
+        try:
+            blob = pickle.dumps(value, protocol=4)
+        except Exception as e:
+            log.debug(f"shared cache: value of type '{type(value).__qualname__}' cannot be pickled ({e})")
+            self._release(digest)
+            return value
+        if len(blob) > self.max_bytes:
+            self._release(digest)
+        else:
+            self._store(digest, blob)
+        return value
+
+
+class LocalCache:
+    """In-memory stand-in for `SharedCache`, used outside of compile passes."""
+    def __init__(self):
+        self.entries: t.Dict[str, t.Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: t.Any, compute: t.Callable[[], t.Any]) -> t.Any:
+        digest = cache_key(key)
+        try:
+            value = self.entries[digest]
+        except KeyError:
+            self.misses += 1
+            value = self.entries[digest] = compute()
+            return value
+        self.hits += 1
+        return value
+
+    def close(self) -> None:
+        pass
+
+
+_cache: t.Optional[t.Union[SharedCache, LocalCache]] = None
+_cache_pid = 0
+_cache_path: t.Optional[str] = None
+
+
+def get_cache() -> t.Union[SharedCache, LocalCache]:
+    """Return the cache of the current pass (or process, outside of passes)."""
+    global _cache, _cache_pid, _cache_path
+    db_path = environ.get(ENV_SHARED_CACHE_PATH)
+    if _cache is None or _cache_pid != getpid() or _cache_path != db_path:
+        # a connection inherited from the parent process is the parent's to close
+        if _cache is not None and _cache_pid == getpid():
+            _cache.close()
+        if db_path:
+            _cache = SharedCache(db_path, int(environ.get(ENV_SHARED_CACHE_SIZE) or DEFAULT_MAX_BYTES))
+        else:
+            _cache = LocalCache()
+        _cache_pid = getpid()
+        _cache_path = db_path
+    return _cache
+
+
+def cached(key: t.Any, compute: t.Callable[[], t.Any]) -> t.Any:
+    """Return the value cached under `key`, computing it (once per pass) using `compute` if needed."""
+    return get_cache().get_or_compute(key, compute)
+
+
+def memoize(fn: t.Callable) -> t.Callable:
+    """Cache results of `fn` in the shared cache, keyed by its qualified name and arguments."""
+    name = f"{fn.__module__}.{fn.__qualname__}"
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        return cached((name, args, tuple(sorted(kwargs.items()))), lambda: fn(*args, **kwargs))
+    return wrapper
+
+
+def begin_pass() -> str:
+    """Create the database for a compile pass, used by processes started hereafter."""
+    fd, db_path = mkstemp(prefix=".ghostwriter-cache-", suffix=".db")
+    # the database is created by SQLite, only the unique name is needed
+    with open(fd, 'wb'):
+        pass
+    SharedCache(db_path).close()
+    environ[ENV_SHARED_CACHE_PATH] = db_path
+    return db_path
+
+
+def end_pass() -> None:
+    """Close the cache of the current pass and remove its database."""
+    global _cache
+    db_path = environ.pop(ENV_SHARED_CACHE_PATH, None)
+    if not db_path:
+        return
+    if _cache is not None and _cache_pid == getpid() and _cache_path == db_path:
+        _cache.close()
+        _cache = None
+    for fpath in (db_path, f"{db_path}-wal", f"{db_path}-shm"):
+        try:
+            remove(fpath)
+        except FileNotFoundError:
+            pass
+
+
+def log_stats() -> None:
+    """Log hits/misses of this process (debug level)."""
+    if _cache is not None and _cache_pid == getpid() and (_cache.hits or _cache.misses):
+        log.debug(f"shared cache: {_cache.hits} hits, {_cache.misses} misses")
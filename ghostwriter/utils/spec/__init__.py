@@ -1,5 +1,7 @@
 from .spec import (
     Invalid,
+    Failure,
+    Checker,
     Spec,
     SpecBase,
     predicate,
@@ -16,7 +18,10 @@ from .spec import (
 
     valid,
     conform,
-    explain
+    explain,
+    check,
+    compile,
+    validate
 )
 
 # renaming exports
@@ -7,11 +7,29 @@
 
 import typing as t
 
+cdef class Failure:
+    cdef readonly object errors
+
+cdef class Errors:
+    cdef list errors
+    cdef list path
+    cdef Py_ssize_t max_errors
+
+    cdef bint add(self, object error) except -1
+
+cdef class Checker:
+    cpdef object check(self, object value)
+    cdef bint validate(self, object value, Errors errors) except -1
+
 cdef class Spec:
+    cdef Checker _checker
+
     cdef bint valid(self, object value: t.Any)
     cdef object explain(self, object value: t.Any)
     cdef object conform(self, object value: t.Any)
     cdef str name(self)
+    cdef Checker compile(self)
+    cdef Checker checker(self)
 
 cdef class SpecBase(Spec):
     pass
@@ -47,4 +65,50 @@ cdef class Opt(Spec):
     cdef object default
 
 cdef class InSeq(Spec):
-    cdef set opts
\ No newline at end of file
+    cdef set opts
+################################################################################
+# Checkers -- compiled specs, see `Spec.compile`
+################################################################################
+
+cdef class SpecChecker(Checker):
+    cdef Spec spec
+
+cdef class TypeChecker(Checker):
+    cdef type typ
+    cdef str expected
+    cdef bint coerce
+
+cdef class PredicateChecker(Checker):
+    cdef object predicate
+    cdef str error
+
+cdef class AllOfChecker(Checker):
+    cdef tuple labels
+    cdef tuple checkers
+
+cdef class AnyOfChecker(Checker):
+    cdef tuple labels
+    cdef tuple checkers
+
+cdef class SeqOfChecker(Checker):
+    cdef Checker element
+    # set if elements of exactly this type are valid and conform to themselves
+    cdef type element_type
+
+cdef class MapOfChecker(Checker):
+    cdef Checker key
+    cdef Checker val
+
+cdef class KeysChecker(Checker):
+    # (key, kind, checker, default) for each key
+    cdef tuple entries
+
+cdef class OptChecker(Checker):
+    cdef Checker checker
+    cdef object default
+
+cdef class InSeqChecker(Checker):
+    cdef set opts
+
+cdef class AnyChecker(Checker):
+    pass
@@ -1,7 +1,7 @@
 # cython: language_level=3
 import typing as t
 from copy import copy
-from collections.abc import Sequence, Mapping
+from collections.abc import Sequence, Mapping, Iterator
 
 # Inspiration: https://clojure.org/guides/spec
 # Like clojure spec, dicts etc are OPEN
@@ -12,6 +12,47 @@ cdef class _Invalid:
 
 Invalid = _Invalid()
 
+cdef enum KeyKind:
+    KEY_PLAIN, KEY_REQ, KEY_OPT
+
+cdef class Failure:
+    """Result of checking a value which does not satisfy the spec.
+
+    `errors` holds the error tree, as returned by `explain`."""
+    def __init__(self, object errors):
+        self.errors = errors
+
+    def __repr__(self):
+        return f"#Failure<{self.errors!r}>"
+
+cdef inline str pointer_token(object key):
+    return str(key).replace('~', '~0').replace('/', '~1')
+
+cdef class Errors:
+    """Errors collected by `validate`, each a (JSON pointer, error) pair."""
+    def __init__(self, Py_ssize_t max_errors):
+        self.errors = []
+        self.path = []
+        self.max_errors = max_errors
+
+    cdef bint add(self, object error) except -1:
+        """Record `error` at the current path, returns False once `max_errors` are recorded."""
+        pointer = ''.join(['/' + pointer_token(key) for key in self.path])
+        self.errors.append((pointer, error))
+        return self.max_errors <= 0 or len(self.errors) < self.max_errors
+
+cdef class Checker:
+    """Spec compiled for checking values in a single traversal, see `check`."""
+    cpdef object check(self, object value):
+        raise NotImplementedError("check is not implemented")
+
+    cdef bint validate(self, object value, Errors errors) except -1:
+        """Record errors of `value` in `errors`, returns False to stop validating."""
+        out = self.check(value)
+        if type(out) is Failure:
+            return errors.add((<Failure>out).errors)
+        return True
+
 cdef class Spec:
     cdef bint valid(self, object value):
         raise NotImplementedError("valid is not implemented")
@@ -25,6 +66,14 @@ cdef class Spec:
     cdef str name(self):
         return self.__repr__()
 
+    cdef Checker compile(self):
+        return SpecChecker(self)
+
+    cdef Checker checker(self):
+        if self._checker is None:
+            self._checker = self.compile()
+        return self._checker
+
 cdef class SpecBase(Spec):
     cdef bint valid(self, object value: t.Any):
         return self._valid(value)
@@ -58,6 +107,9 @@ cdef class Type(Spec):
     cdef str name(self):
         return f"Type<{self.typ.__name__}>"
 
+    cdef Checker compile(self):
+        return TypeChecker(self.typ, f"expected instance of '{self.typ.__name__}'", False)
+
 def typ(o: t.Type) -> Spec:
     if not isinstance(o, type):
         raise ValueError("argument should be a type")
@@ -97,6 +149,9 @@ cdef class Predicate(Spec):
     cdef str name(self):
         return self.predicate_name + "?"
 
+    cdef Checker compile(self):
+        return PredicateChecker(self.predicate, f"predicate '{self.predicate_name}' failed")
+
 def predicate(c: t.Callable[[t.Any], bool], name: t.Optional[str] = None) -> Predicate:
     return Predicate(c, name)
 
@@ -137,6 +192,10 @@ cdef class AllOf(Spec):
     cdef str name(self):
         return f"all<{', '.join(self.specs.keys())}>"
 
+    cdef Checker compile(self):
+        cdef Spec spec
+        return AllOfChecker(tuple(self.specs.keys()), tuple([spec.checker() for spec in self.specs.values()]))
+
 def allof(dict specmap: t.Dict[str, Spec]) -> AllOf:
     return AllOf(specmap)
 
@@ -181,6 +240,10 @@ cdef class AnyOf(Spec):
     cdef str name(self):
         return f"any<{', '.join(self.specs.keys())}>"
 
+    cdef Checker compile(self):
+        cdef Spec spec
+        return AnyOfChecker(tuple(self.specs.keys()), tuple([spec.checker() for spec in self.specs.values()]))
+
 def anyof(dict specmap: t.Dict[str, Spec]) -> AnyOf:
     return AnyOf(specmap)
 
@@ -228,6 +291,9 @@ cdef class SeqOf(Spec):
     cdef str name(self):
         return f"seq-of<{self.element_spec.name()}>"
 
+    cdef Checker compile(self):
+        return SeqOfChecker(self.element_spec.checker())
+
 def seqof(Spec element_spec: Spec) -> SeqOf:
     return SeqOf(element_spec)
 
@@ -298,6 +364,9 @@ cdef class MapOf(Spec):
     cdef str name(self):
         return f"map-of<{self.key_spec.name()}: {self.val_spec.name()}>"
 
+    cdef Checker compile(self):
+        return MapOfChecker(self.key_spec.checker(), self.val_spec.checker())
+
 def mapof(Spec keyspec: Spec, Spec valspec: Spec) -> MapOf:
     return MapOf(keyspec, valspec)
 
@@ -366,6 +435,20 @@ cdef class Keys(Spec):
         cdef dict out = {key: spec.name() for key, spec in self.spec.items()}
         return f"keys<{out}>"
 
+    cdef Checker compile(self):
+        cdef:
+            list entries = []
+            Spec spec
+        for key, spec in self.spec.items():
+            # Req is flattened into the entry, Opt needs its checker to substitute None
+            if isinstance(spec, Req):
+                entries.append((key, KEY_REQ, (<Req>spec).spec.checker(), None))
+            elif isinstance(spec, Opt):
+                entries.append((key, KEY_OPT, spec.checker(), (<Opt>spec).default))
+            else:
+                entries.append((key, KEY_PLAIN, spec.checker(), None))
+        return KeysChecker(tuple(entries))
+
 def keys(dict spec: t.Dict[t.Any, Spec]) -> Keys:
     return Keys(spec)
 
@@ -385,6 +468,9 @@ cdef class Req(Spec):
     cdef str name(self):
         return f"Req<{self.spec.name()}>"
 
+    cdef Checker compile(self):
+        return self.spec.checker()
+
 def req(Spec spec) -> Req:
     return Req(spec)
 
@@ -414,6 +500,9 @@ cdef class Opt(Spec):
     cdef str name(self):
         return f"Opt<{self.spec.name()}>"
 
+    cdef Checker compile(self):
+        return OptChecker(self.spec.checker(), self.default)
+
 def opt(Spec spec, default = None) -> Opt:
     return Opt(spec, default)
 
@@ -437,6 +526,9 @@ cdef class InSeq(Spec):
     cdef str name(self):
         return f"InSeq<{', '.join(self.opts)}>"
 
+    cdef Checker compile(self):
+        return InSeqChecker(self.opts)
+
 def inseq(seq: t.Sequence[t.Any]) -> InSeq:
     return InSeq(seq)
 
@@ -453,6 +545,9 @@ cdef class Any(Spec):
     cdef object conform(self, value):
         return value
 
+    cdef Checker compile(self):
+        return AnyChecker()
+
 def any() -> Any:
     return Any()
 
@@ -479,6 +574,9 @@ cdef class Int(Spec):
     cdef str name(self):
         return "Int"
 
+    cdef Checker compile(self):
+        return TypeChecker(int, "expected 'int'", True)
+
 cdef class Float(Spec):
     cdef bint valid(self, value: t.Any):
         return isinstance(value, float)
@@ -496,6 +594,9 @@ cdef class Float(Spec):
     cdef str name(self):
         return "Float"
 
+    cdef Checker compile(self):
+        return TypeChecker(float, "expected 'float'", True)
+
 cdef class Str(Spec):
     cdef bint valid(self, value: t.Any):
         return isinstance(value, str)
@@ -510,6 +611,9 @@ cdef class Str(Spec):
     cdef str name(self):
         return "Str"
 
+    cdef Checker compile(self):
+        return TypeChecker(str, "expected 'str'", True)
+
 cdef class Bool(Spec):
     cdef bint valid(self, value: t.Any):
         return isinstance(value, bool)
@@ -527,6 +631,300 @@ cdef class Bool(Spec):
     cdef str name(self):
         return "Bool"
 
+    cdef Checker compile(self):
+        return TypeChecker(bool, "expected 'bool'", True)
+
+
+################################################################################
+# Checkers
+################################################################################
+# A checker validates and conforms a value in a single traversal, producing
+# the conformed value or, if the value is invalid, a `Failure` with the errors
+# `explain` would give. Specs are compiled into checkers once (see
+# `Spec.checker`), flattening wrappers like `req` and specializing checks of
+# types.
+
+cdef class SpecChecker(Checker):
+    """Fallback for specs without a specialized checker (e.g. `SpecBase` subclasses)."""
+    def __init__(self, Spec spec):
+        self.spec = spec
+
+    cpdef object check(self, object value):
+        if self.spec.valid(value):
+            return self.spec.conform(value)
+        return Failure(self.spec.explain(value))
+
+cdef class TypeChecker(Checker):
+    def __init__(self, type typ, str expected, bint coerce):
+        self.typ = typ
+        self.expected = expected
+        self.coerce = coerce
+
+    cpdef object check(self, object value):
+        if type(value) is self.typ:
+            return value
+        if isinstance(value, self.typ):
+            return self.typ(value) if self.coerce else value
+        return Failure(f"{self.expected}, got '{type(value).__name__}'")
+
+    cdef bint validate(self, object value, Errors errors) except -1:
+        if isinstance(value, self.typ):
+            return True
+        return errors.add(f"{self.expected}, got '{type(value).__name__}'")
+
+cdef class PredicateChecker(Checker):
+    def __init__(self, object predicate, str error):
+        self.predicate = predicate
+        self.error = error
+
+    cpdef object check(self, object value):
+        try:
+            out = self.predicate(value)
+        except:
+            return Failure(self.error)
+        if out is False:
+            return Failure(self.error)
+        return out
+
+cdef class AllOfChecker(Checker):
+    """Checks value against each spec in turn, passing on the conformed value."""
+    def __init__(self, tuple labels, tuple checkers):
+        self.labels = labels
+        self.checkers = checkers
+
+    cpdef object check(self, object value):
+        cdef:
+            dict errors = None
+            Checker checker
+            Py_ssize_t i
+        for i in range(len(self.checkers)):
+            checker = self.checkers[i]
+            out = checker.check(value)
+            if type(out) is Failure:
+                if errors is None:
+                    errors = {}
+                errors[self.labels[i]] = (<Failure>out).errors
+            elif errors is None:
+                value = out
+        if errors is not None:
+            return Failure(errors)
+        return value
+
+cdef class AnyOfChecker(Checker):
+    """Conforms value using the first spec it satisfies, giving (label, conformed value)."""
+    def __init__(self, tuple labels, tuple checkers):
+        self.labels = labels
+        self.checkers = checkers
+
+    cpdef object check(self, object value):
+        cdef:
+            dict errors = {}
+            Checker checker
+            Py_ssize_t i
+        for i in range(len(self.checkers)):
+            checker = self.checkers[i]
+            out = checker.check(value)
+            if type(out) is not Failure:
+                return self.labels[i], out
+            errors[self.labels[i]] = (<Failure>out).errors
+        return Failure(errors)
+
+cdef class SeqOfChecker(Checker):
+    def __init__(self, Checker element):
+        self.element = element
+        if isinstance(element, TypeChecker):
+            self.element_type = (<TypeChecker>element).typ
+
+    cpdef object check(self, object value):
+        cdef:
+            list result
+            list errors = None
+            Py_ssize_t ndx
+            Checker element = self.element
+        if not isinstance(value, Sequence):
+            return Failure("Not a sequence")
+        if self.element_type is not None:
+            for elem in value:
+                if type(elem) is not self.element_type:
+                    break
+            else:
+                return list(value)
+        result = []
+        for ndx, elem in enumerate(value):
+            out = element.check(elem)
+            if type(out) is Failure:
+                if errors is None:
+                    errors = []
+                errors.append((ndx, (<Failure>out).errors))
+            elif errors is None:
+                result.append(out)
+        if errors is not None:
+            return Failure(errors)
+        return result
+
+    cdef bint validate(self, object value, Errors errors) except -1:
+        cdef:
+            Py_ssize_t ndx = 0
+            Checker element = self.element
+            type element_type = self.element_type
+            list path = errors.path
+            bint cont
+        # iterators are validated as they are consumed
+        if not isinstance(value, (Sequence, Iterator)):
+            return errors.add("Not a sequence")
+        for elem in value:
+            if type(elem) is not element_type:
+                path.append(ndx)
+                cont = element.validate(elem, errors)
+                path.pop()
+                if not cont:
+                    return False
+            ndx += 1
+        return True
+
+cdef class MapOfChecker(Checker):
+    def __init__(self, Checker key, Checker val):
+        self.key = key
+        self.val = val
+
+    cpdef object check(self, object value):
+        cdef:
+            dict result = {}
+            dict errors = None
+            dict entry_errors
+        if not isinstance(value, Mapping):
+            return Failure(f"expected 'Mapping', got non-mapping '{type(value)}'")
+        for key, val in value.items():
+            key_out = self.key.check(key)
+            val_out = self.val.check(val)
+            if type(key_out) is Failure or type(val_out) is Failure:
+                entry_errors = {}
+                if type(key_out) is Failure:
+                    entry_errors['key'] = (<Failure>key_out).errors
+                if type(val_out) is Failure:
+                    entry_errors['value'] = (<Failure>val_out).errors
+                if errors is None:
+                    errors = {}
+                errors[key] = entry_errors
+            elif errors is None:
+                result[key_out] = val_out
+        if errors is not None:
+            return Failure(errors)
+        return result
+
+    cdef bint validate(self, object value, Errors errors) except -1:
+        cdef:
+            list path = errors.path
+            bint cont = True
+        if not isinstance(value, Mapping):
+            return errors.add(f"expected 'Mapping', got non-mapping '{type(value)}'")
+        for key, val in value.items():
+            path.append(key)
+            key_out = self.key.check(key)
+            if type(key_out) is Failure:
+                cont = errors.add({'key': (<Failure>key_out).errors})
+            if cont:
+                cont = self.val.validate(val, errors)
+            path.pop()
+            if not cont:
+                return False
+        return True
+
+cdef class KeysChecker(Checker):
+    def __init__(self, tuple entries):
+        self.entries = entries
+
+    cpdef object check(self, object value):
+        cdef:
+            dict result = {}
+            dict errors = None
+            tuple entry
+            Checker checker
+        if not isinstance(value, Mapping):
+            return Failure(f"expected 'Mapping', got non-mapping '{type(value)}'")
+        for entry in self.entries:
+            key = entry[0]
+            try:
+                val = value[key]
+            except KeyError:
+                if entry[1] == KEY_REQ:
+                    if errors is None:
+                        errors = {}
+                    errors[key] = "required value missing"
+                elif entry[1] == KEY_OPT:
+                    result[key] = entry[3]
+                continue
+            checker = entry[2]
+            out = checker.check(val)
+            if type(out) is Failure:
+                if errors is None:
+                    errors = {}
+                errors[key] = (<Failure>out).errors
+            else:
+                result[key] = out
+        if errors is not None:
+            return Failure(errors)
+        out = copy(value)
+        out.update(result)
+        return out
+
+    cdef bint validate(self, object value, Errors errors) except -1:
+        cdef:
+            list path = errors.path
+            tuple entry
+            Checker checker
+            bint cont
+        if not isinstance(value, Mapping):
+            return errors.add(f"expected 'Mapping', got non-mapping '{type(value)}'")
+        for entry in self.entries:
+            key = entry[0]
+            try:
+                val = value[key]
+            except KeyError:
+                if entry[1] != KEY_REQ:
+                    continue
+                path.append(key)
+                cont = errors.add("required value missing")
+            else:
+                checker = entry[2]
+                path.append(key)
+                cont = checker.validate(val, errors)
+            path.pop()
+            if not cont:
+                return False
+        return True
+
+cdef class OptChecker(Checker):
+    def __init__(self, Checker checker, object default):
+        self.checker = checker
+        self.default = default
+
+    cpdef object check(self, object value):
+        if value is None:
+            return self.default
+        return self.checker.check(value)
+
+    cdef bint validate(self, object value, Errors errors) except -1:
+        if value is None:
+            return True
+        return self.checker.validate(value, errors)
+
+cdef class InSeqChecker(Checker):
+    def __init__(self, set opts):
+        self.opts = opts
+
+    cpdef object check(self, object value):
+        if value in self.opts:
+            return value
+        return Failure(f"value not in {', '.join(self.opts)}")
+
+cdef class AnyChecker(Checker):
+    cpdef object check(self, object value):
+        return value
+
+    cdef bint validate(self, object value, Errors errors) except -1:
+        return True
+
 
 ################################################################################
 
@@ -539,3 +937,26 @@ def conform(spec: Spec, object value: t.Any) -> t.Any:
 
 def explain(spec: Spec, object value: t.Any) -> t.Any:
     return spec.explain(value)
+
+
+def compile(Spec spec) -> Checker:
+    """Return `spec` compiled to a checker, compiled checkers are cached by the spec."""
+    return spec.checker()
+
+def check(Spec spec, object value: t.Any) -> t.Any:
+    """Validate and conform `value` in a single traversal.
+
+    Returns the conformed value or, if `value` is not valid, a `Failure`
+    holding the errors which `explain` would return."""
+    return spec.checker().check(value)
+
+def validate(Spec spec, object value: t.Any, Py_ssize_t max_errors = 0) -> t.List[t.Tuple[str, t.Any]]:
+    """Validate `value`, returning its errors as (JSON pointer, error) pairs.
+
+    Intended for large datasets - validation stops once `max_errors` errors
+    are found (0 finds all errors) and `seqof` accepts iterators (e.g.
+    generators), consuming them without materializing the sequence. Values
+    are not conformed."""
+    cdef Errors errors = Errors(max_errors)
+    spec.checker().validate(value, errors)
+    return errors.errors
@@ -1,28 +1,18 @@
+from array import array
 from io import StringIO
 import attr
 import typing as t
-from typing_extensions import Protocol
 from ghostwriter.utils.iwriter import IWriter
 
 
 # Minimal writer inspired by PicoCog
 # https://github.com/ainslec/picocog/blob/master/src/main/java/org/ainslec/picocog/PicoWriter.java
-
-
-@attr.s(frozen=True)
-class Newline:
-    indents = attr.ib(type=int)
-
-
-_indent_cache: t.Dict[int, Newline] = {}
-
-
-class Section(Protocol):
-    def render(self, out: IWriter) -> None:
-        ...
-
-
-WriterElement = t.Union[Section, str, Newline]
+#
+# Lines are stored in two parallel arrays, `_levels` holding the indentation
+# level of each line relative to the writer and `_lines` holding the line
+# itself - either a string or a section (another writer) spliced in at that
+# level. Because indentation is relative, a section may be rendered on its
+# own, cached and spliced into any number of writers at any depth.
 
 
 def natint(_, attribute, value):
@@ -33,14 +23,16 @@ def natint(_, attribute, value):
 @attr.s
 class Writer:
     _prefix = attr.ib(default='', type=str)
-    # base indentation level for the whole block
+    # indentation level of the next line, relative to the writer
     _indents = attr.ib(init=False, default=0, type=int, validator=natint)
     # add this as prefix when indenting lines
     _indent_by = attr.ib(default=' ', type=str)
-    # all the written content
-    _content = attr.ib(init=False, type=t.List[WriterElement], factory=list)
-    # temporary buffer - holds at most a single line
-    _buf = attr.ib(init=False, repr=False, factory=StringIO)
+    # relative indentation level of each entry in `_lines`
+    _levels = attr.ib(init=False, repr=False, factory=lambda: array('I'))
+    # all the written content, lines (str) and spliced sections (Writer)
+    _lines = attr.ib(init=False, type=t.List[t.Union[str, 'Writer']], factory=list)
+    # temporary buffer - fragments of the current line
+    _buf = attr.ib(init=False, repr=False, type=t.List[str], factory=list)
 
     def indent(self):
         self._indents += 1
@@ -51,68 +43,97 @@ class Writer:
         else:
             raise RuntimeError("cannot dedent past initial indentation level")
 
-    def __newline(self):
-        indents = self._indents
-        if indents not in _indent_cache:
-            nl = Newline(indents)
-            _indent_cache[indents] = nl
-            return nl
-        return _indent_cache[indents]
-
     def __flush(self):
-        self._content.extend([self.__newline(), self._buf.getvalue()])
-        self._buf = StringIO()
+        buf = self._buf
+        self._levels.append(self._indents)
+        self._lines.append(buf[0] if len(buf) == 1 else ''.join(buf))
+        buf.clear()
 
     def write(self, s):
-        self._buf.write(s)
+        self._buf.append(s)
 
     def writeln(self, s):
-        self._buf.write(s)
+        self._buf.append(s)
         self.__flush()
 
     def writeln_r(self, s):
-        self._buf.write(s)
+        self._buf.append(s)
         self.__flush()
         self._indents += 1
 
     def writeln_l(self, s):
-        self._indents -= 1
-        if self._indents < 0:
+        if self._indents == 0:
             raise RuntimeError("cannot dedent past initial indentation level")
-        self._buf.write(s)
+        self._indents -= 1
+        self._buf.append(s)
         self.__flush()
 
     def writeln_lr(self, s):
-        self._indents -= 1
-        if self._indents < 0:
+        if self._indents == 0:
             raise RuntimeError("cannot dedent past initial indentation level")
-        self._buf.write(s)
+        self._indents -= 1
+        self._buf.append(s)
         self.__flush()
         self._indents += 1
 
+    def splice(self, section: "Writer") -> None:
+        """Insert `section` at the current indentation level.
+
+        The section is rendered with the writer, including lines written to it
+        after splicing. A section may be spliced any number of times."""
+        if section is self:
+            raise ValueError("cannot splice a writer into itself")
+        if self._buf:
+            self.__flush()
+        self._levels.append(self._indents)
+        self._lines.append(section)
+
     def section(self) -> "Writer":
-        self.__flush()
-        w = Writer(
-            prefix=self._prefix + self._indent_by * self._indents,
-            indent_by=self._indent_by)
-        self._content.append(w)
+        """Return new writer whose contents are rendered at the current position."""
+        w = Writer(indent_by=self._indent_by)
+        self.splice(w)
         return w
 
-    # Union to avoid spurious type warnings
-    def render(self, buf: t.Union[IWriter, StringIO]) -> None:
-        if self._buf.tell() != 0:
+    def lines(self) -> t.Iterator[t.Tuple[int, str]]:
+        """Yield all lines, including those of sections, as (indentation level, text) pairs.
+
+        Raises ValueError if a section is (indirectly) spliced into itself."""
+        if self._buf:
             self.__flush()
-        content = self._content
-        # Skip leading newline created when writing a line first
-        if content and isinstance(content[0], Newline):
-            content = content[1:]
-        for elem in content:
-            if isinstance(elem, str):
-                buf.write(elem)
-            elif isinstance(elem, Newline):
-                buf.write(f"\n{self._prefix}{self._indent_by * elem.indents}")
+        stack = [(self, 0, zip(self._levels, self._lines))]
+        # writers on the stack, a section among them would be rendered endlessly
+        active = {id(self)}
+        while stack:
+            _, base, entries = stack[-1]
+            for level, line in entries:
+                if type(line) is str:
+                    yield base + level, line
+                else:
+                    if id(line) in active:
+                        raise ValueError("cannot render a writer spliced into itself")
+                    if line._buf:
+                        line.__flush()
+                    active.add(id(line))
+                    stack.append((line, base + level, zip(line._levels, line._lines)))
+                    break
             else:
-                elem.render(buf)
+                active.discard(id(stack.pop()[0]))
+
+    def getvalue(self) -> str:
+        """Return rendered contents as a single string."""
+        prefix = self._prefix
+        indent_by = self._indent_by
+        indents: t.List[str] = []
+        out = []
+        for level, text in self.lines():
+            while level >= len(indents):
+                indents.append(prefix + indent_by * len(indents))
+            out.append(indents[level] + text)
+        return "\n".join(out)
 
-# Cannot reuse sections with this writer
-# (Because indentation is absolute)
+    # Union to avoid spurious type warnings
+    def render(self, buf: t.Union[IWriter, StringIO]) -> None:
+        """Write rendered contents to `buf` in a single write."""
+        contents = self.getvalue()
+        if contents:
+            buf.write(contents)
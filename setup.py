@@ -111,9 +111,14 @@ setup(
         Extension("ghostwriter.utils.compile", ["ghostwriter/utils/compile.pyx"]),
         Extension("ghostwriter.utils.error", ["ghostwriter/utils/error.pyx"]),
         Extension("ghostwriter.utils.cogen.tokenizer", ["ghostwriter/utils/cogen/tokenizer.pyx"]),
+        Extension("ghostwriter.utils.cogen.scope", ["ghostwriter/utils/cogen/scope.pyx"]),
+        Extension("ghostwriter.utils.cogen.profiler", ["ghostwriter/utils/cogen/profiler.pyx"]),
+        Extension("ghostwriter.utils.cogen.rendercache", ["ghostwriter/utils/cogen/rendercache.pyx"]),
         Extension("ghostwriter.utils.cogen.interpreter", ["ghostwriter/utils/cogen/interpreter.pyx"]),
+        Extension("ghostwriter.utils.cogen.codegen", ["ghostwriter/utils/cogen/codegen.pyx"]),
         Extension("ghostwriter.utils.cogen.snippet", ["ghostwriter/utils/cogen/snippet.pyx"]),
         Extension("ghostwriter.utils.cogen.pratt", ["ghostwriter/utils/cogen/pratt.pyx"]),
+        Extension("ghostwriter.utils.cogen.fastexpr", ["ghostwriter/utils/cogen/fastexpr.pyx"]),
         Extension("ghostwriter.utils.cogen.parser", ["ghostwriter/utils/cogen/parser.pyx"]),
     ], annotate=True),
     cmdclass={
@@ -513,6 +513,30 @@ indent_lines_expr = TestCase(
     )
 )
 
+indent_lines_multiline_expr = TestCase(
+    "show how lines of multi-line expr values are indented like the line itself",
+    [
+        "   x = <<msg>>;",
+        "<<msg>>",
+    ],
+    nf.program([
+        nf.line('   ', [nf.literal("x = "), nf.expr("msg"), nf.literal(";")]),
+        nf.line('', [nf.expr("msg")]),
+    ]),
+    Example(
+        'blank lines are not indented',
+        [
+            "   x = a",
+            "",
+            "     b;",
+            "a",
+            "",
+            "  b\n",
+        ],
+        {"msg": "a\n\n  b"}
+    )
+)
+
 # TODO: a variant of this where the if-block's contents are deindented will produce an 'invalid indentation' error
 indent_if_toplevel = TestCase(
     "show how if-block contents are indented relative to the if opening line",
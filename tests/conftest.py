@@ -48,3 +48,17 @@ def tmpfile():
                 os.remove(file_path) if REMOVE_FILES else '<noop>'
             except:
                 pass
+
+
+@pytest.fixture(autouse=True, scope='session')
+def ast_cache_dir(tmp_path_factory):
+    """Keep the on-disk AST cache used by components out of the user's home directory."""
+    prev = os.environ.get('GHOSTWRITER_CACHE_DIR')
+    os.environ['GHOSTWRITER_CACHE_DIR'] = str(tmp_path_factory.mktemp('gw-cache'))
+    try:
+        yield os.environ['GHOSTWRITER_CACHE_DIR']
+    finally:
+        if prev is None:
+            del os.environ['GHOSTWRITER_CACHE_DIR']
+        else:
+            os.environ['GHOSTWRITER_CACHE_DIR'] = prev
@@ -0,0 +1,102 @@
+import os
+import sys
+import time
+import subprocess
+from pathlib import Path
+import pytest
+
+from ghostwriter.cli.server import request, SOCKET_NAME
+
+ROOT = Path(__file__).parent.parent
+
+CONF = """\
+logging:
+  level: info
+parser:
+  processes: 1
+  include_patterns:
+    - '.*\\.c$'
+  search_paths:
+    - snippets
+"""
+
+SNIPPET = """\
+def greeting(ctx, prefix, fw):
+    fw.write(f"{prefix}{GREETING}\\n")
+
+GREETING = '%s'
+"""
+
+SOURCE = """\
+// <@@snips.greeting@@>
+// <@@/snips.greeting@@>
+"""
+
+
+def gwrite(*args: str, **kwargs) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(ROOT), os.environ.get('PYTHONPATH', '')]))
+    return subprocess.run([sys.executable, "-m", "ghostwriter", *args], env=env,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, **kwargs)
+
+
+def write_snippet(project: Path, greeting: str):
+    fpath = project / "snippets" / "snips.py"
+    fpath.write_text(SNIPPET % greeting)
+    # ensure the change is seen, even if the file system has a coarse mtime resolution
+    mtime = time.time() + 10
+    os.utime(fpath, (mtime, mtime))
+
+
+@pytest.fixture
+def project(tmp_path):
+    (tmp_path / "ghostwriter.conf.yml").write_text(CONF)
+    (tmp_path / "snippets").mkdir()
+    write_snippet(tmp_path, "hello")
+    (tmp_path / "main.c").write_text(SOURCE)
+    return tmp_path
+
+
+@pytest.fixture
+def server(project):
+    sock_path = str(project / SOCKET_NAME)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(ROOT), os.environ.get('PYTHONPATH', '')]))
+    proc = subprocess.Popen([sys.executable, "-m", "ghostwriter", "server", "--project", str(project)],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 10
+    while request({'cmd': 'ping'}, sock_path) is None:
+        assert proc.poll() is None, "server exited prematurely"
+        assert time.time() < deadline, "server did not start"
+        time.sleep(0.05)
+    yield sock_path
+    if proc.poll() is None:
+        proc.terminate()
+    proc.wait(5)
+
+
+def test_compile_via_server(project, server):
+    assert gwrite("compile", "--project", str(project)).returncode == 0
+    assert "hello" in (project / "main.c").read_text()
+    assert request({'cmd': 'ping'}, server)['compiles'] == 1
+
+    # changed snippets are re-imported
+    write_snippet(project, "goodbye")
+    assert gwrite("compile", "--project", str(project)).returncode == 0
+    assert "goodbye" in (project / "main.c").read_text()
+    assert request({'cmd': 'ping'}, server)['compiles'] == 2
+
+    # bypassing the server compiles locally
+    assert gwrite("compile", "--no-server", "--project", str(project)).returncode == 0
+    assert request({'cmd': 'ping'}, server)['compiles'] == 2
+
+
+def test_stop(server):
+    assert request({'cmd': 'stop'}, server) == {'status': 'ok'}
+    deadline = time.time() + 5
+    while os.path.exists(server):
+        assert time.time() < deadline, "socket not removed"
+        time.sleep(0.05)
+    assert request({'cmd': 'ping'}, server) is None
+
+
+def test_unknown_command(server):
+    assert request({'cmd': 'frobnicate'}, server)['status'] == 'error'
@@ -0,0 +1,63 @@
+import os
+import re
+import sys
+import subprocess
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).parent.parent
+# max. total time (in microseconds) spent importing modules for `gwrite compile` on an empty project
+IMPORT_BUDGET_US = 200_000
+# modules only needed in watch mode or by async snippets
+DEFERRED_MODULES = ['watchgod', 'aiostream', 'asyncio', 'ghostwriter.utils.watch']
+
+CONF = """\
+logging:
+  level: warning
+parser:
+  processes: 1
+  include_patterns:
+    - '.*\\.c$'
+  search_paths:
+    - snippets
+"""
+
+rgx_import = re.compile(r"^import time:\s+(\d+) \|\s+\d+ \| ( *)(\S+)$")
+
+
+@pytest.fixture
+def empty_project(tmp_path):
+    (tmp_path / "ghostwriter.conf.yml").write_text(CONF)
+    (tmp_path / "snippets").mkdir()
+    return tmp_path
+
+
+def import_times(*args: str):
+    """Run gwrite with `args`, return the time (in microseconds) spent importing each module."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(ROOT), os.environ.get('PYTHONPATH', '')]))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-m", "ghostwriter", *args],
+                          env=env, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                          universal_newlines=True)
+    assert proc.returncode == 0, proc.stderr
+    times = {}
+    for line in proc.stderr.splitlines():
+        m = rgx_import.match(line)
+        if m:
+            times[m.group(3)] = int(m.group(1))
+    return times
+
+
+def test_compile_deferred_imports(empty_project):
+    times = import_times("compile", "--project", str(empty_project))
+    assert [name for name in DEFERRED_MODULES if name in times] == []
+
+
+def test_version_imports_no_compiler():
+    times = import_times("--version")
+    assert 'ghostwriter.cli.conf' not in times and 'ghostwriter.utils.compile' not in times
+
+
+def test_compile_import_budget(empty_project):
+    # take the best of a few runs, imports are slower if the machine is busy
+    total = min(sum(import_times("compile", "--project", str(empty_project)).values()) for _ in range(3))
+    assert total < IMPORT_BUDGET_US, f"imports took {total / 1000:.1f}ms, budget is {IMPORT_BUDGET_US / 1000:.0f}ms"
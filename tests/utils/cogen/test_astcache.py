@@ -0,0 +1,103 @@
+import pickle
+import pytest
+from testlib import programs as progs
+from testlib.bufferwriter import BufferWriter
+
+from ghostwriter.utils.cogen import astcache
+from ghostwriter.utils.cogen.component import Component
+from ghostwriter.utils.cogen.interpreter import Writer, interpret
+from ghostwriter.utils.cogen.parser import CogenParser, Program, Block
+from ghostwriter.utils.cogen.tokenizer import Tokenizer
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv(astcache.ENV_CACHE_DIR, str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.parametrize("case", [
+    progs.line_lit_adv,
+    progs.if_elif_else,
+    progs.for_block_use_var,
+    progs.component_block_w_body,
+    progs.prog1,
+], ids=lambda case: case.header)
+def test_pickle_roundtrip(case):
+    program = CogenParser(Tokenizer(case.program)).parse_program()
+    program.file_path = "/some/file.py"
+    program.component = "SomeComponent"
+    restored = pickle.loads(pickle.dumps(program))
+    assert restored == program
+    assert repr(restored) == repr(program), "line/col information or node attributes lost"
+    assert (restored.file_path, restored.component) == ("/some/file.py", "SomeComponent")
+
+
+def test_store_and_load(cache_dir):
+    template = "hello, <<name>>!\n% if True\nyes\n% /if"
+    assert astcache.load(template) is None
+
+    program = astcache.parse(template)
+    assert len(list(cache_dir.glob('ast/*.ast'))) == 1
+
+    cached = astcache.load(template)
+    assert cached is not program
+    assert cached == program
+
+
+def test_key_depends_on_version(monkeypatch):
+    key = astcache.cache_key("hello")
+    monkeypatch.setattr(astcache, "GW_VERSION", "0.0.0-other")
+    assert astcache.cache_key("hello") != key
+
+
+def test_key_depends_on_ast_format(monkeypatch):
+    key = astcache.cache_key("hello")
+    monkeypatch.setattr(astcache, "AST_FORMAT", astcache.AST_FORMAT + 1)
+    assert astcache.cache_key("hello") != key
+
+
+class OldLayoutBlock:
+    """Pickles as a block whose constructor took more arguments than it does now."""
+    def __reduce__(self):
+        return Block, ('', 'r', '', [], 1, 2, 3, 4)
+
+
+@pytest.mark.parametrize("contents", [
+    b"definitely not a pickle",
+    pickle.dumps(Program([]))[:-4],
+    pickle.dumps(OldLayoutBlock()),
+], ids=["garbage", "truncated", "layout"])
+def test_corrupt_entry_is_reparsed(cache_dir, contents):
+    template = "hello <<world>>"
+    astcache.parse(template)
+    entry, = cache_dir.glob('ast/*.ast')
+    entry.write_bytes(contents)
+
+    assert astcache.load(template) is None
+    assert astcache.parse(template) == CogenParser(Tokenizer(template)).parse_program()
+
+
+def test_disabled(monkeypatch, tmp_path):
+    monkeypatch.setenv(astcache.ENV_CACHE_DIR, "")
+    astcache.parse("hello")
+    assert astcache.load("hello") is None
+
+
+def test_component_ast_uses_cache(cache_dir):
+    class Cached(Component):
+        template = """
+        hello, <<self.name>>!"""
+
+        def __init__(self, name):
+            self.name = name
+
+    program = Cached.ast
+    assert isinstance(program, Program)
+    assert program.component == "Cached"
+    assert len(list(cache_dir.glob('ast/*.ast'))) == 1
+
+    buf = BufferWriter()
+    interpret(CogenParser(Tokenizer("% r __main__\n% /r")).parse_program(),
+              Writer(buf), {}, {'__main__': Cached("world")})
+    assert buf.getvalue() == "hello, world!\n"
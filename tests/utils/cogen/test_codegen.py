@@ -0,0 +1,137 @@
+import pytest
+from testlib.bufferwriter import BufferWriter
+from testlib import programs as progs
+
+from ghostwriter.utils.cogen.component import Component
+from ghostwriter.utils.cogen.tokenizer import Tokenizer
+from ghostwriter.utils.cogen.parser import CogenParser, Program
+from ghostwriter.utils.cogen.interpreter import (
+    interpret, Writer, InterpStackTrace, EvalError, EvalSyntaxError, RenderArgTypeError
+)
+from ghostwriter.utils.cogen.codegen import compile_program, compile_component
+from ghostwriter.utils.cogen.snippet import snippet
+from .test_interpreter import collect_testcase_examples
+
+
+def parse(template: str) -> Program:
+    return CogenParser(Tokenizer(template)).parse_program()
+
+
+def render_interpreted(prog: Program, scope: dict, blocks: dict = None) -> str:
+    buf = BufferWriter()
+    interpret(prog, Writer(buf), blocks or {}, scope)
+    return buf.getvalue()
+
+
+def render_compiled(prog: Program, scope: dict, blocks: dict = None) -> str:
+    buf = BufferWriter()
+    compile_program(prog).render(Writer(buf), blocks or {}, scope)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("case, example", collect_testcase_examples(
+    progs.line_literal_simplest,
+    progs.line_literal_escaped,
+    progs.line_literal_indented,
+    progs.line_lit_var,
+    progs.line_expr_first,
+    progs.line_lit_adv,
+    progs.line_exprs_side_by_side,
+    progs.if_simplest,
+    progs.if_elif_else,
+    progs.for_block_simplest,
+    progs.for_block_use_var,
+    progs.component_block_simplest,
+    progs.component_block_scope_arg,
+    progs.component_block_scope_inherited,
+    progs.component_block_w_body,
+    progs.indent_lines_text,
+    progs.indent_lines_expr,
+    progs.indent_lines_multiline_expr,
+    progs.indent_if_toplevel,
+    progs.indent_block_toplevel,
+    progs.indent_component_1_flat_component,
+    progs.indent_component_2_indented_body_block,
+))
+def test_compiled_valid_progs(case, example):
+    assert render_compiled(case.ast, example.scope, example.blocks) == example.result, \
+        f"{case.header} ({example.header if example.header else '<unnamed>'})"
+
+
+class Item(Component):
+    template = """
+    item <<self.name>>
+        % body
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+
+@pytest.mark.parametrize("template, scope", [
+    ("% for k, v in items.items()\n<<k>>=<<v>>\n% /for\n", {'items': {'a': 1, 'b': 2}}),
+    ("% for x in xs\n% for y in [x * 2 for _ in range(2)]\n<<x>><<y>>\n% /for\n% /for\n", {'xs': [1, 2]}),
+    ("% for x in xs\n<<(lambda: x)()>>\n% /for\n<<x>>\n", {'xs': [1, 2], 'x': 'outer'}),
+    ("% for x in xs\n% if x == 1\none\n% elif x == 2\ntwo\n% else\n% /if\n% /for\n", {'xs': [1, 2, 3]}),
+    ("% if False\nnope\n% /if\nafter\n", {}),
+    ("<<(y := 2) + y>> <<str>>\n", {'str': 'shadowed'}),
+    ("% r Item('a')\n  body <<self.name>>\n% /r\n", {'Item': Item}),
+    ("% r Item('a')\n% r Item('b')\n<<self.name>>\n% /r\n% /r\n", {'Item': Item}),
+])
+def test_compiled_matches_interpreter(template, scope):
+    prog = parse(template)
+    assert render_compiled(prog, dict(scope)) == render_interpreted(prog, dict(scope))
+
+
+def test_loop_vars_do_not_leak():
+    scope = {'xs': [1, 2]}
+    render_compiled(parse("% for x in xs\n<<x>>\n% /for\n"), scope)
+    assert scope == {'xs': [1, 2]}
+
+
+@pytest.mark.parametrize("template, line, col, error", [
+    ("hello\n  << nope >>\n", 2, 2, EvalError),
+    ("<< 1 + >>\n", 1, 0, EvalSyntaxError),
+    ("% if nope\n% /if\n", 1, 5, EvalError),
+    ("% for x in nope\n% /for\n", 1, 6, EvalError),
+    ("% for x in [1,\n% /for\n", 1, 6, EvalSyntaxError),
+    ("% for x in xs\n<< x.nope >>\n% /for\n", 2, 0, EvalError),
+    ("% for x in 5\n% /for\n", 1, 6, EvalError),
+])
+def test_compiled_error_location(template, line, col, error):
+    prog = parse(template)
+    errors = []
+    for render in (render_interpreted, render_compiled):
+        with pytest.raises(InterpStackTrace) as exc_info:
+            render(prog, {'xs': [1]})
+        errors.append(exc_info.value)
+    interpreted, compiled = errors
+    assert (compiled.line, compiled.col) == (line, col)
+    assert isinstance(compiled.reason, error)
+    assert (compiled.line, compiled.col) == (interpreted.line, interpreted.col)
+    assert compiled.reason.error_message() == interpreted.reason.error_message()
+    if error is EvalError:
+        assert [f.filename for f in compiled.reason.ei.stacktrace] \
+               == [f.filename for f in interpreted.reason.ei.stacktrace]
+
+
+def test_compiled_render_non_component():
+    with pytest.raises(RenderArgTypeError):
+        render_compiled(parse("% r 'nope'\n% /r\n"), {})
+
+
+def test_compiled_component_is_cached():
+    assert compile_component(Item) is compile_component(Item)
+    assert '__ghostwriter_component_compiled__' in Item.__dict__
+
+
+@pytest.mark.parametrize("prefix", ["", "    "])
+def test_compiled_snippet(prefix):
+    def render(compiled: bool) -> str:
+        @snippet(compiled=compiled)
+        def item_snippet():
+            return Item('a')
+        buf = BufferWriter()
+        item_snippet(None, prefix, buf)
+        return buf.getvalue()
+    assert render(True) == render(False) == f"{prefix}item a\n"
@@ -0,0 +1,145 @@
+import pytest
+from ghostwriter.utils.cogen.fastexpr import compile_fast, fast_eval, Attr, Call, Const, Index, Name
+from ghostwriter.utils.cogen.scope import Scope
+from ghostwriter.utils.cogen.interpreter import interpret, set_fast_eval, Writer, InterpStackTrace
+from ghostwriter.utils.cogen.tokenizer import Tokenizer
+from ghostwriter.utils.cogen.parser import CogenParser
+from testlib.bufferwriter import BufferWriter
+
+
+class Item:
+    def __init__(self):
+        self.name = "item"
+        self.fields = ["a", "b"]
+        self.data = {"k": [1, 2, 3]}
+
+    def method(self, *args):
+        return ("method", args)
+
+    @property
+    def broken(self):
+        raise ValueError("broken property")
+
+
+def fail(msg):
+    raise RuntimeError(msg)
+
+
+def make_scope():
+    outer = Scope({'self': Item(), 'items': [Item()], 'fmt': lambda *args: '-'.join(map(str, args)),
+                   'fail': fail})
+    scope = Scope(outer)
+    scope['x'] = 2
+    return scope
+
+
+@pytest.mark.parametrize("expr, node_type", [
+    ("x", Name),
+    ("  x  ", Name),
+    ("len", Name),
+    ("self.name", Attr),
+    ("self . name", Attr),
+    ("self.fields[0]", Index),
+    ("self.data['k'][x]", Index),
+    ("self.data[\"k\"]", Index),
+    ("items[0].fields[1]", Index),
+    ("fmt()", Call),
+    ("fmt(x)", Call),
+    ("fmt(x, self.name, 'lit',)", Call),
+    ("self.method(1, 2.5, None, True, False)", Call),
+    ("len(self.fields)", Call),
+    ("(self.name)", Attr),
+    ("(fmt)(x)", Call),
+    ("fmt(\n  x,\n  x\n)", Call),
+    ("42", Const),
+    ("1_000", Const),
+    (".5", Const),
+    ("1e3", Const),
+    ("2j", Const),
+    ("'it''s'", None),
+    ("'esc\\'aped\\n'", Const),
+    ("1 .real", Attr),
+])
+def test_same_as_eval(expr, node_type):
+    node = compile_fast(expr)
+    if node_type is None:
+        assert node is None
+        return
+    assert type(node) is node_type
+    assert fast_eval(node, make_scope()) == eval(expr.strip(), make_scope())
+
+
+@pytest.mark.parametrize("expr", [
+    "x + 1",
+    "-x",
+    "not x",
+    "x if x else 0",
+    "self.fields[0:1]",
+    "self.data['k', 1]",
+    "fmt(x, sep='-')",
+    "fmt(*self.fields)",
+    "[x]",
+    "(x, x)",
+    "{'a': x}",
+    "f'{x}'",
+    "b'x'",
+    "r'x'",
+    "0x10",
+    "lambda: x",
+    "fmt(y for y in self.fields)",
+    "self.name # comment",
+    "x.if",
+])
+def test_unsupported(expr):
+    assert compile_fast(expr) is None
+
+
+@pytest.mark.parametrize("expr", [
+    "nope",
+    "self.nope",
+    "self.fields[5]",
+    "self.data['nope']",
+    "self.broken",
+    "fail('boom')",
+    "x(1)",
+    "self.method.nope",
+])
+def test_same_errors_as_eval(expr):
+    with pytest.raises(Exception) as fast_exc:
+        fast_eval(compile_fast(expr), make_scope())
+    with pytest.raises(Exception) as eval_exc:
+        eval(expr, make_scope())
+    assert type(fast_exc.value) is type(eval_exc.value)
+    assert str(fast_exc.value) == str(eval_exc.value)
+
+
+def test_plain_dict_scope():
+    assert fast_eval(compile_fast("len(xs)"), {'xs': [1, 2]}) == 2
+    with pytest.raises(NameError, match="name 'nope' is not defined"):
+        fast_eval(compile_fast("nope"), {})
+
+
+def render_error(template: str):
+    prog = CogenParser(Tokenizer(template)).parse_program()
+    with pytest.raises(InterpStackTrace) as exc_info:
+        interpret(prog, Writer(BufferWriter()), {}, {'self': Item(), 'fail': fail})
+    return exc_info.value
+
+
+@pytest.mark.parametrize("template", [
+    "<< fail('boom') >>\n",
+    "<< self.broken >>\n",
+    "<< self.nope >>\n",
+    "<< nope >>\n",
+])
+def test_interpreter_error_reporting(template):
+    try:
+        set_fast_eval(False)
+        expected = render_error(template)
+    finally:
+        set_fast_eval(True)
+    actual = render_error(template)
+    assert (actual.line, actual.col) == (expected.line, expected.col)
+    assert actual.error_message() == expected.error_message()
+    assert [(f.filename, f.name) for f in actual.reason.ei.stacktrace] \
+        == [(f.filename, f.name) for f in expected.reason.ei.stacktrace]
@@ -1,7 +1,9 @@
 import pytest
 from testlib.bufferwriter import BufferWriter
 
-from ghostwriter.utils.cogen.interpreter import interpret, Writer
+from ghostwriter.utils.cogen.interpreter import interpret, Writer, InterpStackTrace, EvalSyntaxError
+from ghostwriter.utils.cogen.parser import CogenParser
+from ghostwriter.utils.cogen.tokenizer import Tokenizer
 # from ghostwriter.utils.cogen.parser import (
 #     CogenParser, Program, Literal, Expr, Line, Block, If,
 #     ParserError, UnhandledTokenError, InvalidBlockNestingError, InvalidEndBlockArgsError
@@ -44,6 +46,7 @@ def collect_testcase_examples(*testcases: progs.TestCase)\
     progs.component_block_w_body,
     progs.indent_lines_text,
     progs.indent_lines_expr,
+    progs.indent_lines_multiline_expr,
     progs.indent_if_toplevel,
     progs.indent_block_toplevel,
     progs.indent_component_1_flat_component,
@@ -56,3 +59,61 @@ def test_interpret_valid_progs(case, example):
     print(buf.getvalue())
     assert buf.getvalue() == example.result, \
         f"{case.header} ({example.header if example.header else '<unnamed>'})"
+
+
+def interpret_str(template: str, scope: dict) -> str:
+    buf: BufferWriter = BufferWriter()
+    interpret(CogenParser(Tokenizer(template)).parse_program(), Writer(buf), {}, scope)
+    return buf.getvalue()
+
+
+def test_interpret_reuses_compiled_exprs():
+    # same expressions evaluated repeatedly, both in loops and across renders
+    template = "% for x in xs\n<<x * n>>\n% /for\n"
+    for n in (1, 2):
+        assert interpret_str(template, {'xs': [1, 2], 'n': n}) == f"{n}\n{2 * n}\n"
+
+
+def test_interpret_named_expr_does_not_bind_in_scope():
+    scope = {}
+    assert interpret_str("<<(y := 2) + y>>\n<<(y := 3) + y>>\n", scope) == "4\n6\n"
+    assert 'y' not in scope
+
+
+@pytest.mark.parametrize("expr, offset", [
+    ("1 +", 4),
+    (" 1 +", 5),
+])
+def test_interpret_syntax_error_offset(expr, offset):
+    for _ in range(2):
+        with pytest.raises(InterpStackTrace) as exc_info:
+            interpret_str(f"<<{expr}>>\n", {})
+        assert isinstance(exc_info.value.reason, EvalSyntaxError)
+        caret = exc_info.value.reason.error_details().split("\n")[1]
+        assert len(caret) - len("syntax error in: ") == offset
+
+
+@pytest.mark.parametrize("template, scope, result", [
+    ("% for x in xs\n<<x>>\n% /for\n", {'xs': range(3)}, "0\n1\n2\n"),
+    ("% for k, v in xs\n<<k>>=<<v>>\n% /for\n", {'xs': {'a': 1, 'b': 2}.items()}, "a=1\nb=2\n"),
+    ("% for k , v in xs\n<<k>><<v>>\n% /for\n", {'xs': ["ab", "cd"]}, "ab\ncd\n"),
+    # loop variables shadow, but do not replace, outer bindings
+    ("% for x in xs\n<<x>>\n% /for\n<<x>>\n", {'xs': [1], 'x': 'outer'}, "1\nouter\n"),
+])
+def test_interpret_for_loop(template, scope, result):
+    assert interpret_str(template, scope) == result
+
+
+@pytest.mark.parametrize("xs, error", [
+    ([(1, 2, 3)], "too many values to unpack (expected 2)"),
+    ([(1,)], "not enough values to unpack (expected 2, got 1)"),
+])
+def test_interpret_for_loop_unpack_error(xs, error):
+    with pytest.raises(ValueError, match=error.replace("(", r"\(").replace(")", r"\)")):
+        interpret_str("% for a, b in xs\n% /for\n", {'xs': xs})
+
+
+def test_interpret_for_loop_not_iterable():
+    with pytest.raises(InterpStackTrace) as exc_info:
+        interpret_str("% for x in 5\n% /for\n", {})
+    assert "'int' object is not iterable" in exc_info.value.error_message()
@@ -0,0 +1,84 @@
+import pytest
+from testlib.bufferwriter import BufferWriter
+from testlib import programs as progs
+
+from ghostwriter.utils.cogen.tokenizer import Tokenizer
+from ghostwriter.utils.cogen.parser import CogenParser, Program, Block, Chunk, Line, Literal, Expr, If
+from ghostwriter.utils.cogen.interpreter import interpret, Writer
+from ghostwriter.utils.cogen.codegen import compile_program
+from ghostwriter.utils.cogen.optimizer import optimize
+from .test_interpreter import collect_testcase_examples
+
+
+def parse(template: str) -> Program:
+    return CogenParser(Tokenizer(template)).parse_program()
+
+
+@pytest.mark.parametrize("case, example", collect_testcase_examples(
+    progs.line_literal_simplest,
+    progs.line_literal_escaped,
+    progs.line_literal_indented,
+    progs.line_lit_var,
+    progs.line_lit_adv,
+    progs.if_simplest,
+    progs.if_elif_else,
+    progs.for_block_simplest,
+    progs.for_block_use_var,
+    progs.component_block_simplest,
+    progs.component_block_w_body,
+    progs.indent_lines_text,
+    progs.indent_lines_expr,
+    progs.indent_if_toplevel,
+    progs.indent_block_toplevel,
+    progs.indent_component_1_flat_component,
+    progs.indent_component_2_indented_body_block,
+))
+@pytest.mark.parametrize("backend", ["interpreter", "codegen"])
+def test_optimized_progs(backend, case, example):
+    prog = optimize(parse(case.program))
+    buf = BufferWriter()
+    if backend == "interpreter":
+        interpret(prog, Writer(buf), example.blocks, example.scope)
+    else:
+        compile_program(prog).render(Writer(buf), example.blocks, example.scope)
+    assert buf.getvalue() == example.result
+
+
+def test_chunk_lines():
+    prog = optimize(parse("\n".join([
+        "one",
+        "  two",
+        "",
+        "three <<x>>",
+        "% for x in xs",
+        "  four",
+        "five",
+        "% /for",
+        "six",
+    ])))
+    assert prog.lines == [
+        Chunk(["one", "  two", ""]),
+        Line("", [Literal("three "), Expr("x")]),
+        Block("", "for", "x in xs", [Chunk(["  four", "five"])]),
+        Chunk(["six"]),
+    ]
+
+
+def test_preserves_locations():
+    prog = parse("\n".join([
+        "start",
+        "% if x",
+        "  % for y in z",
+        "  <<y>>",
+        "  % /for",
+        "% /if",
+    ]))
+    prog.component = "MyComponent"
+    prog.file_path = "/some/file.py"
+    optimized = optimize(prog)
+    assert (optimized.component, optimized.file_path) == ("MyComponent", "/some/file.py")
+    assert optimized.lines[0].line == 1
+    cond = optimized.lines[1].conds[0]
+    loop = cond.children[0]
+    assert (cond.line, cond.col_kw, cond.col_args) == (2, 0, 5)
+    assert (loop.line, loop.col_kw, loop.col_args) == (3, 2, 8)
@@ -39,6 +39,7 @@ def name_testcases(*testcases: progs.TestCase)\
     progs.component_block_w_body,
     progs.indent_lines_text,
     progs.indent_lines_expr,
+    progs.indent_lines_multiline_expr,
     progs.indent_if_toplevel,
     progs.indent_block_toplevel,
     progs.indent_component_1_flat_component,
@@ -0,0 +1,122 @@
+import pickle
+import pytest
+from testlib.bufferwriter import BufferWriter
+
+from ghostwriter.utils.cogen.component import Component
+from ghostwriter.utils.cogen.tokenizer import Tokenizer
+from ghostwriter.utils.cogen.parser import CogenParser, Program
+from ghostwriter.utils.cogen.interpreter import interpret, Writer, set_profiler, InterpStackTrace
+from ghostwriter.utils.cogen.codegen import compile_program
+from ghostwriter.utils.cogen import profiler
+from ghostwriter.utils.cogen.profiler import RenderProfiler
+
+
+class Inner(Component):
+    template = """
+    inner <<self.n>>
+    % body
+    """
+
+    def __init__(self, n):
+        self.n = n
+
+
+class Outer(Component):
+    template = """
+    outer
+    % for n in range(2)
+    % r Inner(n)
+    body <<n>>
+    % /r
+    % /for
+    """
+
+
+def parse(template: str) -> Program:
+    return CogenParser(Tokenizer(template)).parse_program()
+
+
+def render(prog: Program, scope: dict, compiled: bool) -> str:
+    buf = BufferWriter()
+    if compiled:
+        compile_program(prog).render(Writer(buf), {}, scope)
+    else:
+        interpret(prog, Writer(buf), {}, scope)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def prof():
+    prof = RenderProfiler()
+    set_profiler(prof)
+    yield prof
+    set_profiler(None)
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_component_stats(prof, compiled):
+    result = render(parse("% r Outer()\n% /r\n"), {'Outer': Outer}, compiled)
+    assert result == "outer\ninner 0\nbody 0\ninner 1\nbody 1\n"
+    assert set(prof.components) == {'<template>', 'Outer', 'Inner'}
+    calls, incl, excl, chars = prof.components['Inner']
+    assert calls == 2
+    assert chars == len("inner 0\nbody 0\n") * 2
+    assert 0 <= excl <= incl
+    assert prof.components['Outer'][3] == len(result)
+    assert prof.components['Outer'][1] >= prof.components['Inner'][1]
+
+
+def test_line_stats(prof):
+    render(parse("% r Outer()\n% /r\n"), {'Outer': Outer}, False)
+    assert set(prof.lines) == {'<template>:1', 'Outer:1', 'Outer:2', 'Outer:3', 'Outer:4', 'Inner:1', 'Inner:2'}
+    assert prof.lines['Outer:3'][0] == 2
+    assert prof.lines['Outer:4'][0] == 2  # body lines belong to the caller
+    assert prof.lines['Inner:1'][3] == len("inner 0\n") * 2
+    for calls, incl, excl, chars in prof.lines.values():
+        assert 0 <= excl <= incl
+    assert ("<template>;<template>:1;Outer;Outer:2;Outer:3;Inner;Inner:2;% body;Outer:4"
+            in prof.stacks)
+
+
+def test_recursion_counted_once(prof):
+    class Rec(Component):
+        template = """
+        % if self.n
+        % r Rec(self.n - 1)
+        % /r
+        % /if
+        x
+        """
+
+        def __init__(self, n):
+            self.n = n
+
+    render(parse("% r Rec(3)\n% /r\n"), {'Rec': Rec}, False)
+    calls, incl, excl, chars = prof.components['Rec']
+    assert calls == 4
+    assert chars == 8
+    assert excl <= incl
+
+
+def test_stack_unwound_on_error(prof):
+    with pytest.raises(InterpStackTrace):
+        render(parse("% r Outer()\n% /r\n<<nope>>\n"), {'Outer': Outer}, False)
+    assert prof.components['Outer'][0] == 1
+    assert prof.lines['<template>:3'][0] == 1
+
+
+def test_merge_and_report(prof, tmp_path):
+    render(parse("% r Outer()\n% /r\n"), {'Outer': Outer}, False)
+    set_profiler(None)
+    profiler.dump(prof, str(tmp_path), "1")
+    profiler.dump(pickle.loads(pickle.dumps(prof)), str(tmp_path), "2")
+    total = profiler.report(str(tmp_path))
+    assert total.components['Inner'][0] == 4
+    assert total.stacks == {stack: ns * 2 for stack, ns in prof.stacks.items()}
+    collapsed = (tmp_path / profiler.COLLAPSED_FILE).read_text()
+    for line in collapsed.splitlines():
+        stack, us = line.rsplit(' ', 1)
+        assert stack in prof.stacks and int(us) > 0
+    assert "Inner:1" in profiler.format_table(total)
+    profiler.clean(str(tmp_path))
+    assert [p.name for p in tmp_path.iterdir()] == [profiler.COLLAPSED_FILE]
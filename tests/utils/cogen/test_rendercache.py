@@ -0,0 +1,264 @@
+import pytest
+from testlib.bufferwriter import BufferWriter
+
+from ghostwriter.utils.cogen.component import Component
+from ghostwriter.utils.cogen.tokenizer import Tokenizer
+from ghostwriter.utils.cogen.parser import CogenParser, Program
+from ghostwriter.utils.cogen.interpreter import interpret, Writer
+from ghostwriter.utils.cogen.codegen import compile_program
+from ghostwriter.utils.cogen import rendercache
+from ghostwriter.utils.cogen.rendercache import RenderCache, CachedRender
+
+
+renders = []
+
+
+class Field(Component):
+    cache_props = ('name', 'typ')
+    template = """
+    <<self.render()>> <<self.typ>>
+    % if self.typ == 'struct'
+        nested
+    % /if
+    """
+
+    def __init__(self, name, typ):
+        self.name = name
+        self.typ = typ
+
+    def render(self):
+        renders.append(self.name)
+        return self.name
+
+
+class Struct(Component):
+    cache_props = ('name', 'fields')
+    template = """
+    struct <<self.name>> {
+        % for name, typ in self.fields
+        % r Field(name, typ)
+        % /r
+        % /for
+    }
+    """
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+
+
+class Wrapper(Component):
+    cache_props = ('name',)
+    template = """
+    <<self.name>>:
+        % body
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+
+class Doc(Component):
+    cache_props = ('text',)
+    template = """
+    /* <<self.text>> */
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+
+class Nul(Component):
+    cache_props = ()
+    template = """
+    <<self.render()>>
+    """
+
+    def render(self):
+        renders.append('nul')
+        return chr(0)
+
+
+class NulBlock(Component):
+    cache_props = ('n',)
+    template = """
+    block <<self.n>>:
+        literal
+        % r Nul()
+        % /r
+        <<self.lines>>
+        % r Doc(self.n)
+        % /r
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.lines = f"a\n\x00\n  \nb"
+
+
+def parse(template: str) -> Program:
+    return CogenParser(Tokenizer(template)).parse_program()
+
+
+def render_interpreted(prog: Program, scope: dict) -> str:
+    buf = BufferWriter()
+    interpret(prog, Writer(buf), {}, scope)
+    return buf.getvalue()
+
+
+def render_compiled(prog: Program, scope: dict) -> str:
+    buf = BufferWriter()
+    compile_program(prog).render(Writer(buf), {}, scope)
+    return buf.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    rendercache.clear()
+    renders.clear()
+    yield
+    rendercache.clear()
+
+
+@pytest.mark.parametrize("render", [render_interpreted, render_compiled])
+def test_cached_output_reindented(render):
+    prog = parse("% r Struct('a', (('x', 'int'), ('y', 'struct')))\n% /r\n"
+                 "  % r Struct('a', (('x', 'int'), ('y', 'struct')))\n  % /r\n")
+    expected = ("struct a {\n    x int\n    y struct\n        nested\n}\n"
+                "  struct a {\n      x int\n      y struct\n          nested\n  }\n")
+    assert render(prog, {'Struct': Struct}) == expected
+    assert renders == ['x', 'y']
+    assert rendercache.stats() == {
+        f"{__name__}.Struct": (1, 1),
+        f"{__name__}.Field": (0, 2),
+    }
+
+
+@pytest.mark.parametrize("render", [render_interpreted, render_compiled])
+def test_nested_hits(render):
+    prog = parse("% r Struct('a', (('x', 'int'),))\n% /r\n"
+                 "% r Struct('b', (('x', 'int'),))\n% /r\n")
+    assert render(prog, {'Struct': Struct}) == "struct a {\n    x int\n}\nstruct b {\n    x int\n}\n"
+    assert renders == ['x']
+    assert rendercache.stats()[f"{__name__}.Field"] == (1, 1)
+
+
+@pytest.mark.parametrize("render", [render_interpreted, render_compiled])
+def test_uncacheable(render):
+    # unhashable props
+    prog = parse("% r Struct('a', [('x', 'int')])\n% /r\n" * 2)
+    assert render(prog, {'Struct': Struct}) == "struct a {\n    x int\n}\n" * 2
+    assert f"{__name__}.Struct" not in rendercache.stats()
+    # components given a body
+    prog = parse("% r Wrapper('w')\n<<n>>\n% /r\n")
+    assert render(prog, {'Wrapper': Wrapper, 'n': 1}) == "w:\n    1\n"
+    assert render(prog, {'Wrapper': Wrapper, 'n': 2}) == "w:\n    2\n"
+    assert f"{__name__}.Wrapper" not in rendercache.stats()
+
+
+@pytest.mark.parametrize("render", [render_interpreted, render_compiled])
+def test_cached_multiline_value_reindented(render):
+    prog = parse("% r Doc('a\\nb')\n% /r\n    % r Doc('a\\nb')\n    % /r\n")
+    assert render(prog, {'Doc': Doc}) == "/* a\nb */\n    /* a\n    b */\n"
+    assert rendercache.stats()[f"{__name__}.Doc"] == (1, 1)
+
+
+@pytest.mark.parametrize("render", [render_interpreted, render_compiled])
+def test_output_containing_sentinel(render):
+    prog = parse("  % r Nul()\n  % /r\n")
+    assert render(prog, {'Nul': Nul}) == "  \x00\n"
+    assert render(prog, {'Nul': Nul}) == "  \x00\n"
+    assert rendercache.stats()[f"{__name__}.Nul"] == (0, 2)
+    # rendered once each time, not again after capturing its output
+    assert renders == ['nul', 'nul']
+
+
+@pytest.mark.parametrize("render", [render_interpreted, render_compiled])
+def test_nested_output_containing_sentinel(render):
+    prog = parse("% r NulBlock(1)\n% /r\n  % r Doc(1)\n  % /r\n    % r NulBlock(1)\n    % /r\n")
+    scope = {'NulBlock': NulBlock, 'Doc': Doc}
+    rendercache.configure(0)
+    try:
+        expected = render(prog, scope)
+    finally:
+        rendercache.configure(rendercache.DEFAULT_MAX_BYTES)
+    renders.clear()
+    assert render(prog, scope) == expected
+    assert expected.startswith("block 1:\n    literal\n    \x00\n    a\n    \x00\n  \n    b\n    /* 1 */\n")
+    assert renders == ['nul', 'nul']
+    assert rendercache.stats()[f"{__name__}.Doc"] == (2, 1)
+
+
+class Missing(Component):
+    cache_props = ('nope',)
+    template = """
+    missing
+    """
+
+
+@pytest.mark.parametrize("render", [render_interpreted, render_compiled])
+def test_missing_prop(render):
+    prog = parse("% r Missing()\n% /r\n")
+    with pytest.raises(rendercache.CachePropError, match=f"'{__name__}.Missing' lists 'nope' in cache_props"):
+        render(prog, {'Missing': Missing})
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, rendercache.DEFAULT_MAX_BYTES),
+    ("", rendercache.DEFAULT_MAX_BYTES),
+    ("1024", 1024),
+    ("0", 0),
+    ("32MiB", rendercache.DEFAULT_MAX_BYTES),
+])
+def test_max_bytes_from_env(monkeypatch, caplog, value, expected):
+    if value is None:
+        monkeypatch.delenv(rendercache.ENV_RENDER_CACHE_SIZE, raising=False)
+    else:
+        monkeypatch.setenv(rendercache.ENV_RENDER_CACHE_SIZE, value)
+    assert rendercache.max_bytes_from_env() == expected
+    assert ("ignoring" in caplog.text) == (value == "32MiB")
+
+
+def test_lru_eviction():
+    text = "x" * 100
+    cache = RenderCache(1000)
+    for i in range(20):
+        cache.store((Field, i), CachedRender(text, 1))
+        assert cache.nbytes <= 1000
+    assert cache.lookup((Field, 0)) is None
+    assert cache.lookup((Field, 19)).text == text
+    cache.resize(0)
+    assert len(cache) == 0 and cache.nbytes == 0
+    cache.store((Field, 0), CachedRender(text, 1))
+    assert len(cache) == 0
+
+
+def test_lru_recently_used_kept():
+    cache = RenderCache(10000)
+    cache.store((Field, 0), CachedRender("x" * 100, 1))
+    cache.resize(cache.nbytes)
+    cache.store((Field, 1), CachedRender("x" * 100, 1))
+    assert cache.lookup((Field, 0)) is None
+    cache.resize(cache.nbytes * 2)
+    cache.store((Field, 2), CachedRender("x" * 100, 1))
+    assert cache.lookup((Field, 1)) is not None
+    cache.store((Field, 3), CachedRender("x" * 100, 1))
+    assert cache.lookup((Field, 1)) is not None
+    assert cache.lookup((Field, 2)) is None
+
+
+class V(Component):
+    cache_props = ('v',)
+    template = """
+    value: <<repr(self.v)>>
+    """
+
+    def __init__(self, v):
+        self.v = v
+
+
+@pytest.mark.parametrize("render", [render_interpreted, render_compiled])
+def test_equal_props_of_different_types(render):
+    prog = parse("% r V(1)\n% /r\n% r V(True)\n% /r\n% r V(1.0)\n% /r\n% r V(1)\n% /r\n")
+    assert render(prog, {'V': V}) == "value: 1\nvalue: True\nvalue: 1.0\nvalue: 1\n"
+    assert rendercache.stats()[f"{__name__}.V"] == (1, 3)
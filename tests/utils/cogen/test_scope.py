@@ -0,0 +1,70 @@
+import pytest
+from ghostwriter.utils.cogen.scope import Scope
+
+
+def test_scope_lookup_order():
+    outer = {'a': 'outer', 'b': 'outer'}
+    middle = {'b': 'middle', 'c': 'middle'}
+    scope = Scope(middle, outer)
+    scope['c'] = 'inner'
+    assert (scope['a'], scope['b'], scope['c']) == ('outer', 'middle', 'inner')
+
+
+def test_scope_chained():
+    root = {'a': 1}
+    child = Scope(root)
+    child['b'] = 2
+    grandchild = Scope(child)
+    grandchild['a'] = 3
+    assert (grandchild['a'], grandchild['b']) == (3, 2)
+    # bindings never propagate to parents
+    assert child == {'b': 2} and root == {'a': 1}
+
+
+def test_scope_builtins_and_missing():
+    scope = Scope({})
+    assert scope['len'] is len
+    with pytest.raises(KeyError):
+        scope['nope']
+    # membership & get exclude builtins, like a copy of the parent scopes would
+    assert 'len' not in scope
+    assert scope.get('len') is None
+
+
+def test_scope_as_globals():
+    scope = Scope({'xs': [1, 2, 3]}, {'factor': 10})
+    assert eval("[x * factor for x in xs]", scope) == [10, 20, 30]
+    assert eval("(lambda: sum(xs))()", scope) == 6
+    with pytest.raises(NameError):
+        eval("nope", scope)
+    exec("def fn():\n    global total\n    total = sum(xs)\nfn()", scope)
+    assert scope['total'] == 6
+
+
+def test_scope_membership_and_get():
+    root = {'a': 1, 'b': 1}
+    child = Scope(root)
+    child['b'] = 2
+    scope = Scope(child, {'c': 3})
+    scope['d'] = 4
+    for key in 'abcd':
+        assert key in scope
+    assert 'nope' not in scope
+    assert [scope.get(k) for k in 'abcd'] == [1, 2, 3, 4]
+    assert scope.get('nope', 'default') == 'default'
+    assert sorted(scope.keys()) == sorted(scope) == ['a', 'b', 'c', 'd']
+    assert dict(scope.items()) == dict(scope) == {'a': 1, 'b': 2, 'c': 3, 'd': 4}
+    assert sorted(scope.values()) == [1, 2, 3, 4] and len(scope) == 4
+    # modifications and equality only concern the scope's own bindings
+    assert scope == {'d': 4}
+    assert scope.pop('a', None) is None and scope['a'] == 1
+
+
+def test_scope_globals_view():
+    # as globals(), the scope behaves like a copy of the parent scopes
+    scope = Scope({'foo': 1})
+    assert eval("'foo' in globals()", scope) is True
+    assert eval("globals().get('foo')", scope) == 1
+    assert eval("'len' in globals()", scope) is False
+    assert eval("sorted(k for k in globals() if k != '__builtins__')", scope) == ['foo']
+    assert eval("foo", scope) == 1
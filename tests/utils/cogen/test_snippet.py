@@ -0,0 +1,75 @@
+import pytest
+from testlib.bufferwriter import BufferWriter
+
+from ghostwriter.utils.cogen.component import Component
+from ghostwriter.utils.cogen.interpreter import Writer, InterpStackTrace, render_component
+from ghostwriter.utils.cogen import codegen
+from ghostwriter.utils.cogen.snippet import snippet, SnippetEvalException
+
+
+class Block(Component):
+    template = """
+    block <<self.name>> {
+        % for x in self.xs
+        <<x>>;
+        % /for
+    }
+    """
+
+    def __init__(self, name, xs):
+        self.name = name
+        self.xs = xs
+
+
+class Broken(Component):
+    template = """
+    ok
+    <<self.nope>>
+    """
+
+
+def expand(fn, prefix: str = "", compiled: bool = False) -> str:
+    buf = BufferWriter()
+    snippet(compiled=compiled)(fn)(None, prefix, buf)
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+@pytest.mark.parametrize("prefix", ["", "  ", "\t"])
+def test_snippet_prefix(prefix, compiled):
+    result = expand(lambda: Block('b', [1, 2]), prefix, compiled)
+    assert result == f"{prefix}block b {{\n{prefix}    1;\n{prefix}    2;\n{prefix}}}\n"
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_snippet_fn_error(compiled):
+    def fails():
+        raise RuntimeError("boom")
+
+    with pytest.raises(SnippetEvalException):
+        expand(fails, compiled=compiled)
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_snippet_not_a_component(compiled):
+    with pytest.raises(ValueError):
+        expand(lambda: "nope", compiled=compiled)
+
+
+@pytest.mark.parametrize("compiled", [False, True])
+def test_snippet_render_error(compiled):
+    with pytest.raises(InterpStackTrace) as exc_info:
+        expand(lambda: Broken(), compiled=compiled)
+    ist = exc_info.value
+    assert (ist.component, ist.line, ist.col) == ('Broken', 2, 0)
+    assert "Broken" in ist.error_details()
+
+
+@pytest.mark.parametrize("render", [render_component, codegen.render_component])
+def test_render_component(render):
+    buf = BufferWriter()
+    w = Writer(buf, "> ")
+    render(Block('b', []), w, {})
+    assert buf.getvalue() == "> block b {\n> }\n"
+    with pytest.raises(TypeError):
+        render("nope", w, {})
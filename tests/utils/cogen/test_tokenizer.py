@@ -1,6 +1,7 @@
 import pytest
 from ghostwriter.utils.cogen.tokenizer import (
     Tokenizer,
+    TokenBuffer,
     TokenFactory,
     token_label
 )
@@ -189,4 +190,32 @@ def test_tokenizer_location(msg, prog, positions):
             break
         # print(f"{i} => tok ({repr(tok)}) - loc: ({p.pos_line}, {p.pos_col})")
         result.append((token_label(tok.type), p.pos_line, p.pos_col))
-    assert result == positions, msg
\ No newline at end of file
+    assert result == positions, msg
+
+def test_token_buffer():
+    buf = TokenBuffer("hello, <<thing>>\n% if x\n")
+    assert len(buf) == 7
+    assert [token_label(buf.type_at(i)) for i in range(len(buf))] == [
+        "LITERAL", "EXPR", "NEWLINE", "CTRL_KW", "CTRL_ARGS", "NEWLINE", "EOF"]
+    assert [buf.lexeme(i) for i in range(len(buf))] == ["hello, ", "thing", "<NL>", "if", "x", "<NL>", "<EOF>"]
+    assert buf.token(1) == TokenFactory.expr("thing")
+    assert buf.location(1) == (1, 7)
+    assert buf.location(4) == (2, 5)
+    # reading past the end keeps returning EOF
+    assert buf.token(100) == EOF
+
+
+@pytest.mark.parametrize("prog", [
+    "hello, <<thing>>\n% if x\n  <<y>>\n% /if\n",
+    # astral characters, lexemes are sliced by offsets into the program
+    "\U0001F600 <<\U0001F600>> \U0001F600\n  % for x in '\U0001F600'\n  \U0001F600<<x>>\n  % /for\n",
+])
+def test_token_buffer_matches_tokenizer(prog):
+    t = Tokenizer(prog)
+    buf = TokenBuffer(prog)
+    for i in range(len(buf)):
+        tok = t.next()
+        assert buf.token(i) == tok
+        assert buf.lexeme(i) == tok.lexeme
+        assert buf.location(i) == (t.pos_line, t.pos_col)
+    assert tok == EOF
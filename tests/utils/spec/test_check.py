@@ -0,0 +1,96 @@
+import typing as t
+
+import pytest
+from ghostwriter.utils import spec as s
+
+
+class IntSpec(s.SpecBase):
+    @staticmethod
+    def _valid(value: t.Any):
+        return isinstance(value, int)
+
+    @staticmethod
+    def _explain(value: t.Any):
+        if not isinstance(value, int):
+            return f"expected 'int', got '{type(value)}'"
+
+    @staticmethod
+    def _conform(value: t.Any):
+        return int(value)
+
+    @staticmethod
+    def _name():
+        return "Int"
+
+
+def _positive(value):
+    return value if value > 0 else False
+
+
+record = s.keys({
+    'id': s.req(s.int),
+    'name': s.opt(s.str, 'anonymous'),
+    'tags': s.opt(s.seqof(s.str), []),
+    'kind': s.inseq(['a', 'b']),
+    'score': s.predicate(_positive, 'positive'),
+    'extra': s.mapof(s.str, IntSpec()),
+    'ref': s.type(tuple),
+    'flag': s.bool,
+    'ratio': s.float,
+    'raw': s.any(),
+})
+
+
+################################################################################
+# check - conforms valid values, explains invalid ones
+################################################################################
+@pytest.mark.parametrize("spec, value", [
+    (s.int, 1),
+    (s.int, True),
+    (s.int, "1"),
+    (s.str, 1),
+    (s.seqof(s.int), [1, 2, 3]),
+    (s.seqof(s.int), (1, True, 3)),
+    (s.seqof(s.int), [1, "2", 3.0]),
+    (s.seqof(s.int), 3),
+    (s.seqof(IntSpec()), [1, "x"]),
+    (s.mapof(s.str, s.int), {"a": 1}),
+    (s.mapof(s.str, s.int), {"a": "1", 2: 3}),
+    (s.mapof(s.str, s.int), []),
+    (s.allof({'int': s.int, 'positive': s.predicate(_positive, 'positive')}), 3),
+    (s.allof({'int': s.int, 'positive': s.predicate(_positive, 'positive')}), -3),
+    (s.anyof({'int': s.int, 'str': s.str}), "x"),
+    (s.anyof({'int': s.int, 'float': s.float}), "x"),
+    (s.opt(s.int, 3), None),
+    (record, {'id': 1, 'kind': 'a', 'other': 'kept'}),
+    (record, {'id': 1, 'name': None, 'tags': ['x'], 'kind': 'b', 'score': 2,
+              'extra': {'a': 1}, 'ref': (), 'flag': False, 'ratio': 0.5, 'raw': object}),
+    (record, {'name': 1, 'tags': ['x', 2], 'kind': 'c', 'score': -1,
+              'extra': {1: 'a'}, 'ref': [], 'flag': 1, 'ratio': 1}),
+])
+def test_check_like_valid_conform_explain(spec, value):
+    result = s.check(spec, value)
+    if s.valid(spec, value):
+        assert result == s.conform(spec, value)
+    else:
+        assert isinstance(result, s.Failure)
+        assert result.errors == s.explain(spec, value)
+
+
+def test_check_allof_passes_conformed_value():
+    spec = s.allof({'int': s.predicate(int, 'int'), 'positive': s.predicate(_positive, 'positive')})
+    assert s.check(spec, "3") == 3
+    assert s.check(spec, "-3").errors == {'positive': "predicate 'positive' failed"}
+
+
+def test_check_non_mapping_keys():
+    assert s.check(record, [1]).errors == "expected 'Mapping', got non-mapping '<class 'list'>'"
+
+
+def test_compile_cached():
+    seq = s.seqof(s.int)
+    checker = s.compile(seq)
+    assert s.compile(seq) is checker
+    assert checker.check([1, 2]) == [1, 2]
+    # compiled sub-specs are shared
+    assert s.compile(s.keys({'a': s.req(seq)})).check({'a': ['1']}).errors == {'a': [(0, "expected 'int', got 'str'")]}
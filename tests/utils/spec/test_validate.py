@@ -0,0 +1,67 @@
+import pytest
+from ghostwriter.utils import spec as s
+
+record = s.keys({
+    'id': s.req(s.int),
+    'name': s.opt(s.str),
+    'tags': s.seqof(s.str),
+    'attrs': s.mapof(s.str, s.int),
+})
+
+
+def records(n, bad=()):
+    for i in range(n):
+        yield {'id': 'x' if i in bad else i, 'tags': ['a']}
+
+
+@pytest.mark.parametrize("value, errors", [
+    ([{'id': 1}, {'id': 2, 'name': None}], []),
+    ([{'id': 1}, {}, {'id': '3'}], [
+        ("/1/id", "required value missing"),
+        ("/2/id", "expected 'int', got 'str'"),
+    ]),
+    ([{'id': 1, 'tags': ['a', 2, 'b', 3]}], [
+        ("/0/tags/1", "expected 'str', got 'int'"),
+        ("/0/tags/3", "expected 'str', got 'int'"),
+    ]),
+    ([{'id': 1, 'attrs': {'a/b': 'x', 2: 1, '~': 3}}], [
+        ("/0/attrs/a~1b", "expected 'int', got 'str'"),
+        ("/0/attrs/2", {'key': "expected 'str', got 'int'"}),
+    ]),
+    ({'id': 1}, [("", "Not a sequence")]),
+    ([1], [("/0", "expected 'Mapping', got non-mapping '<class 'int'>'")]),
+])
+def test_validate(value, errors):
+    assert s.validate(s.seqof(record), value) == errors
+
+
+def test_validate_max_errors():
+    value = [{'id': str(i)} for i in range(1000)]
+    assert s.validate(s.seqof(record), value, max_errors=2) == [
+        ("/0/id", "expected 'int', got 'str'"),
+        ("/1/id", "expected 'int', got 'str'"),
+    ]
+    assert len(s.validate(s.seqof(record), value)) == 1000
+
+
+def test_validate_stream():
+    stream = records(100000, bad={10, 20, 30})
+    assert s.validate(s.seqof(record), stream, max_errors=2) == [
+        ("/10/id", "expected 'int', got 'str'"),
+        ("/20/id", "expected 'int', got 'str'"),
+    ]
+    # validation stopped early, the rest of the stream is left unconsumed
+    assert next(stream)['id'] == 21
+
+
+def test_validate_homogeneous():
+    assert s.validate(s.seqof(s.int), list(range(1000)) + [True, 'x']) == [
+        ("/1001", "expected 'int', got 'str'")]
+    assert s.validate(s.seqof(s.type(dict)), [{}, {}, []]) == [
+        ("/2", "expected instance of 'dict', got 'list'")]
+
+
+def test_validate_anyof_error_tree():
+    spec = s.seqof(s.anyof({'int': s.int, 'str': s.str}))
+    assert s.validate(spec, [1, 1.5]) == [
+        ("/1", {'int': "expected 'int', got 'float'", 'str': "expected 'str', got 'float'"})]
@@ -0,0 +1,113 @@
+import asyncio
+import time
+import pytest
+from testlib.bufferwriter import BufferWriter
+
+from ghostwriter.utils import aio
+from ghostwriter.utils.cogen.component import Component
+from ghostwriter.utils.cogen.snippet import snippet, SnippetEvalException
+
+DELAY = 0.2
+calls = []
+
+
+class Value(Component):
+    template = """
+    value <<self.value>>
+    """
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Pair(Component):
+    template = """
+    <<self.first>> and <<self.second.value>>
+    """
+
+    def __init__(self, first, second):
+        self.first = first
+        self.second = second
+
+
+async def load(value):
+    calls.append(value)
+    await asyncio.sleep(DELAY)
+    return value
+
+
+@snippet()
+async def slow_a():
+    return Value(await load('a'))
+
+
+@snippet()
+async def slow_b():
+    return Value(await load('b'))
+
+
+@snippet()
+async def fails():
+    await asyncio.sleep(0)
+    raise RuntimeError("boom")
+
+
+def expand(snippet_fn, prefix: str = "") -> str:
+    buf = BufferWriter()
+    snippet_fn(None, prefix, buf)
+    return buf.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def event_loop():
+    calls.clear()
+    yield
+    aio.close()
+
+
+def test_async_snippet():
+    assert expand(slow_a, "  ") == "  value a\n"
+
+
+def test_awaitable_attributes():
+    @snippet()
+    def pair():
+        return Pair(load('x'), Value(load('y')))
+
+    t_start = time.perf_counter()
+    assert expand(pair) == "x and y\n"
+    # attributes are awaited concurrently
+    assert time.perf_counter() - t_start < DELAY * 2
+
+
+def test_prefetch(tmp_path):
+    fpath = tmp_path / "file.c"
+    fpath.write_text(f"""\
+// <@@ {__name__}.slow_a @@>
+// <@@ /{__name__}.slow_a @@>
+// <@@{__name__}.slow_b@@>
+// <@@/{__name__}.slow_b@@>
+// <@@ {__name__}.nope @@>
+// <@@ /{__name__}.nope @@>
+// <@@ {__name__}.slow_a @@>
+// <@@ /{__name__}.slow_a @@>
+""")
+    assert aio.snippet_names(str(fpath), "<@@", "@@>") == [
+        f"{__name__}.slow_a", f"{__name__}.slow_b", f"{__name__}.nope", f"{__name__}.slow_a"]
+
+    t_start = time.perf_counter()
+    assert aio.prefetch([str(fpath)], "<@@", "@@>") == 3
+    assert [expand(slow_a), expand(slow_b), expand(slow_a)] == ["value a\n", "value b\n", "value a\n"]
+    assert time.perf_counter() - t_start < DELAY * 2
+    assert sorted(calls) == ['a', 'a', 'b']
+    # prefetched tasks are used up, next expansion starts a new task
+    expand(slow_b)
+    assert len(calls) == 4
+
+
+def test_async_snippet_error():
+    with pytest.raises(SnippetEvalException) as exc_info:
+        expand(fails)
+    details = exc_info.value.error_details()
+    assert "in fails" in details
+    assert "asyncio" not in details
@@ -1,5 +1,5 @@
 import pytest
-from ghostwriter.utils.ctext import deindent_block
+from ghostwriter.utils.ctext import deindent_block, indent, reindent, prefix_lines
 from ghostwriter.utils.text import deindent_str_block
 import timeit
 
@@ -364,3 +364,22 @@ def test_lead_in__lead_out(case):
 #
 #     t2 = timeit.timeit("deindent_str_block(novig_lispy_indented)", globals=globals(), number=100000)
 #     assert 0, f"ctext: {t1}\n text: {t2}"
+
+
+@pytest.mark.parametrize("fn, s, expected", [
+    (prefix_lines, "a\n\n  b\n", "> a\n> \n>   b\n"),
+    (prefix_lines, "a\nb", "> a\n> b"),
+    (indent, "a\n\n \t\n  b\n", "> a\n\n \t\n>   b\n"),
+    (indent, "", ""),
+    (reindent, "    a\n      b\n  \n    c", "> a\n>   b\n\n> c"),
+    (reindent, "\n \n", "\n\n"),
+])
+def test_indent(fn, s, expected):
+    assert fn(s, "> ") == expected
+
+
+def test_indent_skip_first():
+    assert indent("a\n\nb", "  ", True) == "a\n\n  b"
+    assert prefix_lines("a\n\nb", "  ", True) == "a\n  \n  b"
+    s = "single line"
+    assert indent(s, "  ", True) is s
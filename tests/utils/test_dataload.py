@@ -0,0 +1,64 @@
+import os
+import pytest
+
+from ghostwriter.parser.fileparser import Context, SnippetCallbackFn
+from ghostwriter.utils import dataload
+from ghostwriter.utils.dataload import data_cache, load_yaml, load_json
+
+
+@pytest.fixture(autouse=True)
+def clean_cache():
+    data_cache.clear()
+    yield
+    data_cache.clear()
+
+
+def test_load_cached(tmp_path):
+    fpath = tmp_path / "model.yml"
+    fpath.write_text("name: user\nfields: [id, name]\n")
+    first = load_yaml(str(fpath))
+    assert first == {'name': 'user', 'fields': ['id', 'name']}
+    assert load_yaml(str(fpath)) is first
+    assert (data_cache.hits, data_cache.misses) == (1, 1)
+    assert data_cache.hit_rate() == 0.5
+
+
+def test_reload_on_change(tmp_path):
+    fpath = tmp_path / "model.json"
+    fpath.write_text('{"a": 1}')
+    assert load_json(str(fpath)) == {'a': 1}
+    st = os.stat(fpath)
+    fpath.write_text('{"a": 2}')
+    # same size, ensure the modification time differs
+    os.utime(fpath, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert load_json(str(fpath)) == {'a': 2}
+    assert (data_cache.hits, data_cache.misses) == (0, 2)
+
+
+def test_cached_per_parser(tmp_path):
+    fpath = tmp_path / "model.json"
+    fpath.write_text('{"a": [1, 2]}')
+    assert load_json(str(fpath)) == load_yaml(str(fpath)) == {'a': [1, 2]}
+    assert data_cache.misses == 2
+
+
+def test_relative_path(tmp_path, monkeypatch):
+    (tmp_path / "model.yml").write_text("a: 1\n")
+    monkeypatch.chdir(tmp_path)
+    assert load_yaml("model.yml") is load_yaml(str(tmp_path / "model.yml"))
+
+
+def test_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_yaml(str(tmp_path / "nope.yml"))
+
+
+def test_context_loaders(tmp_path):
+    (tmp_path / "model.yml").write_text("a: 1\n")
+    (tmp_path / "model.json").write_text('{"b": 2}')
+    ctx = Context(SnippetCallbackFn(), "src.c")
+    assert ctx.load_yaml(str(tmp_path / "model.yml")) == {'a': 1}
+    assert ctx.load_json(str(tmp_path / "model.json")) == {'b': 2}
+    assert ctx.load_yaml(str(tmp_path / "model.yml")) is load_yaml(str(tmp_path / "model.yml"))
+    assert data_cache.hits == 2
+    dataload.log_stats()
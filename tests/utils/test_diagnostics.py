@@ -0,0 +1,114 @@
+import logging
+import pytest
+
+from ghostwriter.cli import conf
+from ghostwriter.parser.fileparser import SnippetError, ShouldReplaceFileAlways
+from ghostwriter.utils.cwatch import CompileWatcher
+from ghostwriter.utils.compile import MultiCoreCompileFn
+from ghostwriter.utils.diagnostics import Diagnostics, TooManyErrors, MAX_FILES_LISTED
+
+
+def snippet_error(fn, snippet: str, fpath: str, line_num: int = 1) -> SnippetError:
+    try:
+        fn()
+    except Exception as e:
+        return SnippetError(e, snippet, fpath, line_num)
+
+
+def broken():
+    return {}['key']
+
+
+def other():
+    raise ValueError("other")
+
+
+def test_grouped_by_snippet_type_and_location():
+    d = Diagnostics()
+    for n in range(5):
+        d.add(f"f{n}.c", snippet_error(broken, "snips.broken", f"f{n}.c"))
+    d.add("g.c", snippet_error(other, "snips.broken", "g.c"))
+    d.add("h.c", snippet_error(broken, "snips.other", "h.c"))
+    assert d.num_errors == 7
+    assert [len(files) for _, _, files in d.groups.values()] == [5, 1, 1]
+    (snippet, typ, loc), (message, details, files) = next(iter(d.groups.items()))
+    assert (snippet, typ) == ("snips.broken", "KeyError")
+    assert loc.endswith(f"test_diagnostics.py:{broken.__code__.co_firstlineno + 1}")
+    assert "broken" in message and "KeyError" in details
+    assert files == [(f"f{n}.c", 1) for n in range(5)]
+
+
+def test_errors_outside_snippets_not_grouped():
+    d = Diagnostics()
+    d.add("a.c", FileNotFoundError("a.c"))
+    d.add("b.c", FileNotFoundError("b.c"))
+    assert len(d.groups) == 2
+
+
+def test_merge():
+    d, worker = Diagnostics(), Diagnostics()
+    d.add("a.c", snippet_error(broken, "snips.broken", "a.c"))
+    worker.add("b.c", snippet_error(broken, "snips.broken", "b.c"))
+    worker.add("c.c", snippet_error(other, "snips.other", "c.c"))
+    d.merge(worker.groups)
+    assert d.num_errors == 3
+    assert [[f for f, _ in files] for _, _, files in d.groups.values()] == [["a.c", "b.c"], ["c.c"]]
+
+
+def test_check_limit():
+    d = Diagnostics(max_errors=2)
+    d.add("a.c", snippet_error(broken, "snips.broken", "a.c"))
+    d.check_limit()
+    d.add("b.c", snippet_error(broken, "snips.broken", "b.c"))
+    with pytest.raises(TooManyErrors):
+        d.check_limit()
+    assert not Diagnostics().limit_reached
+
+
+def test_report_once_per_group(caplog):
+    d = Diagnostics()
+    for n in range(MAX_FILES_LISTED + 5):
+        d.add(f"f{n:02}.c", snippet_error(broken, "snips.broken", f"f{n:02}.c"))
+    with caplog.at_level(logging.ERROR):
+        d.report()
+    group, summary = [r.getMessage() for r in caplog.records]
+    assert group.count("KeyError") == 2  # error message and traceback
+    assert "f00.c, line 1" in group and "... and 5 more" in group
+    assert summary.startswith(f"{MAX_FILES_LISTED + 5} error(s) in 1 group(s)")
+
+
+CONF = """\
+logging:
+  level: info
+parser:
+  processes: 2
+  max_errors: %d
+  include_patterns:
+    - '.*\\.c$'
+  search_paths:
+    - snippets
+"""
+
+
+@pytest.mark.parametrize("max_errors", [0, 3])
+def test_mp_compile_aggregates_worker_errors(tmp_path, monkeypatch, caplog, max_errors):
+    # search paths are relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "ghostwriter.conf.yml").write_text(CONF % max_errors)
+    (tmp_path / "snippets").mkdir()
+    (tmp_path / "snippets" / "gwt_diag_snips.py").write_text(
+        "def broken(ctx, prefix, fw):\n    raise KeyError('nope')\n")
+    for n in range(10):
+        (tmp_path / f"f{n}.c").write_text("// <@@gwt_diag_snips.broken@@>\n// <@@/gwt_diag_snips.broken@@>\n")
+    config = conf.load(tmp_path)
+    compiler = MultiCoreCompileFn(config.parser, CompileWatcher(str(tmp_path), config=config),
+                                  ShouldReplaceFileAlways())
+    with caplog.at_level(logging.ERROR):
+        compiler.apply()
+    diagnostics = compiler.diagnostics
+    assert len(diagnostics.groups) == 1
+    if max_errors:
+        assert max_errors <= diagnostics.num_errors < 10
+        assert caplog.records[-1].getMessage() == f"stopped compiling after {max_errors} error(s)"
+    else:
+        assert diagnostics.num_errors == 10
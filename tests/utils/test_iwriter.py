@@ -0,0 +1,51 @@
+import pytest
+from testlib.bufferwriter import BufferWriter
+from ghostwriter.utils.iwriter import IWriter, BufferedWriter
+
+
+class CountingWriter(BufferWriter):
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def write(self, contents: str):
+        self.writes.append(contents)
+        super().write(contents)
+
+
+def test_buffered_writer_flush():
+    out = CountingWriter()
+    bw = BufferedWriter(out)
+    for word in ("hello", ", ", "world", "\n"):
+        bw.write(word)
+    assert out.writes == []
+    bw.flush()
+    assert out.writes == ["hello, world\n"]
+    assert (bw.flushes, bw.chars_written) == (1, 13)
+    # nothing buffered, nothing written
+    bw.flush()
+    assert bw.flushes == 1
+
+
+def test_buffered_writer_threshold():
+    out = CountingWriter()
+    bw = BufferedWriter(out, threshold=4)
+    for ch in "abcdefghij":
+        bw.write(ch)
+    assert out.writes == ["abcd", "efgh"]
+    bw.flush()
+    assert out.getvalue() == "abcdefghij"
+    assert (bw.flushes, bw.chars_written) == (3, 10)
+
+
+@pytest.mark.parametrize("writes, got_newline", [
+    ([], True),
+    (["line\n"], True),
+    (["line\n", "more"], False),
+    (["line\n", ""], False),
+])
+def test_buffered_writer_got_newline(writes, got_newline):
+    bw = BufferedWriter(IWriter())
+    for contents in writes:
+        bw.write(contents)
+    assert bw.got_newline == got_newline
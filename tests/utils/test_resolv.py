@@ -0,0 +1,70 @@
+import sys
+import importlib
+import pytest
+
+from ghostwriter.utils import resolv as r
+
+
+@pytest.fixture
+def modpath(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    importlib.invalidate_caches()
+    names = []
+
+    def write_module(name: str, source: str):
+        (tmp_path / f"{name}.py").write_text(source)
+        importlib.invalidate_caches()
+        names.append(name)
+
+    yield write_module
+    for name in names:
+        sys.modules.pop(name, None)
+    r.clear_cache()
+
+
+def test_resolv_cached(modpath):
+    modpath("gwt_snips", "def fn(): return 1\n")
+    fn = r.resolv("gwt_snips.fn")
+    assert fn() == 1
+    assert r.resolv("gwt_snips.fn") is fn
+
+
+def test_invalidated_by_module_reload(modpath):
+    modpath("gwt_reload", "def fn(): return 1\n")
+    assert r.resolv("gwt_reload.fn")() == 1
+    modpath("gwt_reload", "def fn(): return 2  # changed\n")
+    importlib.reload(sys.modules["gwt_reload"])
+    assert r.resolv("gwt_reload.fn")() == 2
+    # re-imported from scratch
+    modpath("gwt_reload", "def fn(): return 3  # changed again\n")
+    del sys.modules["gwt_reload"]
+    assert r.resolv("gwt_reload.fn")() == 3
+
+
+def test_failures_cached(modpath):
+    modpath("gwt_attr", "")
+    with pytest.raises(r.AttrNotFound):
+        r.resolv("gwt_attr.fn")
+    with pytest.raises(r.AttrNotFound):
+        r.resolv("gwt_attr.fn")
+    with pytest.raises(r.UnqualifiedPath):
+        r.resolv("fn")
+
+
+def test_missing_module_cached_until_loaded(modpath):
+    with pytest.raises(r.ParentModuleNotFound):
+        r.resolv("gwt_missing.fn")
+    modpath("gwt_missing", "def fn(): return 1\n")
+    # cached failure, the module is not imported anew
+    with pytest.raises(r.ParentModuleNotFound):
+        r.resolv("gwt_missing.fn")
+    importlib.import_module("gwt_missing")
+    assert r.resolv("gwt_missing.fn")() == 1
+
+
+def test_clear_cache(modpath):
+    with pytest.raises(r.ParentModuleNotFound):
+        r.resolv("gwt_added.fn")
+    modpath("gwt_added", "def fn(): return 1\n")
+    r.clear_cache()
+    assert r.resolv("gwt_added.fn")() == 1
@@ -0,0 +1,154 @@
+import os
+import sqlite3
+import time
+from multiprocessing import Process
+import pytest
+
+from ghostwriter.utils import sharedcache
+from ghostwriter.utils.sharedcache import SharedCache, LocalCache, cached, memoize, get_cache
+
+
+@pytest.fixture
+def shared_pass():
+    db_path = sharedcache.begin_pass()
+    yield db_path
+    sharedcache.end_pass()
+
+
+def expensive(counter_path: str):
+    with open(counter_path, 'a') as fh:
+        fh.write('x')
+    time.sleep(0.2)
+    return {'graph': list(range(10))}
+
+
+def worker(counter_path: str):
+    assert cached(('graph', 'api.yml'), lambda: expensive(counter_path)) == {'graph': list(range(10))}
+
+
+def test_computed_once_across_processes(shared_pass, tmp_path):
+    counter = tmp_path / "counter"
+    counter.write_text('')
+    procs = [Process(target=worker, args=(str(counter),)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert [p.exitcode for p in procs] == [0] * 4
+    assert counter.read_text() == 'x'
+
+
+def test_pass_lifecycle(shared_pass):
+    cache = get_cache()
+    assert isinstance(cache, SharedCache) and cache.db_path == shared_pass
+    assert cached('k', lambda: 1) == 1
+    assert cached('k', lambda: 2) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    sharedcache.end_pass()
+    assert not os.path.exists(shared_pass)
+    with pytest.raises(sqlite3.ProgrammingError):
+        cache.db.execute("SELECT 1")
+    assert isinstance(get_cache(), LocalCache)
+
+
+def test_replaced_cache_is_closed(shared_pass):
+    cache = get_cache()
+    # a new pass before the previous one ended
+    sharedcache.begin_pass()
+    try:
+        assert get_cache().db_path != shared_pass
+        with pytest.raises(sqlite3.ProgrammingError):
+            cache.db.execute("SELECT 1")
+    finally:
+        sharedcache.end_pass()
+        os.environ[sharedcache.ENV_SHARED_CACHE_PATH] = shared_pass
+
+
+def test_memoize():
+    calls = []
+
+    @memoize
+    def square(x, power=2):
+        calls.append(x)
+        return x ** power
+
+    assert [square(3), square(3), square(3, power=3), square(4)] == [9, 9, 27, 16]
+    assert calls == [3, 3, 4]
+
+
+def test_eviction(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache.db"), max_bytes=2000)
+    for i in range(10):
+        cache.get_or_compute(i, lambda: 'x' * 500)
+    assert cache.db.execute("SELECT SUM(size) FROM entries").fetchone()[0] <= 2000
+    # oldest entries are evicted first
+    assert cache.get_or_compute(0, lambda: 'recomputed') == 'recomputed'
+    assert cache.get_or_compute(9, lambda: 'recomputed') == 'x' * 500
+    # values exceeding the budget are never stored
+    assert cache.get_or_compute('big', lambda: 'x' * 5000) == 'x' * 5000
+    assert cache.get_or_compute('big', lambda: 'small') == 'small'
+
+
+def test_failed_compute_releases_key(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache.db"))
+
+    def fails():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('k', fails)
+    assert cache.db.execute("SELECT COUNT(*) FROM pending").fetchone()[0] == 0
+    assert cache.get_or_compute('k', lambda: 1) == 1
+
+
+def test_unpicklable_value(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache.db"))
+    fn = lambda: 1
+    assert cache.get_or_compute('k', lambda: fn) is fn
+    assert cache.get_or_compute('k', lambda: 2) == 2
+
+
+def crash_computing(db_path: str):
+    try:
+        cache = SharedCache(db_path)
+        cache.get_or_compute('k', lambda: os._exit(1))
+    finally:
+        os._exit(2)
+
+
+@pytest.mark.parametrize("reaped", [True, False])
+def test_claimant_died(tmp_path, monkeypatch, reaped):
+    # a worker dying mid-compute must not block others until the timeout
+    monkeypatch.setattr(sharedcache, 'WAIT_TIMEOUT', 30.0)
+    db_path = str(tmp_path / "cache.db")
+    cache = SharedCache(db_path)
+    pid = os.fork()
+    if pid == 0:
+        crash_computing(db_path)
+    try:
+        if reaped:
+            os.waitpid(pid, 0)
+        else:
+            # leave the process a zombie, as a crashed sibling worker would be
+            while cache.db.execute("SELECT pid FROM pending").fetchone() is None or sharedcache._alive(pid):
+                time.sleep(0.01)
+        assert cache.db.execute("SELECT pid FROM pending").fetchone() == (pid,)
+        started = time.monotonic()
+        assert cache.get_or_compute('k', lambda: 1) == 1
+        assert time.monotonic() - started < 5
+        assert cache.db.execute("SELECT COUNT(*) FROM pending").fetchone()[0] == 0
+        assert cache.get_or_compute('k', lambda: 2) == 1
+    finally:
+        if not reaped:
+            os.waitpid(pid, 0)
+
+
+def test_recursive_compute(tmp_path, monkeypatch):
+    monkeypatch.setattr(sharedcache, 'WAIT_TIMEOUT', 30.0)
+    cache = SharedCache(str(tmp_path / "cache.db"))
+    started = time.monotonic()
+    with pytest.raises(RuntimeError, match="requires the value itself"):
+        cache.get_or_compute('k', lambda: cache.get_or_compute('k', lambda: 1))
+    assert time.monotonic() - started < 5
+    assert cache.db.execute("SELECT COUNT(*) FROM pending").fetchone()[0] == 0
+    assert cache.get_or_compute('k', lambda: 2) == 2
@@ -1,6 +1,7 @@
 from ghostwriter.writer.writer import Writer
 from io import StringIO
 import yaml
+import pytest
 
 
 def test_single_writer():
@@ -122,3 +123,74 @@ public class Order {
    }
 }"""
     assert actual == expected, "code generation produces different output"
+
+
+def test_section_reuse():
+    # sections are indented relative to where they are spliced
+    args = Writer(indent_by='  ')
+    args.writeln_r("int x,")
+    args.writeln("int y")
+
+    w = Writer(prefix='// ', indent_by='  ')
+    w.writeln_r("void f(")
+    w.splice(args)
+    w.writeln_l(");")
+    w.writeln_r("struct s {")
+    w.writeln_r("struct {")
+    w.splice(args)
+    w.writeln_l("};")
+    w.writeln_l("};")
+
+    expected = """\
+// void f(
+//   int x,
+//     int y
+// );
+// struct s {
+//   struct {
+//     int x,
+//       int y
+//   };
+// };"""
+    assert w.getvalue() == expected
+    # lines written to a section after splicing are rendered too
+    args.writeln("int z")
+    assert w.getvalue().count("  int z") == 2
+    assert args.getvalue() == "int x,\n  int y\n  int z"
+
+
+def test_render_str():
+    w = Writer(indent_by='\t')
+    w.writeln_r("a {")
+    w.section().writeln("b;")
+    w.write("c")
+    w.write(";")
+    b = StringIO()
+    w.render(b)
+    assert b.getvalue() == w.getvalue() == "a {\n\tb;\n\tc;"
+    assert list(w.lines()) == [(0, "a {"), (1, "b;"), (1, "c;")]
+
+
+def test_splice_self():
+    w = Writer()
+    with pytest.raises(ValueError):
+        w.splice(w)
+
+
+def test_splice_cycle():
+    a, b, c = Writer(), Writer(), Writer()
+    a.writeln("a")
+    a.splice(b)
+    b.splice(c)
+    c.splice(a)
+    for w in (a, b, c):
+        with pytest.raises(ValueError, match="spliced into itself"):
+            w.getvalue()
+    # a section spliced repeatedly, but not into itself, is fine
+    d = Writer()
+    d.writeln("d")
+    e = Writer()
+    e.splice(d)
+    e.splice(d)
+    e.section().splice(d)
+    assert e.getvalue() == "d\nd\nd"